@@ -15,6 +15,7 @@ from .qSpy.converter import (
 	QspSplitter, FinderSplitter
 )
 from .qSpy.workspace import LocHash, QspWorkspace, WorkspacesPlaces
+from .qSpy.ws_indexer import QspWsIndexer
 from .qSpy import function as qsp
 from .qSpy.project import QspProject
 # Import constants
@@ -310,6 +311,20 @@ class QspGlobalVarsHighlightCommand(sublime_plugin.TextCommand):
 		view.run_command('qsp_hide_highlight')
 		view.add_regions('global_vars', qsp_ws.get_global_vars(), 'region.yellowish', flags=256)
 
+class QspExportWorkspaceCommand(sublime_plugin.WindowCommand):
+	""" Save workspace of project in json-file. """
+	def run(self) -> None:
+		project_folder = QspWorkspace.current_project_folder()
+		if not project_folder or not project_folder in QSP_WORKSPACES: return None
+		qsp_ws = QSP_WORKSPACES[project_folder]
+		ws_json_path = os.path.join(project_folder, const.WS_FILE_NAME)
+		# in async thread, so export is not mixed with batches of indexer
+		sublime.set_timeout_async(lambda: self._export(qsp_ws, ws_json_path), 0)
+
+	def _export(self, qsp_ws:QspWorkspace, ws_json_path:Path) -> None:
+		qsp_ws.export_json(ws_json_path)
+		sublime.status_message(f'QSP: workspace is exported to {ws_json_path}')
+
 class QspHideHighlightCommand(sublime_plugin.TextCommand):
 
 	def run(self, edit:sublime.Edit) -> None:
@@ -348,7 +363,8 @@ class QspShowDuplLocsCommand(sublime_plugin.TextCommand):
 				popup_msg += f'{i+1}. {qsp_loc_name}. <a href="f:{qsp_loc_place}{count}">'
 				popup_msg += f'{file_name}{count}</a><br>'
 			elif not isinstance(qsp_loc_place, int) and not os.path.isfile(qsp_loc_place):
-				qsp_ws.del_all_locs_by_place(qsp_loc_place)
+				# indexer changes workspace in async thread, so locations are deleted there too
+				sublime.set_timeout_async(lambda p=qsp_loc_place: qsp_ws.del_all_locs_by_place(p), 0)
 				continue
 			else:
 				for v in all_views:
@@ -425,9 +441,7 @@ class QspInvalidInput(sublime_plugin.EventListener):
 				qsps_file_path = view.id()
 			def _filting_qsplocs(qsp_loc:LocHash) -> bool:
 				return qsp_loc[1] != input_region or qsp_loc[2] != qsps_file_path
-			all_locations = qsp_ws.get_locs()
-			loc_names = [loc[0] for loc in filter(_filting_qsplocs, all_locations)]
-			if not input_text in loc_names:
+			if not any(filter(_filting_qsplocs, qsp_ws.get_locs_by_name(input_text))):
 				return None
 			content = sublime.expand_variables(const.QSP_MSG.WRONG_LOC, {"input_text": input_text})
 			view.add_regions('wrong_location', [sr_locname],
@@ -568,11 +582,10 @@ class QspWorkspaceHandlers(sublime_plugin.EventListener):
 		self._log('try extract WS from file')
 		project_folder = (project_folder or QspWorkspace.current_project_folder())
 		if not project_folder: return None
-		ws_file_path = os.path.join(project_folder, 'qsp-project-workspace.json')
-		if os.path.isfile(ws_file_path):
+		qsp_ws = QspWorkspace(QSP_WORKSPACES)
+		if qsp_ws.extract_from_folder(project_folder):
 			# если файл существует, извлекаем из файла ws
-			qsp_ws = QSP_WORKSPACES[project_folder] = QspWorkspace(QSP_WORKSPACES)
-			qsp_ws.extract_from_file(ws_file_path)
+			QSP_WORKSPACES[project_folder] = qsp_ws
 			self._log('extract fin!')
 			return qsp_ws
 		return None
@@ -586,8 +599,9 @@ class QspWorkspaceHandlers(sublime_plugin.EventListener):
 		project_folder = folders[0]
 		qsp_ws = self._extract_qsp_ws(project_folder) # try to extract workspace from file
 		if qsp_ws is not None:
-			qsp_ws.refresh_qsps_files(folders)
+			# files are indexed in background, locations from file are available now
 			qsp_ws.refresh_from_views(window.views(), folders)
+			QspWsIndexer.start(window, qsp_ws, project_folder)
 
 # ----------------------------------- Events of work with project -----------------------------------
 
@@ -597,7 +611,7 @@ class QspWorkspaceHandlers(sublime_plugin.EventListener):
 			Event of init the plugin (start programm, or reload plugin).
 		"""
 		for window in sublime.windows(): # many windows may be open
-			self._refresh_ws(window)
+			sublime.set_timeout_async(lambda w=window: self._refresh_ws(w), 0)
 
 	def on_load_project_async(self, window:sublime.Window) -> None:
 		"""
@@ -611,6 +625,7 @@ class QspWorkspaceHandlers(sublime_plugin.EventListener):
 			Event of pre closing the project.
 		"""
 		project_folder = window.extract_variables().get('folder', '')
+		QspWsIndexer.cancel(project_folder)
 		qsp_ws = self._get_qsp_ws(project_folder)
 		qsp_ws.close_project() # set WS in closing project status
 		qsp_ws.save_to_file(project_folder) # сохранение при закрытии проекта обязательно
@@ -653,14 +668,16 @@ class QspWorkspaceHandlers(sublime_plugin.EventListener):
 		folders = window.folders()
 		# close the untitled view
 		if current_qsps is None:
-			qsp_ws.del_all_locs_by_place(view.id())
+			# in async thread, as indexer and other changes of workspace
+			view_id = view.id()
+			sublime.set_timeout_async(lambda: qsp_ws.del_all_locs_by_place(view_id), 0)
 		elif not qsp.is_path_in_project_folders(current_qsps, folders):
 			return None
 		if current_qsps in QSP_MARKERS['delete_files']:
-			sublime.set_timeout_async(lambda: qsp_ws.refresh_qsps_files(folders), 250)
+			sublime.set_timeout_async(lambda: QspWsIndexer.start(window, qsp_ws, project_folder), 250)
 			QSP_MARKERS['delete_files'] = []
-		elif qsp_ws.qsps_files_number() == 0:
-			qsp_ws.refresh_qsps_files(folders)
+		elif qsp_ws.qsps_files_number() == 0 and not QspWsIndexer.is_running(project_folder):
+			QspWsIndexer.start(window, qsp_ws, project_folder)
 
 	def on_post_save_async(self, view:sublime.View) -> None:
 		"""
@@ -676,10 +693,12 @@ class QspWorkspaceHandlers(sublime_plugin.EventListener):
 		if qsp_ws.qsps_file_is_exist(current_qsps):
 			qsp_ws.refresh_md5(current_qsps)
 		else:
-			qsp_ws.add_qsps_file(current_qsps, qsp_ws.get_hash(current_qsps))
+			qsp_ws.add_qsps_file(current_qsps, qsp_ws.get_hash(current_qsps, qsp_ws.hash_name))
+		qsp_ws.refresh_symbols(current_qsps)
 		window = view.window()
 		if not window: return
 		qsp_ws.refresh_from_views(window.views(), window.folders())
+		qsp_ws.save_changes(project_folder) # WS is not lost, if ST is crashed
 
 	def on_associate_buffer_async(self, buffer:sublime.Buffer) -> None:
 		"""
@@ -693,7 +712,7 @@ class QspWorkspaceHandlers(sublime_plugin.EventListener):
 			project_folder = folders[0]
 			qsp_ws = self._get_qsp_ws(project_folder)
 			qsp_ws.refresh_from_views(window.views(), folders)
-			qsp_ws.refresh_qsps_files(folders)
+			QspWsIndexer.start(window, qsp_ws, project_folder)
 			QSP_MARKERS['rename_path'] = False
 
 # ------------------------------------ Events of work with files ------------------------------------
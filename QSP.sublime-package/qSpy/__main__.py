@@ -0,0 +1,44 @@
+"""
+	Build of QSP-project without Sublime Text.
+
+	python -m qSpy [-j N] [--run] [qsp-project.json or folder of project]
+
+	Project is built as by qsp_build command. Modules may be built in N
+	worker-processes, which can't be started in plugin_host of SublimeText.
+"""
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+from .builder import BuildQSP
+from .project import QspProject
+from .const import PROJECT_FILE_NAME
+
+def main(argv:Optional[List[str]] = None) -> int:
+	args = _parse_args(argv)
+	point_file = os.path.abspath(args.project)
+	if os.path.isdir(point_file): point_file = os.path.join(point_file, PROJECT_FILE_NAME)
+	if not os.path.isfile(point_file):
+		print(f'[112] Project file "{point_file}" is not found.', file=sys.stderr)
+		return 1
+	qsp_proj = QspProject({'point_file': point_file}, [os.path.dirname(point_file)])
+	if qsp_proj.scheme_is_wrong(): return 1
+	builder = BuildQSP(qsp_proj.get_scheme(), args.jobs)
+	builder.build_project()
+	if args.run: builder.run_game()
+	return 0
+
+def _parse_args(argv:Optional[List[str]]) -> argparse.Namespace:
+	parser = argparse.ArgumentParser(prog='python -m qSpy',
+		description='Build QSP-project by qsp-project.json.')
+	parser.add_argument('project', nargs='?', default='.',
+		help='qsp-project.json or folder with it. Default is current folder')
+	parser.add_argument('-j', '--jobs', type=int, default=0, metavar='N',
+		help='count of worker-processes for modules. Output is the same, as of modules one by one')
+	parser.add_argument('--run', action='store_true',
+		help='run start module in player after building')
+	return parser.parse_args(argv)
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,75 @@
+import os
+import json
+import hashlib
+from typing import Any, Dict, List, Union
+
+from . import plugtypes as ts
+
+PpLabels = Dict[str, Union[str, bool]]
+
+class BuildManifest:
+	"""
+		Fingerprints of modules from last build. Lets builder skip modules,
+		which sources and settings are not changed since that build.
+	"""
+	VERSION = 1
+
+	def __init__(self, manifest_file:ts.Path) -> None:
+		self._manifest_file:ts.Path = manifest_file
+		# module path: {'fingerprint': str, 'pp_env': labels after module}
+		self._modules:Dict[ts.Path, Dict[str, Any]] = {}
+		self._changed:bool = False
+		self._load()
+
+	def is_actual(self, module_path:ts.Path, fingerprint:ts.HashMD5) -> bool:
+		""" Module is built already with the same fingerprint, and output file exists. """
+		entry = self._modules.get(module_path)
+		return (entry is not None
+			and entry.get('fingerprint') == fingerprint
+			and os.path.isfile(module_path))
+
+	def pp_env(self, module_path:ts.Path) -> PpLabels:
+		""" Labels of preprocessor's environment after module preprocessing. """
+		return dict(self._modules[module_path].get('pp_env', {}))
+
+	def update(self, module_path:ts.Path, fingerprint:ts.HashMD5, pp_env:PpLabels) -> None:
+		self._modules[module_path] = {'fingerprint': fingerprint, 'pp_env': dict(pp_env)}
+		self._changed = True
+
+	def forget(self, module_path:ts.Path) -> None:
+		""" Module must be rebuild on next build. """
+		if self._modules.pop(module_path, None) is not None:
+			self._changed = True
+
+	def save(self) -> None:
+		if not self._changed: return
+		try:
+			with open(self._manifest_file, 'w', encoding='utf-8') as fp:
+				json.dump({'version': self.VERSION, 'modules': self._modules},
+					fp, ensure_ascii=False, indent=4)
+			self._changed = False
+		except OSError as e:
+			print(f'[108] Build manifest is not saved. Error: "{e}".')
+
+	def _load(self) -> None:
+		if not os.path.isfile(self._manifest_file): return
+		try:
+			with open(self._manifest_file, 'r', encoding='utf-8') as fp:
+				manifest = json.load(fp)
+		except (OSError, ValueError):
+			# broken manifest is same as absent: all modules will be rebuilt
+			return
+		if not isinstance(manifest, dict) or manifest.get('version') != self.VERSION: return
+		modules = manifest.get('modules', {})
+		if isinstance(modules, dict): self._modules = modules
+
+	@staticmethod
+	def lines_hash(lines:List[str]) -> ts.HashMD5:
+		""" MD5 of source lines. """
+		return hashlib.md5(''.join(lines).encode('utf-8', 'surrogatepass')).hexdigest()
+
+	@staticmethod
+	def fingerprint(inputs:Dict[str, Any]) -> ts.HashMD5:
+		""" Hash of all inputs of module's building. """
+		dump = json.dumps(inputs, ensure_ascii=False, sort_keys=True)
+		return hashlib.md5(dump.encode('utf-8', 'surrogatepass')).hexdigest()
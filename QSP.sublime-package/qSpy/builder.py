@@ -1,14 +1,22 @@
 import os#, json
+import io
 import shutil
 import subprocess
-from typing import Callable, List, Optional
+import contextlib
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
 
 # Importing my modules.
 from . import function as qsp
 from .moduleqsp import ModuleQSP
-from .preprocessor import QspsPP
+from .build_manifest import BuildManifest, PpLabels
+from .preprocessor import QspsPP, PpCache, PpProfiler
 from .converter import QspsToQspBuiltinConv, QspsToQspOuterConv, QspsFile
-from .const import SCAN_FILES_LOCNAME
+from .converter.converters import QspsToQspConverter
+from .converter.base_cache import base_cache
+from .const import (
+	SCAN_FILES_LOCNAME, BUILD_MANIFEST_FILE_NAME, BASE_CACHE_FILE_NAME, PP_CACHE_FILE_NAME,
+	PP_PROFILE_FILE_NAME)
 from . import plugtypes as ts
 
 # from .preprocessor.pp_ast_printer import AstPrinter
@@ -22,10 +30,13 @@ class BuildQSP():
 		If we make the class ex, we can use class instance fields as global name-space.
 		Class BuildQSP — is a name-space for procedure scripts.
 	"""
-	def __init__(self, project_scheme:ts.ProjectScheme) -> None:
+	def __init__(self, project_scheme:ts.ProjectScheme, workers:int = 0) -> None:
 
 		# Default inits.
 		self._root:ts.ProjectScheme = project_scheme # qsp-project.json dict
+		# Count of worker-processes for modules. Only command line gives it,
+		# because plugin_host of SublimeText can't start worker-processes.
+		self._workers = workers
 
 		self._save_temp_files:bool = self._root.get('save_temp_files', False)
 
@@ -46,12 +57,34 @@ class BuildQSP():
 		# Built-in preprocessor
 		pp_switch = self._root['preprocessor']
 		self._preprocessor = QspsPP(pp_switch) if pp_switch != 'Hard-off' else None
+		# Time of preprocessor stages for every file.
+		self._pp_profiler:Optional[PpProfiler] = None
+		if self._root.get('pp_profile', False) and self._preprocessor:
+			self._pp_profiler = PpProfiler()
+			self._preprocessor.set_profiler(self._pp_profiler)
+			if self._workers > 1:
+				qsp.write_error_log('[109] Preprocessor is profiled. Modules are built one by one.')
+			self._workers = 0
 
 		# Scanned files proves location
 		self._scans = self._root['scans']
 		self._scan_file:Optional[QspsFile] = None
 
 		self._start_module = self._root['start']
+		# Variants of game, which are built from the same sources with other labels
+		self._profiles:List[ts.ProfileConfig] = self._root.get('profiles', [])
+
+		# Fingerprints of modules from last build. Unchanged modules are skipped.
+		self._manifest:Optional[BuildManifest] = None
+		if self._root.get('incremental_build', True):
+			self._manifest = BuildManifest(os.path.abspath(BUILD_MANIFEST_FILE_NAME))
+		# Compiled base blocks of locations are kept on disk with manifest.
+		self._base_cache_file:Path = os.path.abspath(BASE_CACHE_FILE_NAME) if self._manifest else ''
+		# Output of preprocessor for unchanged files with the same labels.
+		self._pp_cache:Optional[PpCache] = None
+		if self._manifest and self._preprocessor:
+			self._pp_cache = PpCache(os.path.abspath(PP_CACHE_FILE_NAME))
+			self._preprocessor.set_cache(self._pp_cache)
 
 		self.assets:List[ts.AssetsConfig] = []
 
@@ -63,7 +96,25 @@ class BuildQSP():
 		if self._scans: self._create_scans_loc()
 		# Build QSP-files.
 		old = time.time()
-		self._build_qsp_modules()
+		if self._base_cache_file: base_cache.load(self._base_cache_file)
+		base_cache.reset_stats()
+		if self._profiles and self._build_handler == self._qsps_build:
+			self._build_profiles()
+		else:
+			self._build_qsp_modules()
+		if self._manifest: self._manifest.save()
+		if self._base_cache_file: base_cache.save(self._base_cache_file)
+		if self._pp_cache:
+			self._pp_cache.save()
+			stats = self._pp_cache.stats()
+			if stats['hits'] or stats['misses']:
+				print(f"Preprocessed files: {stats['hits']} from cache, {stats['misses']} processed.")
+		stats = base_cache.stats()
+		if stats['hits'] or stats['misses']:
+			print(f"Base blocks: {stats['hits']} from cache, {stats['misses']} compiled.")
+		if self._pp_profiler:
+			self._pp_profiler.save(os.path.join(os.path.dirname(self._start_module), PP_PROFILE_FILE_NAME))
+			print(self._pp_profiler.summary())
 		print(f'Elapsed {time.time() - old}')
 
 	def run_game(self) -> None:
@@ -78,10 +129,13 @@ class BuildQSP():
 			qsp.write_error_log(f'[106] Path at player is wrong.')
 			return
 
-		if not os.path.isfile(self._start_module):
-			qsp.write_error_log(f'[107] Start-file "{self._start_module}" is wrong. Don\'t start the game.')
+		start_module = self._start_module
+		# game of first profile is run
+		if self._profiles: start_module = self._profile_path(start_module, self._profiles[0])
+		if not os.path.isfile(start_module):
+			qsp.write_error_log(f'[107] Start-file "{start_module}" is wrong. Don\'t start the game.')
 			return
-		proc = subprocess.Popen([player, self._start_module])
+		proc = subprocess.Popen([player, start_module])
 		# This instruction kill the builder after 100 ms.
 		# It necessary to close process in console window,
 		# but player must be open above console.
@@ -154,32 +208,185 @@ class BuildQSP():
 	def _build_qsp_modules(self) -> None:
 		# start_time = time.time()
 		project = self._root['project']
+		if self._workers > 1 and len(project) > 1 and self._build_handler == self._qsps_build:
+			self._build_modules_parallel(project, self._workers)
+			return
 		# Get instructions list from 'project'.
 		for instruction in project:
 			self._build_handler(instruction)
 
-	def _qsps_build(self, instruction:ts.QspModule) -> None:
+	def _build_profiles(self) -> None:
+		"""
+			Every profile is built from the same sources with own labels into own folder.
+			Files are read once, and scanned and parsed files are reused by preprocessor,
+			so only interpretation of directives and converting are repeated.
+		"""
+		project = self._root['project']
+		qsp_modules = [self._prepare_module(instruction) for instruction in project]
+		if self._preprocessor: self._preprocessor.keep_parsed(True)
+		for profile in self._profiles:
+			print(f'Build profile "{profile["name"]}".')
+			if self._preprocessor: self._preprocessor.start_env(profile['labels'])
+			for instruction, qsp_module in zip(project, qsp_modules):
+				module_path = self._profile_path(instruction.get('module', ''), profile)
+				qsp.safe_mk_fold(os.path.dirname(module_path))
+				self._qsps_build({**instruction, 'module': module_path}, qsp_module.copy())
+		if self._preprocessor:
+			hits = self._preprocessor.parsed_hits()
+			if hits: print(f'Scanned and parsed files are reused {hits} times.')
+			self._preprocessor.keep_parsed(False)
+
+	def _profile_path(self, path:Path, profile:ts.ProfileConfig) -> Path:
+		""" Path of module in output folder of profile, relative to folder of start module. """
+		try:
+			rel_path = os.path.relpath(path, os.path.dirname(self._start_module))
+		except ValueError: # path on other disk
+			rel_path = os.path.basename(path)
+		if rel_path.startswith('..'): rel_path = os.path.basename(path)
+		return os.path.join(profile['output'], rel_path)
+
+	def _qsps_build(self, instruction:ts.QspModule, qsp_module:Optional[ModuleQSP] = None) -> None:
 		""" Builtin preprocessor, builtin or outer converter (not qgc) """
+		if qsp_module is None: qsp_module = self._prepare_module(instruction)
+		module_path = instruction.get('module', '')
+
+		fingerprint = self._module_fingerprint(instruction, qsp_module) if self._manifest else ''
+		if self._module_is_actual(module_path, fingerprint):
+			print(f'Module "{module_path}" is not changed. Skip building.')
+			return
+
+		errored = _build_module(qsp_module, instruction, self._preprocessor, self._converter,
+									self._save_temp_files, self._conv_path, self._conv_args)
+
+		pp_env = self._preprocessor.get_env() if self._preprocessor else {}
+		self._register_module(module_path, fingerprint, errored, pp_env)
+
+	def _build_modules_parallel(self, project:List[ts.QspModule], workers:int) -> None:
+		"""
+			Modules are built in worker-processes. Labels of preprocessor pass from module
+			to module, so module, which defines labels, must be built before next modules
+			are sent to workers. Console output is printed in project order.
+		"""
+		pp_mode = self._root['preprocessor']
+		# module path, fingerprint, future of building (None if skipped), messages before building
+		queue:List[Tuple[Path, ts.HashMD5, Optional['Future[_WorkerResult]'], str]] = []
+		def _flush() -> None:
+			for module_path, fingerprint, future, message in queue:
+				if message: print(message, end='')
+				if future is None: continue
+				output, errored, pp_env = future.result()
+				if output: print(output, end='')
+				self._register_module(module_path, fingerprint, errored, pp_env)
+			queue.clear()
+
+		with ProcessPoolExecutor(max_workers=workers) as executor:
+			for instruction in project:
+				messages = io.StringIO()
+				with contextlib.redirect_stdout(messages):
+					qsp_module = self._prepare_module(instruction)
+				module_path = instruction.get('module', '')
+
+				fingerprint = self._module_fingerprint(instruction, qsp_module) if self._manifest else ''
+				if self._module_is_actual(module_path, fingerprint):
+					print(f'Module "{module_path}" is not changed. Skip building.', file=messages)
+					queue.append((module_path, fingerprint, None, messages.getvalue()))
+					continue
+
+				pp_env = self._preprocessor.get_env() if self._preprocessor else {}
+				task:_WorkerTask = (qsp_module, instruction, pp_mode, pp_env,
+					self._conv_api, self._save_temp_files, self._conv_path, self._conv_args)
+				future = executor.submit(_build_module_in_worker, task)
+				queue.append((module_path, fingerprint, future, messages.getvalue()))
+
+				if self._preprocessor and any(
+						QspsPP.may_define_labels(src.get_src()) for src in qsp_module.qsps_files()):
+					# next modules need labels, defined in this module
+					self._preprocessor.set_env(future.result()[2])
+					_flush()
+			_flush()
+
+	def _prepare_module(self, instruction:ts.QspModule) -> ModuleQSP:
+		""" Read module files. Location of scanned files is added to start module. """
 		qsp_module = ModuleQSP(instruction)
 		module_path = instruction.get('module', '')
 
 		if self._scan_file and module_path == self._start_module:
 			qsp_module.add_qsps_file(self._scan_file)
 			self._scan_file = None
-
-		# preprocessor work if not Hard-off mode
-		if self._preprocessor:
-			for src_file in qsp_module.qsps_files():
-				src_file.set_src_lines(self._preprocessor.pp_this_lines(src_file.get_src()))
-				if self._preprocessor.errored(): print(f'^^^^^^ Error in file: "{src_file.file_path()}"')
-
-		if instruction.get('start_qsploc_file', ''):
-			qsp_module.restand_first_loc()
-
-		src_lines = qsp_module.src_lines()
-
-		converter = self._converter(module_path,
-									self._save_temp_files, self._conv_path, self._conv_args)
-		converter.convert_lines(src_lines)
-		converter.save_to_file()
-		converter.handle_temp_file()
+		return qsp_module
+
+	def _module_is_actual(self, module_path:Path, fingerprint:ts.HashMD5) -> bool:
+		""" Module is not changed from last build. Restore labels, defined in the module. """
+		if not (self._manifest and self._manifest.is_actual(module_path, fingerprint)):
+			return False
+		# Labels, defined in the module, are needed to next modules.
+		if self._preprocessor: self._preprocessor.set_env(self._manifest.pp_env(module_path))
+		return True
+
+	def _register_module(self, module_path:Path, fingerprint:ts.HashMD5,
+							errored:bool, pp_env:PpLabels) -> None:
+		""" Save fingerprint of built module and labels after it into manifest. """
+		if not self._manifest: return
+		if errored:
+			# errors must be shown on next build too
+			self._manifest.forget(module_path)
+		else:
+			self._manifest.update(module_path, fingerprint, pp_env)
+
+	def _module_fingerprint(self, instruction:ts.QspModule, qsp_module:ModuleQSP) -> ts.HashMD5:
+		""" Hash of all, that affects output of module: sources, settings, preprocessor labels. """
+		inputs:Dict[str, Any] = {
+			'version': BuildManifest.VERSION,
+			'files': [[src.file_path(), BuildManifest.lines_hash(src.get_src())]
+						for src in qsp_module.qsps_files()],
+			'start_qsploc_file': instruction.get('start_qsploc_file', ''),
+			'preprocessor': self._root['preprocessor'],
+			'pp_env': self._preprocessor.snapshot().content_hash() if self._preprocessor else '',
+			'converter': [self._conv_api, self._conv_path, self._conv_args],
+			'save_temp_files': self._save_temp_files
+		}
+		return BuildManifest.fingerprint(inputs)
+
+# Building of module is in module-level functions, because it runs in worker-processes too.
+
+_WorkerTask = Tuple[ModuleQSP, ts.QspModule, ts.PpMode, PpLabels, str, bool, Path, ts.AppParam]
+_WorkerResult = Tuple[str, bool, PpLabels]
+
+def _build_module(qsp_module:ModuleQSP, instruction:ts.QspModule,
+					preprocessor:Optional[QspsPP], converter_type:Type[QspsToQspConverter],
+					save_temp_files:bool, conv_path:Path, conv_args:ts.AppParam) -> bool:
+	""" Preprocess, convert and save module. Return True, if preprocessor or converter found errors. """
+	module_path = instruction.get('module', '')
+	# preprocessor work if not Hard-off mode
+	pp_errored = False
+	if preprocessor:
+		for src_file in qsp_module.qsps_files():
+			src_file.set_src_lines(preprocessor.pp_this_lines(src_file.get_src(), src_file.file_path()))
+			if preprocessor.errored():
+				print(f'^^^^^^ Error in file: "{src_file.file_path()}"')
+				pp_errored = True
+
+	if instruction.get('start_qsploc_file', ''):
+		qsp_module.restand_first_loc()
+
+	src_lines = qsp_module.src_lines()
+
+	converter = converter_type(module_path, save_temp_files, conv_path, conv_args)
+	converter.convert_lines(src_lines)
+	converter.save_to_file()
+	converter.handle_temp_file()
+	return pp_errored or converter.errored()
+
+def _build_module_in_worker(task:_WorkerTask) -> _WorkerResult:
+	""" Build module in worker-process. Console output is returned to main process. """
+	qsp_module, instruction, pp_mode, pp_env, conv_api, save_temp_files, conv_path, conv_args = task
+	preprocessor:Optional[QspsPP] = None
+	if pp_mode != 'Hard-off':
+		preprocessor = QspsPP(pp_mode)
+		preprocessor.set_env(pp_env)
+	converter_type = {'builtin': QspsToQspBuiltinConv}.get(conv_api, QspsToQspOuterConv)
+	output = io.StringIO()
+	with contextlib.redirect_stdout(output):
+		errored = _build_module(qsp_module, instruction, preprocessor, converter_type,
+									save_temp_files, conv_path, conv_args)
+	return output.getvalue(), errored, (preprocessor.get_env() if preprocessor else {})
@@ -0,0 +1,58 @@
+from typing import Any, Dict, List, Tuple, Union
+
+LineNum = int
+CharNum = int
+Point = Tuple[LineNum, CharNum]
+
+TokenNode = Dict[str, Union[str, List[int], bool]]
+
+class CompactToken:
+    """
+        Общий класс токенов сканеров qSpy. Поля хранятся в слотах, без словаря
+        атрибутов, а начало лексемы - двумя числами, без кортежа.
+    """
+    __slots__ = ('ttype', 'lexeme', 'line', 'char')
+
+    def __init__(self, ttype:Any, lexeme:str, lexeme_start:Point) -> None:
+        self.ttype = ttype
+        self.lexeme:str = lexeme # вся лексема целиком
+        self.line:LineNum # строка и номер символа в которой токен находится
+        self.char:CharNum
+        self.line, self.char = lexeme_start
+
+    @property
+    def lexeme_start(self) -> Point:
+        return (self.line, self.char)
+
+    @lexeme_start.setter
+    def lexeme_start(self, point:Point) -> None:
+        self.line, self.char = point
+
+    def get_as_node(self) -> TokenNode:
+        return {
+            "token-type": self.ttype.name,  # название константы вместо номера
+            'lexeme': self.lexeme,
+            'lexeme_start': [self.line, self.char],
+        }
+
+    def get_end_pos(self) -> Point:
+        """ line_num, char_num after last"""
+        return (self.line, self.char + len(self.lexeme))
+
+    def _fields(self) -> Tuple[Any, ...]:
+        return (self.ttype, self.lexeme, self.line, self.char)
+
+    def __eq__(self, other:object) -> bool:
+        if other.__class__ is not self.__class__: return NotImplemented
+        return self._fields() == other._fields() # type: ignore
+
+    __hash__ = None # type: ignore # as of dataclass
+
+    def __repr__(self) -> str:
+        fields = [f'ttype={self.ttype!r}', f'lexeme={self.lexeme!r}', f'lexeme_start={self.lexeme_start!r}']
+        # fields of subclasses follow, as in repr of dataclass (error messages show it)
+        for cls in reversed(self.__class__.__mro__):
+            if cls is CompactToken or not issubclass(cls, CompactToken): continue
+            slots:Tuple[str, ...] = cls.__dict__.get('__slots__', ())
+            fields.extend(f'{name}={getattr(self, name)!r}' for name in slots)
+        return f'{self.__class__.__name__}({", ".join(fields)})'
@@ -6,6 +6,12 @@ __all__ = [
 	'QSP_MSG',
 	'QSP_ERROR_MSG',
 	'PROJECT_FILE_NAME',
+	'BUILD_MANIFEST_FILE_NAME',
+	'BASE_CACHE_FILE_NAME',
+	'PP_CACHE_FILE_NAME',
+	'PP_PROFILE_FILE_NAME',
+	'WS_FILE_NAME',
+	'WS_DB_FILE_NAME',
 	'PLAYER_PATH',
 	'CONVERTER',
 	'SCAN_FILES_LOCNAME']
@@ -14,6 +20,12 @@ from types import MappingProxyType
 from .plugtypes import JsonScheme
 
 PROJECT_FILE_NAME = 'qsp-project.json'
+BUILD_MANIFEST_FILE_NAME = 'qsp-project-build.json'
+BASE_CACHE_FILE_NAME = 'qsp-project-base-cache.json'
+PP_CACHE_FILE_NAME = 'qsp-project-pp-cache.json'
+PP_PROFILE_FILE_NAME = 'qsp-pp-profile.json'
+WS_FILE_NAME = 'qsp-project-workspace.json'
+WS_DB_FILE_NAME = 'qsp-project-workspace.db'
 
 # TODO: player-path only for windows. Make for other OS.
 PLAYER_PATH = os.path.join("C:\\", "Program Files", "QSP Classic 5.9.5", "bin", "qspgui.exe")
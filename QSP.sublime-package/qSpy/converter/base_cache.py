@@ -0,0 +1,104 @@
+import os
+import json
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+from .tps import Action, MultilineDesc, Path, QspsLine
+
+BaseBlock = Tuple[MultilineDesc, List[Action]]
+
+class BaseBlockCache():
+    """
+        Compiled base blocks of locations (description and actions) by hash
+        of base code. Base blocks almost never change between builds.
+    """
+    VERSION = 1
+    # cache lives for all session of plugin_host, so least recently used blocks
+    # are removed from memory and from disk, when there are more blocks
+    MAX_ENTRIES = 20000
+
+    def __init__(self) -> None:
+        self._blocks:Dict[str, BaseBlock] = {} # from least to most recently used
+        self._changed:bool = False
+        self.hits:int = 0
+        self.misses:int = 0
+
+    def get(self, base_code:List[QspsLine]) -> Optional[BaseBlock]:
+        """ Copy of compiled base block, or None. """
+        key = self.key(base_code)
+        block = self._blocks.pop(key, None)
+        if block is None:
+            self.misses += 1
+            return None
+        self._blocks[key] = block # now it is most recently used
+        self.hits += 1
+        return _copy_block(block)
+
+    def put(self, base_code:List[QspsLine], desc:MultilineDesc, actions:List[Action]) -> None:
+        key = self.key(base_code)
+        self._blocks.pop(key, None)
+        self._blocks[key] = _copy_block((desc, actions))
+        self._prune()
+        self._changed = True
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._blocks)}
+
+    def reset_stats(self) -> None:
+        self.hits = self.misses = 0
+
+    def load(self, cache_file:Path) -> None:
+        """ Add blocks from disk-cache. Broken or old cache-file is ignored. """
+        if not os.path.isfile(cache_file): return
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as fp:
+                cache = json.load(fp)
+        except (OSError, ValueError):
+            return
+        if not isinstance(cache, dict) or cache.get('version') != self.VERSION: return
+        try:
+            blocks = {str(key): _checked_block(desc, actions)
+                for key, (desc, actions) in cache['blocks'].items()}
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return # blocks of session are kept, cache-file is rewritten by next save
+        # blocks of session are used more recently, than blocks from disk
+        blocks.update(self._blocks)
+        self._blocks = blocks
+        self._prune()
+
+    def save(self, cache_file:Path) -> None:
+        if not self._changed and os.path.isfile(cache_file): return
+        try:
+            with open(cache_file, 'w', encoding='utf-8') as fp:
+                json.dump({'version': self.VERSION, 'blocks': self._blocks}, fp, ensure_ascii=False)
+            self._changed = False
+        except OSError as e:
+            print(f'[110] Base-block cache is not saved. Error: "{e}".')
+
+    def _prune(self) -> None:
+        while len(self._blocks) > self.MAX_ENTRIES:
+            del self._blocks[next(iter(self._blocks))]
+            self._changed = True
+
+    @staticmethod
+    def key(base_code:List[QspsLine]) -> str:
+        return hashlib.md5(''.join(base_code).encode('utf-8', 'surrogatepass')).hexdigest()
+
+def _copy_block(block:BaseBlock) -> BaseBlock:
+    """ Converter changes code of actions, so cache never gives its own lists. """
+    desc, actions = block
+    return desc, [{'image': a['image'], 'name': a['name'], 'code': a['code'][:]} for a in actions]
+
+def _checked_block(desc:MultilineDesc, actions:List[Action]) -> BaseBlock:
+    """ Block from cache-file. ValueError, if it is not a block of this version. """
+    if not isinstance(desc, str) or not isinstance(actions, list):
+        raise ValueError('Wrong base block.')
+    for action in actions:
+        if not (isinstance(action['image'], str) and isinstance(action['name'], str)
+                and isinstance(action['code'], list)
+                and all(isinstance(line, str) for line in action['code'])):
+            raise ValueError('Wrong action of base block.')
+    return desc, actions
+
+# cache of session
+base_cache = BaseBlockCache()
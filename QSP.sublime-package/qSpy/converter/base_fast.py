@@ -0,0 +1,138 @@
+import re
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+
+from .tps import Action, MultilineDesc, QspsLine
+
+# Common base blocks are only `*P '...'` lines and `ACT '...':` ... `END` blocks.
+# They are recognised here without BaseScanner, BaseParser and BaseInt.
+# Anything unusual returns None, and the full pipeline does the work.
+
+_STRING = r"""('(?:[^']|'')*'|"(?:[^"]|"")*")"""
+_WORD_END = r'(?![\w$%.#])' # chars of identifiers in BaseScanner
+
+# statements of base block from start of line
+_BLANK = re.compile(r'[ \t]*(?:\n|\Z)')
+_COMMENT = re.compile(r'[ \t]*![^\'"{}\n]*(?:\n|\Z)')
+_DESC = re.compile(r'[ \t]*\*p(?=[ \t])[ \t]*' + _STRING + r'[ \t]*(?:\n|\Z)', re.I)
+_ACT = re.compile(r'[ \t]*act' + _WORD_END + r'[ \t]*' + _STRING
+	+ r'(?:[ \t]*,[ \t]*' + _STRING + r')?[ \t]*:[ \t]*\n', re.I)
+
+# lines of action code
+_CODE_END = re.compile(r'[ \t]*end' + _WORD_END + r'[^&{}\'"\n]*(?:\n|\Z)', re.I)
+_CODE_IF = re.compile(r'[ \t]*if' + _WORD_END, re.I)
+_CODE_COMMENT = re.compile(r'[ \t]*![^\'"{}\n]*(?:\n|\Z)')
+_CODE_SIGN = re.compile(r"""["'(){}\[\]:]|(?<![\w$%.#])(?:if|act|loop|end)""" + _WORD_END, re.I)
+
+_CLOSE = {')': '(', ']': '[', '}': '{'}
+
+def split_simple_base(base_code:List[QspsLine]) -> Optional[Tuple[MultilineDesc, List[Action]]]:
+	""" Description and actions of simple base block, or None for the full pipeline. """
+	text = ''.join(base_code)
+	starts:List[int] = [0] # offsets of lines in text
+	for line in base_code[:-1]: starts.append(starts[-1] + len(line))
+	desc_lines:List[str] = []
+	actions:List[Action] = []
+	pos, end = 0, len(text)
+	while pos < end:
+		match = _BLANK.match(text, pos) or _COMMENT.match(text, pos)
+		if match:
+			pos = match.end()
+			continue
+		match = _DESC.match(text, pos)
+		if match:
+			desc_lines.append(_string_value(match.group(1)))
+			pos = match.end()
+			continue
+		match = _ACT.match(text, pos)
+		if not match: return None
+		start_line = bisect_right(starts, pos) - 1
+		code_line = bisect_right(starts, match.end()) - 1
+		end_line = _find_code_end(base_code, code_line)
+		if end_line is None: return None
+		image = _string_value(match.group(2)) if match.group(2) else ''
+		actions.append({'image': image, 'name': _string_value(match.group(1)),
+			'code': base_code[start_line+1:end_line]})
+		if end_line + 1 >= len(base_code): break
+		pos = starts[end_line + 1]
+	return ''.join(desc_lines), actions
+
+def _string_value(literal:str) -> str:
+	quote = literal[0]
+	return literal[1:-1].replace(quote * 2, quote)
+
+def _find_code_end(lines:List[QspsLine], first:int) -> Optional[int]:
+	""" Number of END-line, which closes action code. """
+	stack:List[str] = [] # open quote or brackets
+	blocks = 0 # multiline IF-blocks in code
+	for number in range(first, len(lines)):
+		line = lines[number]
+		pos = 0
+		if not stack:
+			if _CODE_END.match(line):
+				if not blocks: return number
+				blocks -= 1
+				continue
+			if _CODE_COMMENT.match(line): continue
+			match = _CODE_IF.match(line)
+			if match:
+				rest = _then_rest(line, match.end())
+				if rest is None: return None
+				if not rest.strip() or rest.lstrip().startswith('!'):
+					if _CODE_COMMENT.match(rest) is None and rest.strip(): return None
+					blocks += 1
+					continue
+				pos = len(line) - len(rest)
+		if not _scan_code(line, pos, stack): return None
+	return None
+
+def _then_rest(line:QspsLine, pos:int) -> Optional[str]:
+	""" Rest of line after THEN of IF-statement. """
+	stack:List[str] = []
+	while True:
+		match = _CODE_SIGN.search(line, pos)
+		if match is None: return None
+		char = match.group()
+		pos = match.end()
+		if char == ':' and not stack: return line[pos:]
+		if len(char) > 1: return None # keyword in condition
+		if not _push_sign(char, stack): return None
+		if stack and stack[-1] in ('"', "'"):
+			pos = _skip_string(line, pos, stack)
+			if pos < 0: return None
+
+def _scan_code(line:QspsLine, pos:int, stack:List[str]) -> bool:
+	""" Follow quotes and brackets of code line. False for unusual code. """
+	while True:
+		if stack and stack[-1] in ('"', "'"):
+			pos = _skip_string(line, pos, stack)
+			if pos < 0: return True # string continues on next line
+		match = _CODE_SIGN.search(line, pos)
+		if match is None: return True
+		char = match.group()
+		pos = match.end()
+		if len(char) > 1: return False # keyword not at start of line
+		if char == ':': continue
+		if not _push_sign(char, stack): return False
+
+def _push_sign(char:str, stack:List[str]) -> bool:
+	if stack and stack[-1] == '{' and not char in ('{', '}', '"', "'"):
+		return True # in braces only braces and strings count
+	if char in _CLOSE:
+		if not stack or stack[-1] != _CLOSE[char]: return False
+		stack.pop()
+	else:
+		stack.append(char)
+	return True
+
+def _skip_string(line:QspsLine, pos:int, stack:List[str]) -> int:
+	""" Position after closing quote, or -1. Doubled quote does not close string. """
+	quote = stack[-1]
+	while True:
+		pos = line.find(quote, pos)
+		if pos == -1: return -1
+		if line[pos+1:pos+2] == quote:
+			pos += 2
+			continue
+		stack.pop()
+		return pos + 1
@@ -24,14 +24,20 @@ class BaseInt(stm.BaseVisitor[AstNode]):
         self._actions:List[Action] = []
         self._desc_lines:List[str] = []
 
+        self._error_check:bool = False
+
     def run(self) -> None:
         """Обработка дерева разбора """
         for stmt in self._stmts:
             try:
                 stmt.accept(self)
             except RuntimeIntError as e:
+                self._error_check = True
                 print(e)
 
+    def errored(self) -> bool:
+        return self._error_check
+
     def actions(self) -> List[Action]:
         return self._actions
 
@@ -134,7 +140,9 @@ class BaseInt(stm.BaseVisitor[AstNode]):
 
     # обработчик ошибок. Пока просто выводим в консоль.
     def _error(self, message:str) -> None:
+        self._error_check = True
         print(f"Err. {message}.")
 
     def _logic_error(self, message:str) -> None:
+        self._error_check = True
         print(f"Logic error: {message}. Please, report to the developer.")
\ No newline at end of file
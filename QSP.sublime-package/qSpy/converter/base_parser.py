@@ -19,6 +19,7 @@ class BaseParser:
 
     def __init__(self, tokens:List[Tkn]) -> None:
         self._tokens:List[Tkn] = tokens
+        self._error_check:bool = False
 
         # валидация цепочки токенов
         if not self._tokens:
@@ -41,6 +42,9 @@ class BaseParser:
     def get_statements(self) -> List[BaseStmt]:
         return self._statements
 
+    def errored(self) -> bool:
+        return self._error_check
+
     def parse(self) -> None:
         """ Публичная функция вызова парсера. """
         # разбиваем файл на операторы. При этом операторы могут быть блочные
@@ -467,7 +471,9 @@ class BaseParser:
     def _error(self, message:str) -> None:
         name = self._curtok.ttype.name
         coords = self._curtok.lexeme_start
+        self._error_check = True
         print(f"Dirs-Parser Err. {message}: {name} ({self._curtok_num}) [{coords}].")
 
     def _logic_error(self, message:str) -> None:
+        self._error_check = True
         print(f"Dirs-parser Logic error: {message}. Please, report to the developer.")
\ No newline at end of file
@@ -46,6 +46,11 @@ class BaseScanner:
 
         self._curlexeme:List[str] = []
 
+        self._error_check:bool = False
+
+    def errored(self) -> bool:
+        return self._error_check
+
     def get_tokens(self) -> List[Tkn]:
         return self._tokens
 
@@ -268,8 +273,10 @@ class BaseScanner:
 
     # обработчик ошибок. Пока просто выводим в консоль.
     def _error(self, message:str) -> None:
+        self._error_check = True
         print(f"Dirs-Scanner. {message}: ({self._line_num}, {self._current}).")
 
     def _logic_error(self, message:str) -> None:
+        self._error_check = True
         print(f"Dirs-Scanner Logic error: {message}. Please, report to the developer.")
 
@@ -1,13 +1,6 @@
-from dataclasses import dataclass
-from typing import Tuple, Dict, Union, List
-
 from enum import (IntEnum, auto)
 
-LineNum = int
-CharNum = int
-Point = Tuple[LineNum, CharNum]
-
-TokenNode = Dict[str, Union[str, List[int], bool]]
+from ..compact_token import CompactToken, LineNum, CharNum, Point, TokenNode
 
 # ------------------------------ Tokens Types ------------------------------ #
 class BaseTokenType(IntEnum):
@@ -62,20 +55,6 @@ class BaseTokenType(IntEnum):
     EOF = auto()
 
 # ---------------------------- Token Class ------------------------------ #
-@dataclass
-class BaseToken:
+class BaseToken(CompactToken):
+    __slots__ = ()
     ttype:BaseTokenType
-    lexeme:str # вся лексема целиком
-    lexeme_start:Point # строка и номер символа в которой токен находится
-
-    def get_as_node(self) -> TokenNode:
-        return {
-            "token-type": self.ttype.name,  # название константы вместо номера
-            'lexeme': self.lexeme,
-            'lexeme_start': list(self.lexeme_start),
-        }
-
-    def get_end_pos(self) -> Point:
-        """ line_num, char_num after last"""
-        line, char = self.lexeme_start
-        return (line, char + len(self.lexeme))
@@ -1,17 +1,16 @@
 from abc import ABC, abstractmethod
 import os, subprocess
-import concurrent.futures
-# import threading
 
 from typing import List, Optional
 
 from .tps import (
-    QspsLine, Path, GameChar, QspsChar, CharCache
+    QspsLine, Path, GameChar, QspsChar
 )
 from .qsps_file import QspsFile
 from .qsp_location import QspsLoc
 
-from .tools import del_first_pref, QSP_CODREMOV
+from .tools import del_first_pref
+from .qsp_codec import encode_qsp_text, encode_qsp_fields
 
 AppPath = Path
 AppParam = str
@@ -26,6 +25,12 @@ class QspsToQspConverter(ABC):
         self._module_path:Path = output_file
         self._temp_file_path:Path = os.path.splitext(output_file)[0]+'.txt'
 
+        self._error_check:bool = False
+
+    def errored(self) -> bool:
+        """ Errors were printed, while lines were converted. """
+        return self._error_check
+
     @abstractmethod
     def convert_lines(self, qsps_lines:List[QspsLine]) -> List[GameLine]:
         ...
@@ -49,8 +54,6 @@ class QspsToQspBuiltinConv(QspsToQspConverter):
     #   - Получить файл, сконвертировать сохранить: .convert_file()
     #   - Получить строки, сконвертировать, сохранить: .convert_lines() + .save_to_file()
 
-    _char_cache:CharCache = {}
-
     def __init__(self, output_file:Path, save_temp_files:bool, *args:str) -> None:
         super().__init__(output_file, save_temp_files)
 
@@ -64,53 +67,9 @@ class QspsToQspBuiltinConv(QspsToQspConverter):
         # header of qsp-file
         self._game_lines.append('QSPGAME\n')
         self._game_lines.append('SublimeText QSP-Package\n')
-        self._game_lines.append(self.encode_qsps_line('No')+'\n')
-        self._game_lines.append(self.encode_qsps_line(str(len(locs)))+'\n')
-        # decode locations (для диагностики потоков: список имён потоков, в которых выполнялась _encode_location)
-        # _thread_names_used: List[str] = []
-
-        def _encode_location(loc:QspsLoc) -> List[GameLine]:
-            # _thread_names_used.append(threading.current_thread().name)
-            loc.split_base()
-            name = loc.name()
-            desc = loc.desc()
-            actions = loc.actions()
-            run_on_visit = loc.run_on_visit()
-            if run_on_visit:
-                run_on_visit[-1] = run_on_visit[-1][:-1] # crunch for extra \n-char in end lines
-                code_lines:str = ''.join(run_on_visit).replace('\n', '\r\n')
-            else:
-                code_lines = ''
-            out_lines:List[GameLine] = []
-            out_lines.append(QspsToQspBuiltinConv.encode_qsps_line(name))
-            out_lines.append('\n')
-            out_lines.append(QspsToQspBuiltinConv.encode_qsps_line(desc))
-            out_lines.append('\n')
-            out_lines.append(QspsToQspBuiltinConv.encode_qsps_line(code_lines))
-            out_lines.append('\n')
-            out_lines.append(QspsToQspBuiltinConv.encode_qsps_line(str(len(actions))))
-            out_lines.append('\n')
-            for act in actions:
-                out_lines.append(QspsToQspBuiltinConv.encode_qsps_line(act['image']))
-                out_lines.append('\n')
-                out_lines.append(QspsToQspBuiltinConv.encode_qsps_line(act['name']))
-                out_lines.append('\n')
-                act_code = del_first_pref(act['code'])
-                act_code[-1] = act_code[-1][:-1]
-                out_lines.append(QspsToQspBuiltinConv.encode_qsps_line(''.join(act_code).replace('\n', '\r\n')))#))
-                out_lines.append('\n')
-            return out_lines
-        with concurrent.futures.ThreadPoolExecutor(max_workers=32) as executor:
-            # Используем executor.map для получения результатов в порядке отправки задач
-            # Если _encode_location возвращает список строк для каждой локации
-            results = executor.map(_encode_location, locs)
-            for encoded_lines in results:
-                self._game_lines.extend(encoded_lines)
-        # Диагностика: сколько потоков реально обработало локации
-        # _unique = len(set(_thread_names_used))
-        # print(f'[QspsToQsp] Локаций: {len(locs)}, уникальных потоков: {_unique}, имена: {sorted(set(_thread_names_used))}')
-        # for location in locs:
-        #     _encode_location(location)
+        self._game_lines.append(encode_qsp_fields(['No', str(len(locs))]))
+        self._game_lines.extend(_encode_location(loc) for loc in locs)
+        self._error_check = any(loc.base_errored() for loc in locs)
         return self._game_lines
 
     def convert_lines(self, qsps_lines:List[QspsLine]) -> List[GameLine]:
@@ -131,7 +90,8 @@ class QspsToQspBuiltinConv(QspsToQspConverter):
         if not output_file: output_file = self._module_path
         output_folder:Path = os.path.dirname(output_file)
         os.makedirs(output_folder, exist_ok=True)
-        with open(output_file, 'w', encoding='utf-16le') as file:
+        # ciphered text can contain lone surrogates, player reads them as UTF-16 units
+        with open(output_file, 'w', encoding='utf-16le', errors='surrogatepass') as file:
             file.writelines(self._game_lines)
 
     def handle_temp_file(self) -> None:
@@ -142,20 +102,32 @@ class QspsToQspBuiltinConv(QspsToQspConverter):
     @staticmethod
     def encode_char(point:QspsChar) -> GameChar:
         """ Encode char. """
-        return chr(-QSP_CODREMOV) if ord(point) == QSP_CODREMOV else chr(ord(point) - QSP_CODREMOV)
+        return encode_qsp_text(point)
 
     @staticmethod
     def encode_qsps_line(qsps_line:QspsLine) -> GameLine:
         """ Decode qsps_line to qsp_coded_line """
-        cache = QspsToQspBuiltinConv._char_cache
-        encode_char = QspsToQspBuiltinConv.encode_char
-
-        exit_line:List[GameChar] = []
-        for point in qsps_line:
-            if point not in cache:
-                cache[point] = encode_char(point)
-            exit_line.append(cache[point])
-        return ''.join(exit_line)
+        return encode_qsp_text(qsps_line)
+
+def _encode_location(loc:QspsLoc) -> GameLine:
+    """ Split base of location and encode all fields of location. """
+    loc.split_base()
+    name = loc.name()
+    desc = loc.desc()
+    actions = loc.actions()
+    run_on_visit = loc.run_on_visit()
+    if run_on_visit:
+        run_on_visit[-1] = run_on_visit[-1][:-1] # crunch for extra \n-char in end lines
+        code_lines:str = ''.join(run_on_visit).replace('\n', '\r\n')
+    else:
+        code_lines = ''
+    fields:List[QspsLine] = [name, desc, code_lines, str(len(actions))]
+    for act in actions:
+        act_code = del_first_pref(act['code'])
+        act_code[-1] = act_code[-1][:-1]
+        fields.extend((act['image'], act['name'], ''.join(act_code).replace('\n', '\r\n')))
+    # all fields of location are ciphered by one call
+    return encode_qsp_fields(fields)
 
 class QspsToQspOuterConv(QspsToQspConverter):
     """ Обёртка для запуска внешнего конвертера, с ориентированием на txt2gam """
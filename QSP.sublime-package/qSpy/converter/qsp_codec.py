@@ -0,0 +1,104 @@
+# QSP-cipher of game strings.
+# Every UTF-16 code unit of string is shifted by QSP_CODREMOV, as does the player:
+#   encode: unit - QSP_CODREMOV (16 bits), but chr(QSP_CODREMOV) -> 0xFFFB
+#   decode: unit + QSP_CODREMOV (16 bits), but 0xFFFB -> chr(QSP_CODREMOV)
+# String is shifted at once as one big integer, where every 16 bits are one lane
+# (SIMD within a register), so there is no Python-loop by chars.
+import codecs
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from .tps import GameLine, QspsLine
+from .tools import QSP_CODREMOV
+
+CODEC_NAME = 'qsp'
+FIELD_SEP = chr(ord('\n') + QSP_CODREMOV) # it is '\n' after cipher
+
+_CHUNK_UNITS = 1 << 14 # shift long strings by chunks, so temp integers stay small
+
+# cp1251-games are ciphered by bytes, not by UTF-16 units
+_CP1251_DECODE_TABLE = bytes(
+	QSP_CODREMOV if b == (-QSP_CODREMOV) & 0xFF else (b + QSP_CODREMOV) & 0xFF
+	for b in range(256))
+
+@lru_cache(maxsize=64)
+def _lanes_masks(units:int) -> Tuple[int, int, int]:
+	""" High bits of lanes, low bits of lanes, QSP_CODREMOV in every lane. """
+	high = int.from_bytes(b'\x00\x80' * units, 'little')
+	low = int.from_bytes(b'\xff\x7f' * units, 'little')
+	shift = int.from_bytes(QSP_CODREMOV.to_bytes(2, 'little') * units, 'little')
+	return high, low, shift
+
+def _shift_chunk(raw:bytes, sub:bool) -> bytes:
+	""" Add or subtract QSP_CODREMOV for every 16-bits lane modulo 2**16. """
+	high, low, shift = _lanes_masks(len(raw) // 2)
+	x = int.from_bytes(raw, 'little')
+	if sub:
+		z = ((x | high) - shift) ^ ((x ^ high) & high)
+	else:
+		z = ((x & low) + shift) ^ (x & high)
+	return z.to_bytes(len(raw), 'little')
+
+def _shift_units(text:str, sub:bool) -> str:
+	raw = text.encode('utf-16-le', 'surrogatepass')
+	size = _CHUNK_UNITS * 2
+	if len(raw) <= size:
+		out = _shift_chunk(raw, sub)
+	else:
+		out = b''.join(_shift_chunk(raw[i:i+size], sub) for i in range(0, len(raw), size))
+	return out.decode('utf-16-le', 'surrogatepass')
+
+def encode_qsp_text(qsps_text:QspsLine) -> GameLine:
+	""" Cipher text for game-file. """
+	if not qsps_text: return qsps_text
+	# chr(QSP_CODREMOV) becomes -QSP_CODREMOV, as chr(0)
+	return _shift_units(qsps_text.replace(chr(QSP_CODREMOV), '\x00'), sub=True)
+
+def encode_qsp_fields(fields:List[QspsLine]) -> GameLine:
+	""" Cipher fields for game-file, every field on own line. """
+	# Char after cipher is independent from neighbours, and FIELD_SEP becomes '\n',
+	# so all fields are ciphered by one call.
+	return encode_qsp_text(FIELD_SEP.join(fields) + FIELD_SEP)
+
+def decode_qsp_text(game_text:GameLine) -> QspsLine:
+	""" Decipher text from game-file. """
+	if not game_text: return game_text
+	# -QSP_CODREMOV becomes chr(0) after shift, but it is chr(QSP_CODREMOV)
+	return _shift_units(game_text, sub=False).replace('\x00', chr(QSP_CODREMOV))
+
+def decode_cp1251_qsp_text(game_text:GameLine) -> QspsLine:
+	""" Decipher text from game-file in cp1251. """
+	return game_text.encode('cp1251').translate(_CP1251_DECODE_TABLE).decode('cp1251')
+
+# codec: str <-> UTF-16-LE bytes of ciphered text, as it is in the game-file.
+# Ciphered text can contain lone surrogates, so they always pass, and other
+# handlers of errors would give other text than the player reads.
+
+def _check_errors(errors:str) -> None:
+	if errors != 'strict':
+		raise ValueError(f"Codec '{CODEC_NAME}' supports only 'strict' errors, not '{errors}'.")
+
+def _encode(qsps_text:str, errors:str='strict') -> Tuple[bytes, int]:
+	_check_errors(errors)
+	return encode_qsp_text(qsps_text).encode('utf-16-le', 'surrogatepass'), len(qsps_text)
+
+def _decode(game_bytes:bytes, errors:str='strict') -> Tuple[str, int]:
+	_check_errors(errors)
+	game_text = bytes(game_bytes).decode('utf-16-le', 'surrogatepass')
+	return decode_qsp_text(game_text), len(game_bytes)
+
+def _search(name:str) -> Optional[codecs.CodecInfo]:
+	if name != CODEC_NAME: return None
+	return codecs.CodecInfo(_encode, _decode, name=CODEC_NAME)
+
+def _register() -> None:
+	"""
+		Module is executed again on every reload of plugin, but search function is
+		registered once for interpreter. Python caches found codecs by name anyway.
+	"""
+	try:
+		codecs.lookup(CODEC_NAME)
+	except LookupError:
+		codecs.register(_search)
+
+_register()
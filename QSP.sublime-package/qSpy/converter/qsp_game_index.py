@@ -0,0 +1,118 @@
+# python 3.8
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional
+
+from .tps import Action, GameLine, GamePassword, LocName, QspLocation, QspsLine
+
+GameDecoder = Callable[[GameLine], QspsLine]
+
+class QspGameIndex():
+	""" Index of locations in game-file fields.
+	Names of locations are decoded on indexing, other fields of location
+	are decoded only when location is accessed. """
+
+	def __init__(self, fields:List[GameLine], decoder:GameDecoder) -> None:
+		""" Fields are lines of game-file without line-ends, header included. """
+		self._fields:List[GameLine] = fields
+		self._decode:GameDecoder = decoder
+
+		self._password:GamePassword = 'No'
+		self._location_count:int = 0 # count of locations from header of game
+
+		self._starts:List[int] = [] # index of name-field for every location
+		self._names:List[LocName] = []
+		self._by_name:Dict[LocName, int] = {} # first location with name
+
+		self._index_locations()
+
+	def _index_locations(self) -> None:
+		""" One pass by fields: find start of every location. """
+		fields, decode = self._fields, self._decode
+		self._password = decode(fields[2])
+		self._location_count = int(decode(fields[3]))
+		i, end = 4, len(fields)
+		while i < end:
+			if i + 4 > end:
+				# tail of file is not a location
+				if any(fields[i:]): print(f'Game-file is broken after location {len(self._names)}.')
+				break
+			actions_count = int(decode(fields[i+3]))
+			if i + 4 + actions_count * 3 > end:
+				print(f'Game-file is broken in location {len(self._names)+1}.')
+				break
+			name = decode(fields[i])
+			self._by_name.setdefault(name, len(self._names))
+			self._names.append(name)
+			self._starts.append(i)
+			i += 4 + actions_count * 3
+
+	def __len__(self) -> int:
+		return len(self._starts)
+
+	def password(self) -> GamePassword:
+		return self._password
+
+	def location_count(self) -> int:
+		""" Count of locations from header of game-file. """
+		return self._location_count
+
+	def location_names(self) -> List[LocName]:
+		""" Names of locations in order of game-file. """
+		return self._names[:]
+
+	def location(self, index:int) -> QspLocation:
+		""" Decode location by index. """
+		return decode_location(self._fields, self._starts[index], self._decode, self._names[index])
+
+	def location_by_name(self, name:LocName) -> Optional[QspLocation]:
+		""" Decode first location with name. """
+		index = self._by_name.get(name)
+		return None if index is None else self.location(index)
+
+	def __iter__(self) -> Iterator[QspLocation]:
+		for index in range(len(self._starts)):
+			yield self.location(index)
+
+	@staticmethod
+	def split_fields(game_text:str) -> List[GameLine]:
+		""" Split text of game-file to fields, line-ends as for reading in text mode. """
+		fields = game_text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+		if not fields[-1]: fields.pop() # after last line-end
+		return fields
+
+def decode_location(fields:List[GameLine], start:int, decode:GameDecoder,
+					name:Optional[LocName]=None) -> QspLocation:
+	""" Decode location from fields, where start is index of name-field. """
+	actions:List[Action] = []
+	actions_count = int(decode(fields[start+3]))
+	for j in range(start+4, start+4+actions_count*3, 3):
+		actions.append({
+			"image": decode(fields[j]),
+			"name": decode(fields[j+1]),
+			"code": decode(fields[j+2]).splitlines(keepends=True)
+		})
+	return {
+		"name": decode(fields[start]) if name is None else name,
+		"desc": decode(fields[start+1]),
+		"run_to_visit": decode(fields[start+2]).splitlines(keepends=True),
+		"actions": actions
+	}
+
+def read_locations(fields:Iterator[GameLine], decode:GameDecoder) -> Iterator[QspLocation]:
+	""" Decode locations one by one from fields after header of game-file.
+	Only fields of current location are held. """
+	number = 0
+	for name in fields:
+		loc_fields = [name]
+		loc_fields.extend(islice(fields, 3))
+		if len(loc_fields) == 4:
+			actions_count = int(decode(loc_fields[3]))
+			loc_fields.extend(islice(fields, actions_count * 3))
+			if len(loc_fields) == 4 + actions_count * 3:
+				number += 1
+				yield decode_location(loc_fields, 0, decode)
+				continue
+			print(f'Game-file is broken in location {number+1}.')
+		elif any(loc_fields):
+			print(f'Game-file is broken after location {number}.')
+		return
@@ -8,6 +8,8 @@ from . import base_parser as psr
 from . import base_int as bint
 
 from .tools import parse_string
+from .base_cache import base_cache
+from .base_fast import split_simple_base
 
 # const
 _BASE_OPEN = re.compile(r'^\! BASE\s*$')
@@ -30,6 +32,8 @@ class QspsLoc():
 
         self._run_on_visit:List[QspsLine] = [] # code of Run-on-visit field of location
 
+        self._base_errored:bool = False # scanner, parser or interpreter of base printed errors
+
         self._extract_base()
 
     def name(self) -> LocName:
@@ -44,6 +48,9 @@ class QspsLoc():
     def run_on_visit(self) -> List[QspsLine]:
         return self._run_on_visit
 
+    def base_errored(self) -> bool:
+        return self._base_errored
+
     def change_name(self, new_name:str) -> None:
         """ Set location name """
         self._name = new_name
@@ -89,6 +96,21 @@ class QspsLoc():
     def split_base(self) -> None:
         """ Split base code to description and actions """
         if not self._base_code: return # базового описания или действий нет
+        block = base_cache.get(self._base_code)
+        if block is not None:
+            self._base_desc, self._base_actions = block
+            return
+        block = split_simple_base(self._base_code)
+        if block is not None:
+            self._base_desc, self._base_actions = block
+        else:
+            self._split_base_full()
+        # block with errors is compiled again, so errors are shown on every build
+        if not self._base_errored:
+            base_cache.put(self._base_code, self._base_desc, self._base_actions)
+
+    def _split_base_full(self) -> None:
+        """ Split base code by scanner, parser and interpreter of base block. """
         scanner = scn.BaseScanner(self._base_code)
         scanner.scan_tokens()
         tokens = scanner.get_tokens()
@@ -102,6 +124,7 @@ class QspsLoc():
 
         self._base_desc = intr.desc()
         self._base_actions = intr.actions()
+        self._base_errored = scanner.errored() or parser.errored() or intr.errored()
 
     def get_sources(self) -> List[QspsLine]:
         """ Return qsps-lines of location code, description and actions """
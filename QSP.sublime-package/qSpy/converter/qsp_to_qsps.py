@@ -1,14 +1,18 @@
 # python 3.8
 import os
-from typing import Dict, List, Literal, Optional
+import codecs
+from typing import Iterator, List, Literal, Optional, TextIO
 
-from .tools import QSP_CODREMOV
+from .qsp_codec import decode_qsp_text, decode_cp1251_qsp_text
+from .qsp_game_index import QspGameIndex, read_locations
 from .tps import (
-	Action, MultilineDesc, Path, FileName, QspLocation, GamePassword,
+	Action, MultilineDesc, Path, FileName, QspLocation, GamePassword, LocName,
 	QspsChar, GameChar, GameLine, QspsLine
 )
-CharCache = Dict[GameChar, QspsChar]
-Encoding = Literal['utf-16-le', 'utf-8-sig', 'utf-8', 'cp1251']
+Encoding = Literal['utf-16', 'utf-16-le', 'utf-8-sig', 'utf-8', 'cp1251']
+
+HEAD_SIZE = 512 # bytes of game-file for detection of encoding
+_HEADER = 'QSPGAME'
 
 class ValidationFormatError(ValueError):
 
@@ -21,9 +25,6 @@ class QspToQspsBuiltinConv():
 	"""Converter ".qsp" game files into qsps-files. Based on converter by Werewolf in JS.
 	stand `game-file` and run script for getting qsps-format file"""
 
-	_char_cache:CharCache = {}
-	_cp1251_cache:CharCache = {}
-
 	def __init__(self) -> None:
 		self._input_file:Path = ""
 		self._output_folder:Path = ""  # output folder
@@ -31,14 +32,14 @@ class QspToQspsBuiltinConv():
 		self._output_file:Path = ""  # output file
 
 		self._location_count:int = 0 # number of locations
-		self._locations:List[QspLocation] = [] # list of locations
+		self._locations:List[QspLocation] = [] # list of decoded locations
 		self._password:GamePassword = "No"  # password
 
-		self._game_lines:List[GameLine] = [] # qsp source text
+		self._game_fields:List[GameLine] = [] # qsp source text by fields
+		self._index:Optional[QspGameIndex] = None # locations of game-file
 		self._qsps_lines:List[QspsLine] = []  # qsps text
 
 		self._encoding:Encoding = 'utf-16-le'
-		# self._cache:CharCache = self._char_cache
 		self._encode_handler = QspToQspsBuiltinConv.decode_qsp_line
 
 
@@ -47,43 +48,73 @@ class QspToQspsBuiltinConv():
 		if not os.path.isfile(input_file):
 			print(f'Incorrect file path. {input_file}')
 			return ''
+		self._set_pathes(input_file)
 		try:
-			self.read_from_file(input_file)
+			self.stream_to_file()
 		except ValidationFormatError as e:
 			print(e)
 			return ''
-		self.split_qsp()
-		self.to_qsps()
-		self.save_to_file()
 		return self._output_file
 
+	def stream_to_file(self, output_file:Path='') -> None:
+		""" Decode, convert and write to qsps-file locations one by one.
+		Only one location of game is held in memory. """
+		if not output_file:
+			output_file = self._output_file
+		with open(self._input_file, 'rb') as fp:
+			enc = detect_game_encoding(fp.read(HEAD_SIZE))
+		with open(output_file, 'w', encoding='utf-8') as output:
+			try:
+				self._stream_locations(enc, output)
+			except UnicodeDecodeError as e:
+				# head is valid utf-8, but file is not: it can be cp1251 only
+				if enc != 'utf-8': raise ValidationFormatError(enc, str(e))
+				print(e)
+				output.seek(0)
+				output.truncate()
+				self._stream_locations('cp1251', output)
+
+	def _stream_locations(self, enc:Encoding, output:TextIO) -> None:
+		self._encoding = enc
+		if enc == 'cp1251': self._encode_handler = QspToQspsBuiltinConv.decode_cp1251_qsp_line
+		errors = 'surrogatepass' if enc.startswith('utf-16') else 'strict'
+		with open(self._input_file, 'r', encoding=enc, errors=errors) as fp:
+			fields:Iterator[GameLine] = (line.rstrip('\n') for line in fp)
+			header = [field for _, field in zip(range(4), fields)]
+			if len(header) < 4:
+				print('QSP-Game header is broken. Prove QSP-file.')
+				return
+			self._password = self._decode_string(header[2])
+			self._location_count = self._decode_int(header[3])
+			qsps_header = self._qsps_header()
+			for loc in read_locations(fields, self._encode_handler):
+				if qsps_header:
+					output.writelines(qsps_header)
+					qsps_header = []
+				output.writelines(QspToQspsBuiltinConv.convert_location(loc))
+			if qsps_header:
+				print('QSP-Game is not formed. Prove QSP-file.') # TODO: Error
+
 	def read_from_file(self, input_file:Path='') -> None:
 		""" Read qsp-file and set qsp-source text. """
 		if not os.path.isfile(input_file):
 			print(f'Incorrect file path. {input_file}')
 			return
 		self._set_pathes(input_file)
-		encodings:List[Encoding] = ['utf-16-le', 'utf-8-sig', 'utf-8', 'cp1251']
-		for enc in encodings:
-			try:
-				with open(self._input_file, 'r', encoding=enc) as fp:
-					self._game_lines = list(fp) # при ошибке присваивание не произойдёт
-				if enc == 'cp1251' and self._game_lines and self._game_lines[0].startswith('п»ї'):
-					raise UnicodeDecodeError(
-						'cp1251', b'\xef\xbb\xbf', 0, 3,
-						'UTF-8 BOM detected while decoding as cp1251'
-					)
-				if self._game_lines and not self._game_lines[0].startswith('QSPGAME'):
-					raise ValidationFormatError(enc,
-						f"Header is not QSPGAME while decoding as {self._game_lines[0][:7]}"
-					)
-				self._encoding = enc
-				if enc == 'cp1251': self._encode_handler = QspToQspsBuiltinConv.decode_cp1251_qsp_line
-				return
-			except UnicodeDecodeError as e:
-				print(e)
-				continue
-		print('Unknown game encoding! Use txt2gam utilities for conversion.')
+		with open(self._input_file, 'rb') as fp:
+			game_bytes = fp.read() # file is read once
+		enc = detect_game_encoding(game_bytes[:HEAD_SIZE])
+		try:
+			game_text = game_bytes.decode(enc, 'surrogatepass' if enc.startswith('utf-16') else 'strict')
+		except UnicodeDecodeError as e:
+			# head is valid utf-8, but file is not: it can be cp1251 only
+			if enc != 'utf-8': raise ValidationFormatError(enc, str(e))
+			print(e)
+			enc = 'cp1251'
+			game_text = game_bytes.decode(enc)
+		self._game_fields = QspGameIndex.split_fields(game_text)
+		self._encoding = enc
+		if enc == 'cp1251': self._encode_handler = QspToQspsBuiltinConv.decode_cp1251_qsp_line
 
 	def save_to_file(self, output_file:Path='') -> None:
 		""" Save qsps-text to file. """
@@ -104,71 +135,60 @@ class QspToQspsBuiltinConv():
 		self.qsp_source_text = qsp_source_text
 
 	def split_qsp(self) -> None:
-		""" Split qsp-source on locations and decode them. """
-		qsp_lines = self._game_lines[:]
-		header:GameLine = qsp_lines[0][0:7] # header pop
+		""" Index locations of qsp-source. Fields of locations are decoded on access. """
+		qsp_fields = self._game_fields
+		header:GameLine = qsp_fields[0][0:7] if qsp_fields else '' # header pop
 		if header != 'QSPGAME':
 			print(f'Old qsp format is not support. Use Quest Generator for converting game in new format.')
 			return
+		if len(qsp_fields) < 4:
+			print('QSP-Game header is broken. Prove QSP-file.')
+			return
 
-		if qsp_lines[-1].strip() == '': qsp_lines.pop()
-		self._password = self._decode_string(qsp_lines[2][:-1])
-		self._location_count = self._decode_int(qsp_lines[3][:-1])
-		i = 4
-		while (i < len(qsp_lines)):
-			location_name = self._decode_string(qsp_lines[i][:-1])
-			location_desc = self._decode_string(qsp_lines[i+1][:-1])
-			location_code = self._decode_string(qsp_lines[i+2][:-1])
-			i += 3
-			actions:List[Action] = []
-			actions_count = self._decode_int(qsp_lines[i][:-1])
-			i += 1
-			for _ in range(actions_count):
-				action_image = self._decode_string(qsp_lines[i][:-1])
-				action_name = self._decode_string(qsp_lines[i+1][:-1])
-				action_code = self._decode_string(qsp_lines[i+2][:-1])
-				actions.append({
-					"image": action_image,
-					"name": action_name,
-					"code": action_code.splitlines(keepends=True)
-				})
-				i += 3
-			self._locations.append({
-				"name": location_name,
-				"desc": location_desc,
-				"run_to_visit": location_code.splitlines(keepends=True),
-				"actions": actions
-			})
+		self._index = QspGameIndex(qsp_fields, self._encode_handler)
+		self._password = self._index.password()
+		self._location_count = self._index.location_count()
+		self._locations = []
 
 	def to_qsps(self) -> List[QspsLine]:
 		""" Convert all game's locations to qsps-format. """
-		if not self._locations:
+		if not self._index:
 			print('QSP-Game is not formed. Prove QSP-file.') # TODO: Error
 			return []
 
 		_cl = QspToQspsBuiltinConv.convert_location
-		self._qsps_lines.append(f"QSP-Game {self._file_name}\n")
-		self._qsps_lines.append(f"Число локаций: {self._location_count}\n")
-		self._qsps_lines.append(f"Пароль на исходном файле: {self._password}\n")
-		self._qsps_lines.append('\n')
-		for loc in self._locations:
-			self._qsps_lines.extend(QspToQspsBuiltinConv.convert_location(loc))
+		self._qsps_lines.extend(self._qsps_header())
+		for loc in (self._locations or self._index):
+			self._qsps_lines.extend(_cl(loc))
 		return self._qsps_lines
 
+	def _qsps_header(self) -> List[QspsLine]:
+		return [
+			f"QSP-Game {self._file_name}\n",
+			f"Число локаций: {self._location_count}\n",
+			f"Пароль на исходном файле: {self._password}\n",
+			'\n'
+		]
+
 	def get_locations(self) -> List[QspLocation]:
-		""" Get loactions list """
+		""" Get loactions list. All locations are decoded. """
+		if self._index and not self._locations:
+			self._locations = list(self._index)
 		return self._locations
 
+	def location_names(self) -> List[LocName]:
+		""" Get names of locations without decoding of locations. """
+		return self._index.location_names() if self._index else []
+
 	def get_location(self, index:int) -> QspLocation:
 		""" Get location by index. """
-		return self._locations[index]
+		if self._locations: return self._locations[index]
+		if not self._index: raise IndexError(index)
+		return self._index.location(index)
 
 	def get_location_by_name(self, name:str) -> Optional[QspLocation]:
 		""" Get location by name. """
-		for loc in self._locations:
-			if loc['name'] == name:
-				return loc
-		return None
+		return self._index.location_by_name(name) if self._index else None
 
 	@staticmethod
 	def base_is_exist(location:QspLocation) -> bool:
@@ -252,37 +272,37 @@ class QspToQspsBuiltinConv():
 	@staticmethod
 	def decode_qsp_line(qsp_line:GameLine) -> QspsLine:
 		""" Decode qsp-line. """
-		cache = QspToQspsBuiltinConv._char_cache
-		exit_lines:List[QspsLine] = []
-		_decode_char = QspToQspsBuiltinConv.decode_char
-
-		for char in qsp_line:
-			if char not in cache:
-				cache[char] = _decode_char(char)
-			exit_lines.append(cache[char])
-		return ''.join(exit_lines)
+		return decode_qsp_text(qsp_line)
 
 	@staticmethod
 	def decode_char(point:GameChar) -> QspsChar:
-		return (chr(QSP_CODREMOV) if ord(point) == -QSP_CODREMOV else chr(ord(point) + QSP_CODREMOV))
+		return decode_qsp_text(point)
 
 	@staticmethod
 	def decode_cp1251_qsp_line(qsp_line:GameLine) -> QspsLine:
 		""" Decode qsp-line. """
-		cache = QspToQspsBuiltinConv._cp1251_cache
-		exit_lines:List[QspsLine] = []
-		_decode_char = QspToQspsBuiltinConv.decode_cp1251_char
-
-		for char in qsp_line:
-			if char not in cache:
-				cache[char] = _decode_char(char)
-			exit_lines.append(cache[char])
-		return ''.join(exit_lines)
+		return decode_cp1251_qsp_text(qsp_line)
 
 	@staticmethod
 	def decode_cp1251_char(point:GameChar) -> QspsChar:
-		b = point.encode('cp1251')[0]
-		if b == (-QSP_CODREMOV) & 0xFF:
-			return chr(QSP_CODREMOV)
-		out_b = (b + QSP_CODREMOV) & 0xFF
-		return bytes((out_b,)).decode('cp1251')
+		return decode_cp1251_qsp_text(point)
+
+def detect_game_encoding(head:bytes) -> Encoding:
+	""" Detect encoding of game-file by BOM and QSPGAME-header in first bytes of file.
+	If head is valid utf-8 without non-ascii chars, utf-8 is returned, and cp1251 stays
+	for fallback when the whole file is decoded. """
+	if head.startswith(_HEADER.encode('utf-16-le')):
+		return 'utf-16-le'
+	if head.startswith(codecs.BOM_UTF16_LE + _HEADER.encode('utf-16-le')):
+		return 'utf-16'
+	if head.startswith(codecs.BOM_UTF8 + _HEADER.encode('ascii')):
+		return 'utf-8-sig'
+	if not head.startswith(_HEADER.encode('ascii')):
+		raise ValidationFormatError('unknown',
+			'Header is not QSPGAME. Unknown game encoding! Use txt2gam utilities for conversion.')
+	try:
+		# last char of head can be cut, so decoder is not finalised
+		codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+	except UnicodeDecodeError:
+		return 'cp1251'
+	return 'utf-8'
@@ -59,6 +59,12 @@ class QspsFile():
 		with open(self._input_file, 'r', encoding='utf-8-sig') as fp:
 			for line in fp:	self._src_lines.append(line)
 
+	def copy(self) -> 'QspsFile':
+		""" New QspsFile with the same source lines and path, not split to locations. """
+		src = QspsFile(self._src_lines)
+		src._input_file = self._input_file
+		return src
+
 	def get_src(self) -> List[QspsLine]:
 		""" Return sources qsps-lines """
 		return self._src_lines
@@ -80,7 +86,7 @@ class QspsFile():
 		offset: int = 0
 		for qsps_line in self._src_lines:
 			if mode['loc_name'] == '': # open string work only in open location
-				match = LOCATION_START.search(qsps_line)
+				match = LOCATION_START.search(qsps_line) if qsps_line.startswith('#') else None
 				if match:
 					# open location
 					mode['loc_name'] = match.group(1).replace('\r', '')
@@ -88,7 +94,7 @@ class QspsFile():
 				else:
 					# если локация ещё не открыта, пропускаем строки
 					pass
-			elif not mode['quote'] and LOCATION_END.search(qsps_line):
+			elif not mode['quote'] and qsps_line.startswith('--') and LOCATION_END.search(qsps_line):
 				# close location
 				self._locations.append(QspsLoc(mode['loc_name'], mode['src_lines'], mode['region']))
 				self._loc_symbols.append((mode['loc_name'], mode['region']))
@@ -1,4 +1,5 @@
 # auxiable tools
+import re
 from typing import List
 from .tps import (
     QspsLine,
@@ -8,19 +9,34 @@ from .tps import (
 # constants:
 QSP_CODREMOV = 5 # const of cyphering
 
+_OPEN_CHAR = re.compile(r'["\'{]')
+_BRACE_CHAR = re.compile(r'[{}]')
+
 def parse_string(qsps_line:QspsLine, mode:ParseStringMode) -> None:
     """ Parse opened string for location code and return open string chars """
-    for char in qsps_line:
-        if not mode['quote']:
-            if char in ('"', '\'', '{'): mode['quote'].append(char)
+    # Only top of stack matters: in quotes only the same quote closes it,
+    # in braces only braces count. So parser jumps between significant chars.
+    quote = mode['quote']
+    pos = 0
+    while True:
+        if not quote:
+            match = _OPEN_CHAR.search(qsps_line, pos)
+            if match is None: return
+            quote.append(match.group())
+            pos = match.end()
+        elif quote[-1] == '{':
+            match = _BRACE_CHAR.search(qsps_line, pos)
+            if match is None: return
+            if match.group() == '{':
+                quote.append('{')
+            else:
+                quote.pop()
+            pos = match.end()
         else:
-            if not char in ('"', "'", "{", "}"): continue
-            if char in ('"', '\'') and mode['quote'][-1] == char:
-                mode['quote'].pop()
-            elif char == '}' and mode['quote'][-1] == '{':
-                mode['quote'].pop()
-            elif char == '{' and not mode['quote'][-1] in ('"', '\''):
-                mode['quote'].append(char)
+            pos = qsps_line.find(quote[-1], pos)
+            if pos == -1: return
+            quote.pop()
+            pos += 1
 
 def del_first_pref(lines:List[str]) -> List[str]:
 	"""
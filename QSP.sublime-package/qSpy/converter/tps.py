@@ -54,4 +54,4 @@ class QspLocation(TypedDict):
     actions:List[Action]
     run_to_visit:List[QspsLine]
 
-ParseStringMode = Union[BaseFindMode, LocFindMode]
\ No newline at end of file
+ParseStringMode = Union[BaseFindMode, LocFindMode]
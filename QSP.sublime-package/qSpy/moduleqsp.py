@@ -1,4 +1,5 @@
 import os
+import copy
 from typing import List
 
 from . import function as qsp
@@ -64,6 +65,13 @@ class ModuleQSP():
         """ Append QspsFile at list of src-files """
         self._src_files.append(src)
 
+    def copy(self) -> 'ModuleQSP':
+        """ Copy of module with the same source lines. Files are not read again. """
+        module = copy.copy(self)
+        module._src_files = [src.copy() for src in self._src_files]
+        module._src_files_pathes = list(self._src_files_pathes)
+        return module
+
     def restand_first_loc(self) -> None:
         """ Restand QspsFile, marked first on 0 place in list. """
         i = self._start_qsploc_file_index
@@ -1,4 +1,4 @@
-from typing import Dict, List, Literal, Union, TypedDict
+from typing import Any, Dict, List, Literal, Union, TypedDict
 
 Path = str # file or folder path
 AbsPath = str # absolute path of file or folder
@@ -42,6 +42,11 @@ class ConverterConfig(TypedDict):
 	path: Path
 	args: AppParam
 
+class ProfileConfig(TypedDict):
+	name: str
+	labels: Dict[str, str] # label: value (empty, if label is defined without value)
+	output: Path
+
 class JsonScheme(TypedDict, total=False):
 	""" Source Project Scheme aka json-file """
 	project: List[QspModule]
@@ -52,6 +57,10 @@ class JsonScheme(TypedDict, total=False):
 	preprocessor: PpMode
 	assets: List[AssetsConfig]
 	scans: ScansConfig
+	incremental_build: bool
+	profiles: List[Dict[str, Any]]
+	pp_profile: bool
+	workspace_hash: Literal['md5', 'blake2b']
 
 class ProjectScheme(TypedDict):
 	""" Correct Project Scheme for builder """
@@ -63,6 +72,9 @@ class ProjectScheme(TypedDict):
 	preprocessor: PpMode
 	assets: List[AssetsConfig]
 	scans: ScansConfig
+	incremental_build: bool
+	profiles: List[ProfileConfig]
+	pp_profile: bool
 
 class QspPluginCommandMarkers(TypedDict):
 	rename_path: bool
@@ -1,6 +1,8 @@
 # file __init__.py
-from .main import QspsPP
+from .main import QspsPP, PpFileResult
+from .pp_cache import PpCache
+from .pp_profiler import PpProfiler
 from .pp_ast_printer import AstPrinter
 from .dirs_ast_printer import DirsAstPrinter
 
-__all__ = ['QspsPP', 'AstPrinter', 'DirsAstPrinter']
+__all__ = ['QspsPP', 'PpFileResult', 'PpCache', 'PpProfiler', 'AstPrinter', 'DirsAstPrinter']
@@ -0,0 +1,147 @@
+"""
+    Preprocessor of qsps-files without Sublime Text.
+
+    python -m qSpy.preprocessor [-D label[=value]] [-o folder] [-j N] files or folders
+
+    Files are preprocessed with common labels, as files of module: one by one,
+    or in N worker-processes with the same output. Output is written to stdout
+    or to the output folder, errors of preprocessor are written to stderr.
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ..function import get_files_list
+from .main import QspsPP
+from .pp_cache import PpCache
+
+Path = str
+QspsLine = str
+
+def main(argv:Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    preprocessor = QspsPP(args.mode)
+    labels = _labels(args.define)
+    preprocessor.start_env(labels)
+    cache:Optional[PpCache] = None
+    if args.cache:
+        cache = PpCache(os.path.abspath(args.cache))
+        preprocessor.set_cache(cache)
+
+    if args.jobs > 1:
+        errors = _pp_in_processes(preprocessor, args)
+        if cache: cache.save()
+        return 1 if errors else 0
+
+    errors = 0
+    for file_path, rel_path in _input_files(args.paths):
+        qsps_lines = _read_lines(file_path)
+        if qsps_lines is None:
+            errors += 1
+            continue
+        if args.reset: preprocessor.start_env(labels)
+        # messages of preprocessor don't mix with output
+        with contextlib.redirect_stdout(sys.stderr):
+            output_lines = preprocessor.pp_this_lines(qsps_lines, file_path)
+            if preprocessor.errored():
+                print(f'^^^^^^ Error in file: "{file_path}"')
+                errors += 1
+        _write_output(args.output, rel_path, output_lines)
+
+    if cache: cache.save()
+    return 1 if errors else 0
+
+def _pp_in_processes(preprocessor:QspsPP, args:argparse.Namespace) -> int:
+    """ All files are read at first, because labels of every file are found before preprocessing. """
+    errors = 0
+    files:List[Tuple[Path, Path, List[QspsLine]]] = []
+    for file_path, rel_path in _input_files(args.paths):
+        qsps_lines = _read_lines(file_path)
+        if qsps_lines is None:
+            errors += 1
+        else:
+            files.append((file_path, rel_path, qsps_lines))
+    results = preprocessor.pp_files([qsps_lines for _, _, qsps_lines in files], args.jobs)
+    for (file_path, rel_path, _), (output_lines, errored, log) in zip(files, results):
+        if log: sys.stderr.write(log)
+        if errored:
+            print(f'^^^^^^ Error in file: "{file_path}"', file=sys.stderr)
+            errors += 1
+        _write_output(args.output, rel_path, output_lines)
+    return errors
+
+def _parse_args(argv:Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m qSpy.preprocessor',
+        description='Preprocess qsps-files. Folders are searched recursively for .qsps, .qsp-txt and .txt-qsp files.')
+    parser.add_argument('paths', nargs='+',
+        help='qsps-files and folders, "-" is stdin')
+    parser.add_argument('-D', '--define', action='append', default=[], metavar='LABEL[=VALUE]',
+        help='label, as if it is defined by var-directive')
+    parser.add_argument('-o', '--output', default='',
+        help='output folder. Files keep paths relative to input folders. Default is stdout')
+    parser.add_argument('--mode', choices=('On', 'Off'), default='On',
+        help='mode of preprocessor, as in qsp-project.json')
+    parser.add_argument('--reset', action='store_true',
+        help='every file starts with labels of arguments only')
+    parser.add_argument('--cache', default='',
+        help='file of preprocessor cache for unchanged files')
+    parser.add_argument('-j', '--jobs', type=int, default=0, metavar='N',
+        help='count of worker-processes. Output is the same, as of files one by one')
+    args = parser.parse_args(argv)
+    if args.jobs > 1 and args.reset:
+        parser.error('--jobs can not be used with --reset')
+    return args
+
+def _labels(defines:List[str]) -> Dict[str, str]:
+    labels:Dict[str, str] = {}
+    for define in defines:
+        key, _, value = define.partition('=')
+        if key.strip(): labels[key.strip()] = value.strip()
+    return labels
+
+def _input_files(paths:List[Path]) -> Iterator[Tuple[Path, Path]]:
+    """ Path of file and path for output folder, in order of arguments. """
+    for path in paths:
+        if path == '-':
+            yield path, 'stdin.qsps'
+        elif os.path.isdir(path):
+            # message about empty folder doesn't mix with output
+            with contextlib.redirect_stdout(sys.stderr):
+                files = get_files_list(path)
+            for rel_path in sorted((os.path.relpath(f, path) for f in files), key=_walk_order):
+                yield os.path.join(path, rel_path), rel_path
+        else:
+            yield path, os.path.basename(path)
+
+def _walk_order(rel_path:Path) -> List[Tuple[int, str]]:
+    """ Files of folder by name, then subfolders by name. """
+    *folders, file_name = rel_path.split(os.sep)
+    return [(1, folder) for folder in folders] + [(0, file_name)]
+
+def _read_lines(file_path:Path) -> Optional[List[QspsLine]]:
+    if file_path == '-':
+        return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig').readlines()
+    try:
+        with open(file_path, 'r', encoding='utf-8-sig') as fp:
+            return fp.readlines()
+    except (OSError, UnicodeDecodeError) as e:
+        print(f'[801] File {file_path} is not read. Error: "{e}".', file=sys.stderr)
+        return None
+
+def _write_output(output:Path, rel_path:Path, output_lines:List[QspsLine]) -> None:
+    if output:
+        _write_file(os.path.join(output, rel_path), output_lines)
+    else:
+        sys.stdout.buffer.write(''.join(output_lines).encode('utf-8', 'surrogatepass'))
+        sys.stdout.flush()
+
+def _write_file(file_path:Path, output_lines:List[QspsLine]) -> None:
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+    with open(file_path, 'w', encoding='utf-8') as fp:
+        fp.writelines(output_lines)
+
+if __name__ == "__main__":
+    sys.exit(main())
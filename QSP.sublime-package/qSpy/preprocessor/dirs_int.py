@@ -8,6 +8,7 @@ from . import pp_expr as expr
 from . import pp_dir as dir
 
 from .pp_environment import PpEnvironment
+from .pp_cond import compile_condition
 from . import error as er
 
 AstNode = Union[None, bool, str]
@@ -90,7 +91,9 @@ class DirsInt(stm.PpVisitor[AstNode], dir.PpVisitor[AstNode], expr.PpVisitor[Ast
 
     def visit_condition_dir(self, stmt: dir.ConditionDir[AstNode]) -> AstNode:
         # требует разрешения условия. Если условие верно, запускает цепочку переключения режимов
-        self._is_true = cast(bool, stmt.condition.accept(self))
+        condition = stmt.condition
+        if condition.compiled is None: condition.compiled = compile_condition(condition)
+        self._is_true = condition.compiled(self._ns)
         self._new_modes()
         self._modes[-1]['open_if'] = True # текущий - режим открытого условия
         for dir in stmt.next_dirs:
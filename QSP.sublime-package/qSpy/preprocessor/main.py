@@ -1,9 +1,19 @@
 # import json
-from typing import List, Literal, Optional
+import contextlib
+import io
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import ContextManager, Dict, List, Literal, Mapping, Optional, Tuple, Union, cast
 
 Path = str
+PpLabels = Dict[str, Union[str, bool]]
 
-from .pp_environment import PpEnvironment
+from .pp_environment import PpEnvironment, PpSnapshot
+from .pp_cache import PpCache
+from .pp_parsed import PpParsedFiles
+from .pp_profiler import PpProfiler
+from .pp_fast import is_directive_free, pp_directive_free
 from .pp_tokens import TokenNode
 
 from .dirs_scanner import DirsScaner
@@ -11,11 +21,24 @@ from .dirs_parser import DirStmt, DirsParser
 from .dirs_int import DirsInt
 
 from .pp_scanner import PpScanner
+from .pp_lexer import PpLexer
 from .pp_parser import PpParser, PpStmt
 from .pp_int import MarkedLine, PpInt, QspsLine
 
 from . import error as er
 
+# output lines, errors are found, console output
+PpFileResult = Tuple[List[QspsLine], bool, str]
+# lines, preprocessor is on, labels at start of file
+PpTask = Tuple[List[QspsLine], bool, PpSnapshot]
+# output lines, errors are found, output can be cached, labels at end of file, console output
+PpWorkerResult = Tuple[List[QspsLine], bool, bool, PpLabels, str]
+
+# Only var-directive changes labels of environment
+_VAR_DIRECTIVE = re.compile(r'^[ \t]*!@pp:[ \t\r]*var(?!\w)')
+
+_NO_PROFILE = contextlib.nullcontext()
+
 class QspsPP:
     """ Препроцессор для файлов  """
     def __init__(self, mode:Literal['Off', 'On']) -> None:
@@ -29,14 +52,63 @@ class QspsPP:
         self._pp_scanner:Optional[PpScanner] = None
         self._pp_parser:Optional[PpParser] = None
         self._pp_int:Optional[PpInt] = None
+        self._lexer:Optional[PpLexer] = None # scanner of directives and statements in one pass
 
         self._error_check:bool = False
+
+        self._cache:Optional[PpCache] = None # output of files from previous builds
+        self._parsed:Optional[PpParsedFiles] = None # scanned and parsed files of this build
+        self._profiler:Optional[PpProfiler] = None # time of stages for every file
         ...
 
     def errored(self) -> bool:
         """ Returns true if pping is broken and resets PP state. """
         return self._error_check
 
+    def get_env(self) -> Dict[str, Union[str, bool]]:
+        """ Copy of labels, defined in the preprocessor environment. """
+        return self._ns.get_env()
+
+    def set_env(self, labels:Mapping[str, Union[str, bool]]) -> None:
+        """ Restore labels of preprocessor environment (ex. from last build). """
+        self._ns.set_env(labels)
+
+    def snapshot(self) -> PpSnapshot:
+        """ Immutable snapshot of labels. It is cheap, so it can be a key of caches. """
+        return self._ns.snapshot()
+
+    def restore(self, snapshot:PpSnapshot) -> None:
+        """ Return labels to snapshot without copying. """
+        self._ns.restore(snapshot)
+
+    def start_env(self, labels:Dict[str, str]) -> None:
+        """ New environment with labels, as if they were defined by var-directives. """
+        self._ns = PpEnvironment()
+        for key, value in labels.items():
+            self._ns.def_key_set_value(key, value)
+
+    def set_cache(self, cache:Optional[PpCache]) -> None:
+        """ Serve unchanged files with the same labels from cache. """
+        self._cache = cache
+
+    def set_profiler(self, profiler:Optional[PpProfiler]) -> None:
+        """ Record time of stages and counts of tokens for every file. """
+        self._profiler = profiler
+
+    def keep_parsed(self, keep:bool) -> None:
+        """ Keep scanned and parsed files, when the same lines are preprocessed
+            again with other labels. Lines must not be changed between runs. """
+        self._parsed = PpParsedFiles() if keep else None
+
+    def parsed_hits(self) -> int:
+        """ How many times scanned and parsed stages were reused. """
+        return self._parsed.hits if self._parsed else 0
+
+    @staticmethod
+    def may_define_labels(qsps_lines:List[QspsLine]) -> bool:
+        """ Lines contain directives, which can change labels of environment. """
+        return any(_VAR_DIRECTIVE.match(line) for line in qsps_lines)
+
     def dirs_tokens(self) -> List[TokenNode]:
         return self._dirs_scanner.get_token_nodes() if self._dirs_scanner else []
 
@@ -47,6 +119,7 @@ class QspsPP:
         return self._dirs_int.get_marked_lines() if self._dirs_int else []
 
     def pp_tokens(self) -> List[TokenNode]:
+        if self._lexer: return self._lexer.get_pp_token_nodes()
         return self._pp_scanner.get_token_nodes() if self._pp_scanner else []
 
     def pp_stmts(self) -> List[PpStmt]:
@@ -55,81 +128,250 @@ class QspsPP:
     def pp_fastlines(self) -> List[QspsLine]:
         return self._pp_int.fast_output() if self._pp_int else []
 
-    def pp_this_lines(self, qsps_lines: List[QspsLine]) -> List[QspsLine]:
-        """ Preprocess the list of lines. """
+    def cacheable(self) -> bool:
+        """ Output of last file can be cached. Files with errors are not cached,
+            so errors are shown on every build. """
+        return not (self._error_check or (self._dirs_scanner and self._dirs_scanner.errored()))
+
+    def pp_this_lines(self, qsps_lines: List[QspsLine], file_path:Path = '') -> List[QspsLine]:
+        """ Preprocess the list of lines. Path of file is needed for profile only. """
+        if self._profiler is None:
+            return self._pp_cached(qsps_lines)
+        self._profiler.start_file(file_path, qsps_lines)
+        output_lines = self._pp_cached(qsps_lines)
+        self._profiler.end_file(output_lines, self._error_check)
+        return output_lines
+
+    def pp_files(self, files:List[List[QspsLine]], workers:int) -> List[PpFileResult]:
+        """
+            Preprocess files in two phases. At first labels, which every file
+            starts with, are found by directives only. Then files are preprocessed
+            in worker-processes. Output is the same, as of files one by one.
+        """
+        results:List[Optional[PpFileResult]] = []
+        tasks:List[Tuple[int, Optional[str], PpTask]] = [] # number of file, cache key, task
+        for number, qsps_lines in enumerate(files):
+            labels = self._ns.snapshot()
+            key:Optional[str] = None
+            if self._cache is not None:
+                key = PpCache.key(qsps_lines, self._pp, labels)
+                cached = self._from_cache(key)
+                if cached is not None:
+                    results.append((cached, False, ''))
+                    continue
+            results.append(None)
+            tasks.append((number, key, (qsps_lines, self._pp, labels)))
+            self._define_labels(qsps_lines)
+        workers = min(workers, os.cpu_count() or 1, len(tasks))
+        if workers > 1:
+            # files are sent in chunks, so small files do not wait for each other
+            chunksize = max(1, len(tasks) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                outputs = list(executor.map(_pp_in_worker,
+                    [task for _, _, task in tasks], chunksize=chunksize))
+        else:
+            outputs = [_pp_in_worker(task) for _, _, task in tasks]
+        for (number, key, task), output in zip(tasks, outputs):
+            output_lines, errored, cacheable, labels_after, log = output
+            results[number] = (output_lines, errored, log)
+            if self._cache is not None and key is not None and cacheable:
+                self._cache.put(key, output_lines, PpCache.labels_delta(task[2], labels_after))
+        self._error_check = any(result[1] for result in results if result)
+        self._dirs_scanner = self._dirs_parser = self._dirs_int = None
+        self._pp_scanner = self._pp_parser = self._pp_int = None
+        self._lexer = None
+        return cast(List[PpFileResult], results)
+
+    def _pp_cached(self, qsps_lines: List[QspsLine]) -> List[QspsLine]:
+        if self._cache is None:
+            return self._pp_lines(qsps_lines)
+        with self._stage('cache'):
+            labels = self._ns.snapshot()
+            key = PpCache.key(qsps_lines, self._pp, labels)
+            cached = self._from_cache(key)
+        if cached is not None: return cached
+        output_lines = self._pp_lines(qsps_lines)
+        if self.cacheable():
+            self._cache.put(key, output_lines, self._ns.snapshot().diff(labels))
+        return output_lines
+
+    def _from_cache(self, key:str) -> Optional[List[QspsLine]]:
+        """ Output lines from cache. Labels, changed by file, are replayed. """
+        cached = self._cache.get(key) if self._cache else None
+        if cached is None: return None
+        output_lines, changed_labels = cached
+        self._ns.update_env(changed_labels)
         self._error_check = False
-        # 1. Scan by directives
-        try:
-            self._dirs_scanner = DirsScaner(qsps_lines)
-            self._dirs_scanner.scan_tokens()
-            dirs_tokens = self._dirs_scanner.get_tokens()
-            if self._dirs_scanner.errored(): self._error_check 
-        except er.DirScannerRunError as e:
-            # If alg is corrupted, return source-lines
-            self._error_check = True
-            print(e)
-            return qsps_lines
+        self._dirs_scanner = self._dirs_parser = self._dirs_int = None
+        self._pp_scanner = self._pp_parser = self._pp_int = None
+        self._lexer = None
+        return output_lines
 
-        # 2. Parse directives
-        try:
-            self._dirs_parser = DirsParser(dirs_tokens)
-            self._dirs_parser.tokens_parse()
-            dirs_stmts = self._dirs_parser.get_statements()
-            if self._dirs_parser.errored(): self._error_check = True
-        except er.DirsParserRunError as e:
-            # If alg is corrupted, return source-lines
-            self._error_check = True
-            print(e)
-            return qsps_lines
+    def _define_labels(self, qsps_lines: List[QspsLine]) -> None:
+        """ Labels are changed by directives of lines. Lines are not preprocessed. """
+        if not self.may_define_labels(qsps_lines): return
+        # errors are shown, when the file is preprocessed
+        with contextlib.redirect_stdout(io.StringIO()):
+            self._dirs_lines(qsps_lines)
 
-        # 3. Interpret directives, and marked lines
-        try:
-            self._dirs_int = DirsInt(dirs_stmts, self._ns, qsps_lines, self._pp)
-            self._dirs_int.run()
-            marked_lines = self._dirs_int.get_marked_lines()
-            # if self._dirs_int.errored(): self._error_check = True
-        except er.DirsInterpreterError as e:
-            # If alg is corrupted, return source-lines
-            self._error_check = True
-            print(e)
-            return qsps_lines
+    def _pp_lines(self, qsps_lines: List[QspsLine]) -> List[QspsLine]:
+        self._error_check = False
+        if qsps_lines and is_directive_free(qsps_lines):
+            # without directives every line is included, so directive stages are skipped
+            self._dirs_scanner = self._dirs_parser = self._dirs_int = None
+            self._lexer = None
+            with self._stage('fast'):
+                output_lines = pp_directive_free(qsps_lines)
+            if output_lines is not None:
+                self._pp_scanner = self._pp_parser = self._pp_int = None
+                self._count('dropped_lines', len(qsps_lines) - len(output_lines))
+                return output_lines or ['\n']
+            marked_lines:List[MarkedLine] = [(line, self._pp, True) for line in qsps_lines]
+        else:
+            dirs_marked_lines = self._dirs_lines(qsps_lines)
+            if dirs_marked_lines is None: return qsps_lines
+            marked_lines = dirs_marked_lines
+
+        parsed = self._parsed.get_stmts(qsps_lines, marked_lines) if self._parsed else None
+        if parsed is not None:
+            # the same marked lines give the same output
+            self._pp_scanner, self._pp_parser, self._pp_int, output_lines = parsed
+            if self._pp_scanner: self._lexer = None
+            self._count('reused_stmts', 1)
+            return list(output_lines) or ['\n']
 
         # 4. Scan by Stmts
-        try:
-            self._pp_scanner = PpScanner(marked_lines)
-            self._pp_scanner.scan_tokens()
-            pp_tokens = self._pp_scanner.get_tokens()
-            if self._pp_scanner.errored(): self._error_check = True
-        except er.PpScannerRunError as e:
-            self._error_check = True
-            print(e)
-            return qsps_lines
+        with self._stage('pp_scan'):
+            if self._lexer and self._lexer.can_mark(marked_lines):
+                # statements are scanned with directives, tokens need flags of lines only
+                self._pp_scanner = None
+                pp_tokens = self._lexer.mark_pp_tokens(marked_lines)
+            else:
+                self._lexer = None
+                try:
+                    self._pp_scanner = PpScanner(marked_lines)
+                    self._pp_scanner.scan_tokens()
+                    pp_tokens = self._pp_scanner.get_tokens()
+                    if self._pp_scanner.errored(): self._error_check = True
+                except er.PpScannerRunError as e:
+                    self._error_check = True
+                    print(e)
+                    return qsps_lines
+        self._count('pp_tokens', len(pp_tokens))
 
         # 5. Parse by Stmts
-        try:
-            self._pp_parser = PpParser(pp_tokens)
-            self._pp_parser.tokens_parse()
-            pp_stmts = self._pp_parser.get_statements()
-            if self._pp_parser.errored(): self._error_check = True
-        except er.PpParserRunError as e:
-            self._error_check = True
-            print(e)
-            return qsps_lines
+        with self._stage('pp_parse'):
+            try:
+                self._pp_parser = PpParser(pp_tokens)
+                self._pp_parser.tokens_parse()
+                pp_stmts = self._pp_parser.get_statements()
+                if self._pp_parser.errored(): self._error_check = True
+            except er.PpParserRunError as e:
+                self._error_check = True
+                print(e)
+                return qsps_lines
+        self._count('pp_stmts', len(pp_stmts))
 
         # 6. Interpret by Stmts and markers
-        try:
-            self._pp_int = PpInt(pp_stmts, marked_lines)
-            self._pp_int.run()
-            output_lines = self._pp_int.get_output()
-            if not output_lines:
-                # Pp return empty list of QspsLines, if all locations exclude
-                # QspsFile src need not empty list for changing, return this
-                return ['\n']
-            # if self._pp_int.errored(): self._error_check = True
-        except er.PpInterpreterError as e:
-            self._error_check = True
-            print(e)
-            return qsps_lines
+        with self._stage('pp_int'):
+            try:
+                self._pp_int = PpInt(pp_stmts, marked_lines)
+                self._pp_int.run()
+                output_lines = self._pp_int.get_output()
+                # if self._pp_int.errored(): self._error_check = True
+            except er.PpInterpreterError as e:
+                self._error_check = True
+                print(e)
+                return qsps_lines
+        self._count('dropped_lines', len(marked_lines) - len(output_lines))
 
+        if self._parsed and not self._error_check:
+            self._parsed.put_stmts(qsps_lines, marked_lines,
+                (self._pp_scanner, self._pp_parser, self._pp_int, list(output_lines)))
+        if not output_lines:
+            # Pp return empty list of QspsLines, if all locations exclude
+            # QspsFile src need not empty list for changing, return this
+            return ['\n']
         return output_lines
-    
\ No newline at end of file
+
+    def _dirs_lines(self, qsps_lines: List[QspsLine]) -> Optional[List[MarkedLine]]:
+        """ Marked lines by directives, or None if preprocessor is broken. """
+        parsed = self._parsed.get_dirs(qsps_lines) if self._parsed else None
+        if parsed is not None:
+            # directive stages don't depend on labels
+            self._dirs_scanner, self._dirs_parser = parsed
+            self._lexer = self._dirs_scanner if isinstance(self._dirs_scanner, PpLexer) else None
+            dirs_stmts = self._dirs_parser.get_statements()
+        else:
+            dirs_stmts = self._parse_dirs(qsps_lines)
+            if dirs_stmts is None: return None
+
+        # 3. Interpret directives, and marked lines
+        with self._stage('dirs_int'):
+            try:
+                self._dirs_int = DirsInt(dirs_stmts, self._ns, qsps_lines, self._pp)
+                self._dirs_int.run()
+                # if self._dirs_int.errored(): self._error_check = True
+            except er.DirsInterpreterError as e:
+                # If alg is corrupted, return source-lines
+                self._error_check = True
+                print(e)
+                return None
+
+        return self._dirs_int.get_marked_lines()
+
+    def _parse_dirs(self, qsps_lines: List[QspsLine]) -> Optional[List[DirStmt]]:
+        """ Directive statements of lines, or None if preprocessor is broken. """
+        # 1. Scan by directives (and statements, if lines are split by newlines)
+        with self._stage('dirs_scan'):
+            try:
+                if PpLexer.can_scan(qsps_lines):
+                    self._lexer = PpLexer(qsps_lines)
+                    self._dirs_scanner = self._lexer
+                else:
+                    self._lexer = None
+                    self._dirs_scanner = DirsScaner(qsps_lines)
+                self._dirs_scanner.scan_tokens()
+                dirs_tokens = self._dirs_scanner.get_tokens()
+                if self._dirs_scanner.errored(): self._error_check 
+            except er.DirScannerRunError as e:
+                # If alg is corrupted, return source-lines
+                self._error_check = True
+                print(e)
+                return None
+        self._count('dirs_tokens', len(dirs_tokens))
+
+        # 2. Parse directives
+        with self._stage('dirs_parse'):
+            try:
+                self._dirs_parser = DirsParser(dirs_tokens)
+                self._dirs_parser.tokens_parse()
+                dirs_stmts = self._dirs_parser.get_statements()
+                if self._dirs_parser.errored(): self._error_check = True
+            except er.DirsParserRunError as e:
+                # If alg is corrupted, return source-lines
+                self._error_check = True
+                print(e)
+                return None
+        self._count('dirs_stmts', len(dirs_stmts))
+
+        if self._parsed and not (self._error_check or self._dirs_scanner.errored()):
+            self._parsed.put_dirs(qsps_lines, (self._dirs_scanner, self._dirs_parser))
+        return dirs_stmts
+
+    def _stage(self, name:str) -> ContextManager[None]:
+        """ Time of stage is recorded, if profiler is set. """
+        return self._profiler.stage(name) if self._profiler else _NO_PROFILE
+
+    def _count(self, name:str, value:int) -> None:
+        if self._profiler: self._profiler.count(name, value)
+
+def _pp_in_worker(task:PpTask) -> PpWorkerResult:
+    """ Preprocess file in worker-process with labels, which the file starts with. """
+    qsps_lines, pp_on, labels = task
+    preprocessor = QspsPP('On' if pp_on else 'Off')
+    preprocessor.set_env(labels)
+    with contextlib.redirect_stdout(io.StringIO()) as log:
+        output_lines = preprocessor.pp_this_lines(qsps_lines)
+    return (output_lines, preprocessor.errored(), preprocessor.cacheable(),
+        preprocessor.get_env(), log.getvalue())
@@ -0,0 +1,86 @@
+import os
+import json
+import hashlib
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+
+from .pp_environment import PpSnapshot
+
+QspsLine = str
+Path = str
+PpLabels = Dict[str, Union[str, bool]]
+
+class PpCache:
+    """
+        Output of preprocessor by hash of file and snapshot of environment, when
+        preprocessing of file started. Every entry keeps changes of environment
+        labels by file, so they are replayed for the next files.
+    """
+    VERSION = 2
+    MAX_IDLE_BUILDS = 10 # entries, not used by so many builds, are removed
+
+    def __init__(self, cache_file:Path = '') -> None:
+        self._cache_file:Path = cache_file
+        # key: {'lines': output lines, 'labels': changed labels, 'build': number of last build}
+        self._entries:Dict[str, Dict[str, Any]] = {}
+        self._build:int = 0 # number of current build
+        self._changed:bool = False
+        self.hits:int = 0
+        self.misses:int = 0
+        if cache_file: self._load()
+
+    def get(self, key:str) -> Optional[Tuple[List[QspsLine], PpLabels]]:
+        """ Output lines and changed labels, or None. """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if entry['build'] != self._build:
+            entry['build'] = self._build
+            self._changed = True
+        return list(entry['lines']), dict(entry['labels'])
+
+    def put(self, key:str, output_lines:List[QspsLine], labels:PpLabels) -> None:
+        self._entries[key] = {'lines': list(output_lines), 'labels': dict(labels), 'build': self._build}
+        self._changed = True
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+    def save(self) -> None:
+        if not (self._cache_file and self._changed): return
+        oldest = self._build - self.MAX_IDLE_BUILDS
+        entries = {k: v for k, v in self._entries.items() if v['build'] > oldest}
+        try:
+            with open(self._cache_file, 'w', encoding='utf-8') as fp:
+                json.dump({'version': self.VERSION, 'build': self._build, 'entries': entries},
+                    fp, ensure_ascii=False)
+            self._changed = False
+        except OSError as e:
+            print(f'[111] Preprocessor cache is not saved. Error: "{e}".')
+
+    def _load(self) -> None:
+        if not os.path.isfile(self._cache_file): return
+        try:
+            with open(self._cache_file, 'r', encoding='utf-8') as fp:
+                cache = json.load(fp)
+        except (OSError, ValueError):
+            return
+        if not isinstance(cache, dict) or cache.get('version') != self.VERSION: return
+        entries = cache.get('entries', {})
+        if isinstance(entries, dict): self._entries = entries
+        self._build = int(cache.get('build', 0)) + 1
+
+    @staticmethod
+    def key(qsps_lines:List[QspsLine], pp_on:bool, labels:Mapping[str, Union[str, bool]]) -> str:
+        """ Hash of file lines, mode of preprocessor and content hash of labels snapshot. """
+        snapshot = labels if isinstance(labels, PpSnapshot) else PpSnapshot(labels)
+        h = hashlib.md5()
+        h.update(json.dumps([pp_on, snapshot.content_hash()]).encode('utf-8'))
+        h.update(''.join(qsps_lines).encode('utf-8', 'surrogatepass'))
+        return h.hexdigest()
+
+    @staticmethod
+    def labels_delta(before:Mapping[str, Union[str, bool]], after:PpLabels) -> PpLabels:
+        """ Labels, which are new or changed. Labels are never removed from environment. """
+        return {k: v for k, v in after.items() if k not in before or before[k] != v}
@@ -0,0 +1,88 @@
+"""
+    Условия директив препроцессора, скомпилированные в замыкания.
+"""
+from typing import Callable, Dict, List, Mapping, Tuple, Union, cast
+
+from . import pp_expr as expr
+from . import pp_dir as dir
+from . import error as er
+from .pp_environment import PpEnvironment
+
+LabelValue = Union[str, bool]
+# labels are read by get(), as from dict
+Labels = Union[Mapping[str, LabelValue], PpEnvironment]
+CondFunc = Callable[[Labels], LabelValue]
+Compiled = Tuple[str, CondFunc] # canonical text of expression, closure
+
+MAX_COMPILED = 4096 # closures of conditions, shared by all files
+
+_compiled:Dict[str, CondFunc] = {}
+
+def compile_condition(condition:dir.CondExprStmt[None]) -> Callable[[Labels], bool]:
+    """ Closure, which resolves condition by labels of environment.
+        Conditions with the same text share one closure. """
+    # top of expression is always or/and/not/equal, so closure returns bool
+    _, func = condition.expr.accept(_CondCompiler())
+    return cast(Callable[[Labels], bool], func)
+
+def compiled_count() -> int:
+    return len(_compiled)
+
+def _shared(text:str, func:CondFunc) -> Compiled:
+    """ Closure of expression with the same text, if it was compiled already. """
+    if text not in _compiled:
+        if len(_compiled) >= MAX_COMPILED: _compiled.clear()
+        _compiled[text] = func
+    return text, _compiled[text]
+
+class _CondCompiler(expr.PpVisitor[Compiled]):
+    """ Compiles expression of condition as DirsInt resolves it. """
+
+    def visit_or_expr(self, stmt:expr.OrExpr[Compiled]) -> Compiled:
+        left_text, left = stmt.left_oprnd.accept(self)
+        right_text, right = stmt.right_oprnd.accept(self)
+        return _shared(f'({left_text}) or ({right_text})',
+            lambda labels: bool(left(labels) or right(labels)))
+
+    def visit_and_expr(self, stmt:expr.AndExpr[Compiled]) -> Compiled:
+        left_text, left = stmt.left_oprnd.accept(self)
+        right_text, right = stmt.right_oprnd.accept(self)
+        return _shared(f'({left_text}) and ({right_text})',
+            lambda labels: bool(left(labels) and right(labels)))
+
+    def visit_not_expr(self, stmt:expr.NotExpr[Compiled]) -> Compiled:
+        text, func = stmt.left.accept(self)
+        return _shared(f'not ({text})', lambda labels: not func(labels))
+
+    def visit_var_name(self, stmt:expr.VarName[Compiled]) -> Compiled:
+        name = stmt.value.lexeme
+        return _shared(name, lambda labels: labels.get(name, False))
+
+    def visit_equal_expr(self, stmt:expr.EqualExpr[Compiled]) -> Compiled:
+        names = [op.value.lexeme for op in stmt.operands]
+        operators = [token.lexeme.strip() for token in stmt.operators]
+        if not operators:
+            name = names[0]
+            return _shared(f'bool({name})', lambda labels: bool(labels.get(name, False)))
+        text = ' '.join(name + ' ' + op for name, op in zip(names, operators)) + ' ' + names[-1]
+        pairs = list(zip(names, names[1:], operators))
+        return _shared(text, lambda labels: _equal_chain(labels, pairs))
+
+def _equal_chain(labels:Labels, pairs:List[Tuple[str, str, str]]) -> bool:
+    """ a == b != c -> (a == b) and (b != c), as in DirsInt. """
+    for left_name, right_name, op in pairs:
+        left = labels.get(left_name, False)
+        right = labels.get(right_name, False)
+        if op == "==":
+            if True in (left, right):
+                if bool(left) != bool(right): return False
+            elif left != right:
+                return False
+        elif op == "!=":
+            if True in (left, right):
+                if bool(left) == bool(right): return False
+            elif left == right:
+                return False
+        else:
+            raise er.DirsInterpreterError(f"Unknown equality operator {op!r}")
+    return True
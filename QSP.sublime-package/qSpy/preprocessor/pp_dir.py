@@ -4,7 +4,7 @@
 
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Generic, TypeVar, Optional, Union, List
+from typing import Callable, Generic, TypeVar, Optional, Union, List
 
 from .pp_tokens import PpToken
 from . import pp_expr as expr
@@ -121,6 +121,8 @@ class ExcludeDir(PpDir[R]):
 @dataclass(eq=False)
 class CondExprStmt(PpDir[R]):
     expr:expr.OrType[R]
+    # closure of condition, compiled by interpreter at first resolving
+    compiled:Optional[Callable[..., bool]] = None
     def accept(self, visitor:PpVisitor[R]) -> R:
         return visitor.visit_cond_expr_stmt(self)
 
@@ -1,12 +1,137 @@
-from typing import Dict, Union
+import hashlib
+import json
+from typing import Dict, Iterator, List, Mapping, Optional, Set, Union
+
+Label = Union[str, bool]
+
+_HASH_MOD = 1 << 128
+
+def _item_hash(key:str, value:Label) -> int:
+    """ Стабильный (между запусками) хэш пары метка-значение. """
+    data = json.dumps([key, value], ensure_ascii=False).encode('utf-8', 'surrogatepass')
+    return int.from_bytes(hashlib.md5(data).digest(), 'big')
+
+class PpSnapshot(Mapping[str, Label]):
+    """
+        Неизменяемый снимок меток окружения. Снимок хранит только изменения
+        относительно предыдущего снимка, поэтому создаётся за время,
+        пропорциональное числу изменённых меток, а не всех меток.
+    """
+    __slots__ = ('_parent', '_changes', '_depth', '_size', '_digest')
+
+    MAX_DEPTH = 16 # цепочка длиннее схлопывается в один слой
+
+    def __init__(self, changes:Mapping[str, Label], parent:Optional['PpSnapshot'] = None) -> None:
+        # хэш содержимого - сумма хэшей пар, поэтому меняется по изменённым меткам
+        size = parent._size if parent else 0
+        digest = parent._digest if parent else 0
+        for key, value in changes.items():
+            if parent is not None and key in parent:
+                old_value = parent[key]
+                if old_value == value and type(old_value) is type(value): continue
+                digest -= _item_hash(key, old_value)
+            else:
+                size += 1
+            digest += _item_hash(key, value)
+        self._size:int = size
+        self._digest:int = digest % _HASH_MOD
+        if parent is not None and parent._depth >= self.MAX_DEPTH:
+            changes = {**parent.as_dict(), **changes}
+            parent = None
+        self._parent = parent
+        self._changes:Dict[str, Label] = dict(changes)
+        self._depth:int = parent._depth + 1 if parent else 0
+
+    def __getitem__(self, key:str) -> Label:
+        snapshot:Optional[PpSnapshot] = self
+        while snapshot is not None:
+            if key in snapshot._changes: return snapshot._changes[key]
+            snapshot = snapshot._parent
+        raise KeyError(key)
+
+    def __contains__(self, key:object) -> bool:
+        snapshot:Optional[PpSnapshot] = self
+        while snapshot is not None:
+            if key in snapshot._changes: return True
+            snapshot = snapshot._parent
+        return False
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.as_dict())
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __hash__(self) -> int:
+        return hash(self._digest)
+
+    def __eq__(self, other:object) -> bool:
+        if isinstance(other, PpSnapshot):
+            if self._digest != other._digest or self._size != other._size: return False
+            return self is other or self.as_dict() == other.as_dict()
+        return super().__eq__(other)
+
+    def __repr__(self) -> str:
+        return f'PpSnapshot({self.as_dict()!r})'
+
+    def __reduce__(self):
+        # в другой процесс передаётся только содержимое, без цепочки слоёв
+        return (PpSnapshot, (self.as_dict(),))
+
+    def as_dict(self) -> Dict[str, Label]:
+        """ Копия всех меток снимка. """
+        layers:List[Dict[str, Label]] = []
+        snapshot:Optional[PpSnapshot] = self
+        while snapshot is not None:
+            layers.append(snapshot._changes)
+            snapshot = snapshot._parent
+        labels:Dict[str, Label] = {}
+        for changes in reversed(layers): labels.update(changes)
+        return labels
+
+    def content_hash(self) -> str:
+        """ Хэш содержимого. Не зависит от порядка меток и истории изменений. """
+        return format(self._digest, '032x')
+
+    def diff(self, other:'PpSnapshot') -> Dict[str, Label]:
+        """ Метки этого снимка, которых нет в other, или которые в other другие.
+            Снимки с общим предком сравниваются только по изменённым меткам. """
+        if self is other or self._digest == other._digest and self == other: return {}
+        ancestors:Dict[int, PpSnapshot] = {}
+        snapshot:Optional[PpSnapshot] = other
+        while snapshot is not None:
+            ancestors[id(snapshot)] = snapshot
+            snapshot = snapshot._parent
+        keys:Set[str] = set()
+        snapshot = self
+        while snapshot is not None and id(snapshot) not in ancestors:
+            keys.update(snapshot._changes)
+            snapshot = snapshot._parent
+        if snapshot is None:
+            # нет общего предка: сравниваем все метки
+            keys = set(self.as_dict())
+        else:
+            common = snapshot
+            snapshot = other
+            while snapshot is not common and snapshot is not None:
+                keys.update(snapshot._changes)
+                snapshot = snapshot._parent
+        delta:Dict[str, Label] = {}
+        for key in keys:
+            if key not in self: continue
+            value = self[key]
+            if key not in other or other[key] != value: delta[key] = value
+        return delta
 
 class PpEnvironment:
     """ Класс для обслуживания переменных в препроцессоре. """
     def __init__(self) -> None:
-        self._labels:Dict[str, Union[str, bool]] = {
+        # метки хранятся в снимке и в изменениях после него
+        self._snapshot:PpSnapshot = PpSnapshot({
             'True': True,
             'False': False
-        }
+        })
+        self._changes:Dict[str, Label] = {}
 
     def def_key_set_value(self, key:str, value:str='') -> None:
         self.def_var(key)
@@ -18,7 +143,7 @@ class PpEnvironment:
         """ Объявление переменной. """
         key = key.strip()
         if key in ('True', 'False'): return
-        self._labels[key] = key
+        self._changes[key] = key
 
     def set_var(self, key:str, value:str='') -> None:
         """ Устанавливаем метку или значение """
@@ -27,11 +152,37 @@ class PpEnvironment:
         value = value.strip()
         if not value: value = key
 
-        self._labels[key] = value
+        self._changes[key] = value
 
-    def get_var(self, key:str) -> Union[str, bool]:
+    def get_var(self, key:str) -> Label:
         """ Извлекаем значение метки """
-        return self._labels.get(key, False)
+        return self.get(key, False)
+
+    def get(self, key:str, default:Label=False) -> Label:
+        """ Значение метки, как у словаря. """
+        if key in self._changes: return self._changes[key]
+        return self._snapshot.get(key, default)
+
+    def snapshot(self) -> PpSnapshot:
+        """ Неизменяемый снимок текущих меток. Без изменений - тот же снимок. """
+        if self._changes:
+            self._snapshot = PpSnapshot(self._changes, self._snapshot)
+            self._changes = {}
+        return self._snapshot
+
+    def restore(self, snapshot:PpSnapshot) -> None:
+        """ Возвращаемся к снимку меток без копирования. """
+        self._snapshot = snapshot
+        self._changes = {}
+
+    def get_env(self) -> Dict[str, Label]:
+        """ Копия всех меток. """
+        return self.snapshot().as_dict()
+
+    def set_env(self, labels:Mapping[str, Label]) -> None:
+        """ Заменяем все метки окружения копией переданных. """
+        self.restore(labels if isinstance(labels, PpSnapshot) else PpSnapshot(labels))
 
-    def get_env(self) -> Dict[str, Union[str, bool]]:
-        return self._labels
\ No newline at end of file
+    def update_env(self, labels:Mapping[str, Label]) -> None:
+        """ Добавляем или изменяем метки. """
+        self._changes.update(labels)
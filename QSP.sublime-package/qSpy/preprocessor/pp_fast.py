@@ -0,0 +1,131 @@
+import re
+from typing import List, Optional
+
+QspsLine = str
+
+# Files without directives and special comments are preprocessed here
+# without scanners, parsers and interpreters. The output is the same
+# as of PpInt: text between locations, empty statements and last
+# ampersands of statements are removed, continuation lines of strings
+# lose preformatting. Anything unusual returns None for the full pipeline.
+
+_PP_SYNTAX = re.compile(r'!@') # directives and special comments start so
+_STMT_SIGN = re.compile(r'[\'"(){}\[\]&]')
+_COMMENT_SIGN = re.compile(r'[\'"{}]')
+_LAST_AMPERSAND = re.compile(r'&[ \t]*\n\Z')
+
+_CLOSE = {')': '(', ']': '[', '}': '{'}
+
+def is_directive_free(qsps_lines:List[QspsLine]) -> bool:
+    """ Lines are split by newlines and contain no directives or special comments. """
+    if any('\n' in line[:-1] for line in qsps_lines): return False
+    return _PP_SYNTAX.search(''.join(qsps_lines)) is None
+
+def pp_directive_free(qsps_lines:List[QspsLine]) -> Optional[List[QspsLine]]:
+    """ Output of preprocessor for directive-free file, or None. """
+    if not qsps_lines: return None
+    last = len(qsps_lines) - 1
+    output:List[str] = []
+    stmt:List[str] = [] # parts of statement, continued on next lines
+    stack:List[str] = [] # open quotes and brackets of statement
+    comment:List[str] = [] # open quotes and braces of comment
+    loc_is_open = False
+    only_comment = False # statement is a comment, which is saved as is
+    for number, line in enumerate(qsps_lines):
+        if not line.endswith('\n') and number != last: return None
+        if not loc_is_open:
+            # text between locations is not preprocessed
+            if not line.endswith('\n'): return None
+            if line.startswith('#'):
+                output.append(line)
+                loc_is_open = True
+            continue
+        if not (stack or comment) and line.startswith('--'):
+            output.append(line)
+            loc_is_open = False
+            continue
+        if not line.endswith('\n'): return None
+        if comment:
+            # multiline comment is saved as is
+            _scan_comment(line, 0, comment)
+            part = line
+        elif line.startswith('--'):
+            return None
+        else:
+            pos = len(line) - len(line.lstrip(' \t'))
+            if not stack and line.startswith('!', pos):
+                _scan_comment(line, pos, comment)
+                only_comment = True
+                part = line
+            else:
+                if stack and stack[-1] in ('"', "'"):
+                    line = line[pos:] # preformatting in string is removed
+                _scan_statement(line, stack, comment)
+                part = line
+        stmt.append(part)
+        if stack or comment: continue
+        if not only_comment:
+            # last ampersand of statement is removed
+            match = _LAST_AMPERSAND.search(part)
+            if match: stmt[-1] = part[:match.start()] + '\n'
+        text = ''.join(stmt)
+        stmt.clear()
+        only_comment = False
+        if text.split(): output.append(text)
+    if stack or comment or loc_is_open: return None
+    output_lines = [line + '\n' for line in ''.join(output).split('\n')]
+    output_lines[-1] = output_lines[-1][:-1]
+    if output_lines[-1] == '':
+        output_lines.pop()
+    else:
+        output_lines[-1] += '\n'
+    return output_lines
+
+def _scan_statement(line:QspsLine, stack:List[str], comment:List[str]) -> None:
+    """ Follow quotes and brackets of line up to comment. """
+    pos = 0
+    while True:
+        if stack and stack[-1] in ('"', "'"):
+            pos = line.find(stack[-1], pos)
+            if pos == -1: return # string continues on next line
+            stack.pop()
+            pos += 1
+            continue
+        match = _STMT_SIGN.search(line, pos)
+        if match is None: return
+        char = match.group()
+        pos = match.end()
+        if stack and stack[-1] == '{':
+            # in code block only braces and strings count
+            if char == '}':
+                stack.pop()
+            elif char in ('{', '"', "'"):
+                stack.append(char)
+        elif char in _CLOSE:
+            # closing bracket of other type is a simple char
+            if stack and stack[-1] == _CLOSE[char]: stack.pop()
+        elif char != '&':
+            stack.append(char)
+        elif not stack:
+            end = len(line) - len(line[pos:].lstrip(' \t'))
+            if line.startswith('!', end):
+                _scan_comment(line, end, comment)
+                return
+
+def _scan_comment(line:QspsLine, pos:int, stack:List[str]) -> None:
+    """ Follow quotes and braces of comment. Open blocks continue comment on next line. """
+    while True:
+        if stack and stack[-1] in ('"', "'"):
+            pos = line.find(stack[-1], pos)
+            if pos == -1: return
+            stack.pop()
+            pos += 1
+            continue
+        match = _COMMENT_SIGN.search(line, pos)
+        if match is None: return
+        char = match.group()
+        pos = match.end()
+        if char == '}':
+            if stack: stack.pop()
+        else:
+            stack.append(char)
@@ -0,0 +1,146 @@
+import re
+from typing import List, Tuple
+
+from .dirs_scanner import DirsScaner, QspsLines
+from .pp_scanner import MarkedLine
+from .pp_tokens import PpToken as Tkn, TokenNode
+from .pp_tokens import PpTokenType as tt
+from . import error as er
+
+LineNum = int
+CharNum = int
+RawToken = Tuple[tt, str, Tuple[LineNum, CharNum]]
+
+_PREFORMATTER = re.compile(r'[ \t]+')
+# tokens of location body: as in PpScanner, raw text stops before delimiters
+_LOC_TOKEN = re.compile(r'!@<|!@|&[ \t]*|[^"\'{}\[\]()&!\n]+|[\s\S]')
+
+class PpLexer(DirsScaner):
+    """
+        Scanner of directives and statements in one pass. Directive tokens are
+        the same as of DirsScaner, statement tokens are the same as of PpScanner,
+        and get flags of lines, when directives are interpreted.
+    """
+
+    _CHAR_TOKENS = {
+        '!': tt.EXCLAMATION_SIGN,
+        '"': tt.QUOTE,
+        "'": tt.APOSTROPHE,
+        '{': tt.LEFT_BRACE,
+        '}': tt.RIGHT_BRACE,
+        '[': tt.LEFT_BRACKET,
+        ']': tt.RIGHT_BRACKET,
+        '(': tt.LEFT_PAREN,
+        ')': tt.RIGHT_PAREN,
+        '\n': tt.NEWLINE
+    }
+
+    def __init__(self, qsps_lines: QspsLines) -> None:
+        super().__init__(qsps_lines)
+        self._raw_tokens:List[RawToken] = [] # statement tokens without flags
+        self._pp_tokens:List[Tkn] = []
+        self._loc_is_open:bool = False
+        self._open_quote:List[str] = []
+
+    @staticmethod
+    def can_scan(qsps_lines: QspsLines) -> bool:
+        """ Lines are split by newlines, so tokens are the same as of two scanners. """
+        if not qsps_lines or qsps_lines[-1] == '#': return False
+        if any('\n' in line[:-1] for line in qsps_lines): return False
+        return all(line.endswith('\n') for line in qsps_lines[:-1])
+
+    def scan_tokens(self) -> None:
+        """ Find dir-tokens and statement tokens in the file. """
+        for j, line in enumerate(self._src_lines):
+            self._line_num = j
+            self._cur_line = line
+            if (len(self._scan_funcs) > 1 or self._curlexeme
+                    or not line.endswith('\n') or '!@pp:' in line):
+                # lines with directives are scanned char by char
+                self._scan_line(line)
+            else:
+                self._add_qsps_line(line)
+            self._scan_statements(line)
+
+        if self._curlexeme and self._scan_funcs:
+            raise er.DirScannerRunError(f'no clean handler stack [{[func.__name__ for func in self._scan_funcs]}')
+
+        self._tokens.append(Tkn(tt.EOF, "", (-1, -1)))
+
+    def can_mark(self, marked_lines:List[MarkedLine]) -> bool:
+        """ Marked lines are the scanned lines, so statement tokens need only flags. """
+        return (len(marked_lines) == len(self._src_lines)
+            and all(ml[0] is line for ml, line in zip(marked_lines, self._src_lines)))
+
+    def mark_pp_tokens(self, marked_lines:List[MarkedLine]) -> List[Tkn]:
+        """ Statement tokens with flags of marked lines. """
+        no_save_comm = [ml[1] for ml in marked_lines]
+        include = [ml[2] for ml in marked_lines]
+        self._pp_tokens = [
+            Tkn(ttype, lexeme, start, no_save_comm[start[0]], include[start[0]])
+            for ttype, lexeme, start in self._raw_tokens]
+        self._pp_tokens.append(Tkn(tt.EOF, "", (-1, -1)))
+        return self._pp_tokens
+
+    def get_pp_tokens(self) -> List[Tkn]:
+        return self._pp_tokens
+
+    def get_pp_token_nodes(self) -> List[TokenNode]:
+        return [t.get_as_node() for t in self._pp_tokens]
+
+    def _add_qsps_line(self, line:str) -> None:
+        """ Dir-tokens of line without directive. """
+        match = _PREFORMATTER.match(line)
+        if match:
+            self._tokens.append(Tkn(tt.PREFORMATTER, match.group(), (self._line_num, 0)))
+            self._tokens.append(Tkn(tt.QSPS_LINE, line[match.end():], (self._line_num, match.end())))
+        else:
+            self._tokens.append(Tkn(tt.QSPS_LINE, line, (self._line_num, 0)))
+
+    def _scan_statements(self, line:str) -> None:
+        """ Statement tokens of line. """
+        j = self._line_num
+        tokens = self._raw_tokens
+        if not self._loc_is_open:
+            if line.startswith('#'):
+                tokens.append((tt.LOC_OPEN, line, (j, 0)))
+                self._loc_is_open = True
+                return
+            match = _PREFORMATTER.match(line)
+            pos = match.end() if match else 0
+            if pos: tokens.append((tt.PREFORMATTER, line[:pos], (j, 0)))
+            if pos < len(line): tokens.append((tt.RAW_LINE, line[pos:], (j, pos)))
+            return
+        if line.startswith('--') and not self._open_quote:
+            tokens.append((tt.LOC_CLOSE, line, (j, 0)))
+            self._loc_is_open = False
+            return
+        match = _PREFORMATTER.match(line)
+        pos = match.end() if match else 0
+        if pos: tokens.append((tt.PREFORMATTER, line[:pos], (j, 0)))
+        open_quote = self._open_quote
+        char_tokens = self._CHAR_TOKENS
+        for match in _LOC_TOKEN.finditer(line, pos):
+            lexeme = match.group()
+            ttype = char_tokens.get(lexeme)
+            if ttype is None:
+                c = lexeme[0]
+                if c == '&':
+                    ttype = tt.AMPERSAND
+                elif c == '!':
+                    ttype = tt.LESS_SPEC_COMM if len(lexeme) == 3 else tt.SIMPLE_SPEC_COMM
+                else:
+                    ttype = tt.RAW_LOC_LINE
+            elif lexeme in ('"', "'"):
+                # так учитываем контекст открытых и закрытых кавычек, как в PpScanner
+                if open_quote and open_quote[-1] == lexeme:
+                    open_quote.pop()
+                elif not open_quote or open_quote[-1] not in ('"', "'"):
+                    open_quote.append(lexeme)
+            elif lexeme == '{':
+                if not open_quote or open_quote[-1] not in ('"', "'"):
+                    open_quote.append(lexeme)
+            elif lexeme == '}':
+                if open_quote and open_quote[-1] == '{':
+                    open_quote.pop()
+            tokens.append((ttype, lexeme, (j, match.start())))
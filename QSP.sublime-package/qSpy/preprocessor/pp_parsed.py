@@ -0,0 +1,57 @@
+from typing import Dict, List, Optional, Tuple
+
+from .dirs_scanner import DirsScaner
+from .dirs_parser import DirsParser
+from .pp_scanner import PpScanner
+from .pp_parser import PpParser
+from .pp_int import MarkedLine, PpInt, QspsLine
+
+# scanner of directives, parser of directives
+ParsedDirs = Tuple[DirsScaner, DirsParser]
+# scanner of statements (None, if lexer scanned them), parser, interpreter, output lines
+ParsedStmts = Tuple[Optional[PpScanner], PpParser, PpInt, List[QspsLine]]
+
+class PpParsedFiles:
+    """
+        Scanned and parsed files of one build. The same sources are preprocessed
+        with other labels (ex. profiles of project), so stages, which don't depend
+        on labels, are not repeated. Only stages without errors are kept, so error
+        messages are printed every time.
+    """
+    def __init__(self) -> None:
+        # id of lines: lines, directive stages, statement stages by marked lines
+        self._files:Dict[int, Tuple[List[QspsLine], Optional[ParsedDirs],
+                                    Dict[Tuple[MarkedLine, ...], ParsedStmts]]] = {}
+        self.hits:int = 0
+
+    def get_dirs(self, qsps_lines:List[QspsLine]) -> Optional[ParsedDirs]:
+        entry = self._entry(qsps_lines)
+        if entry is None or entry[1] is None: return None
+        self.hits += 1
+        return entry[1]
+
+    def put_dirs(self, qsps_lines:List[QspsLine], parsed:ParsedDirs) -> None:
+        entry = self._entry(qsps_lines)
+        self._files[id(qsps_lines)] = (qsps_lines, parsed, entry[2] if entry else {})
+
+    def get_stmts(self, qsps_lines:List[QspsLine],
+                  marked_lines:List[MarkedLine]) -> Optional[ParsedStmts]:
+        """ Statement stages depend on marked lines only. """
+        entry = self._entry(qsps_lines)
+        parsed = entry[2].get(tuple(marked_lines)) if entry else None
+        if parsed is not None: self.hits += 1
+        return parsed
+
+    def put_stmts(self, qsps_lines:List[QspsLine],
+                  marked_lines:List[MarkedLine], parsed:ParsedStmts) -> None:
+        entry = self._entry(qsps_lines)
+        if entry is None:
+            entry = (qsps_lines, None, {})
+            self._files[id(qsps_lines)] = entry
+        entry[2][tuple(marked_lines)] = parsed
+
+    def _entry(self, qsps_lines:List[QspsLine]):
+        entry = self._files.get(id(qsps_lines))
+        # id of list can be reused by other list, so entry keeps the list
+        if entry is None or entry[0] is not qsps_lines: return None
+        return entry
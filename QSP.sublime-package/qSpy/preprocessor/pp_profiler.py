@@ -0,0 +1,88 @@
+import json
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+QspsLine = str
+Path = str
+
+class PpProfiler:
+    """
+        Time of preprocessor stages and counts of tokens, statements and lines
+        for every file. Files are preprocessed one after another, so stages
+        are added to the current file.
+    """
+    VERSION = 1
+    # cache, fast path for directive-free files, six stages of full pipeline
+    STAGES = ('cache', 'fast', 'dirs_scan', 'dirs_parse', 'dirs_int', 'pp_scan', 'pp_parse', 'pp_int')
+
+    def __init__(self) -> None:
+        self._files:List[Dict[str, Any]] = []
+        self._current:Optional[Dict[str, Any]] = None
+
+    def start_file(self, file_path:Path, qsps_lines:List[QspsLine]) -> None:
+        self._current = {
+            'file': file_path,
+            'lines_in': len(qsps_lines),
+            'chars_in': sum(len(line) for line in qsps_lines),
+            'time': 0.0,
+            'stages': {},
+            'counts': {}}
+        self._files.append(self._current)
+
+    def end_file(self, output_lines:List[QspsLine], errored:bool) -> None:
+        if self._current is None: return
+        self._current['lines_out'] = len(output_lines)
+        self._current['errored'] = errored
+        self._current['time'] = sum(self._current['stages'].values())
+        self._current = None
+
+    @contextmanager
+    def stage(self, name:str) -> Iterator[None]:
+        """ Time of stage is added to the current file. """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self._current is not None:
+                stages = self._current['stages']
+                stages[name] = stages.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name:str, value:int) -> None:
+        """ Count of tokens, statements or lines of the current file. """
+        if self._current is not None: self._current['counts'][name] = value
+
+    def report(self) -> Dict[str, Any]:
+        """ Totals of stages and files from the slowest. """
+        totals = {name: 0.0 for name in self.STAGES}
+        for file in self._files:
+            for name, value in file['stages'].items(): totals[name] += value
+        return {
+            'version': self.VERSION,
+            'files_count': len(self._files),
+            'time': sum(totals.values()),
+            'stages': totals,
+            'files': sorted(self._files, key=lambda file: file['time'], reverse=True)}
+
+    def save(self, report_file:Path) -> None:
+        try:
+            with open(report_file, 'w', encoding='utf-8') as fp:
+                json.dump(self.report(), fp, ensure_ascii=False, indent=1)
+        except OSError as e:
+            print(f'[113] Profile of preprocessor is not saved. Error: "{e}".')
+
+    def summary(self, top:int = 5) -> str:
+        """ Short text for console: totals and the slowest files. """
+        report = self.report()
+        stages = ', '.join(f'{name} {value:.3f}' for name, value in report['stages'].items() if value)
+        lines = [f"Preprocessor profile: {report['files_count']} files, {report['time']:.3f} s ({stages})."]
+        for file in report['files'][:top]:
+            if not file['stages']: continue
+            stage, value = max(file['stages'].items(), key=lambda item: item[1])
+            lines.append(f"    {file['time']:.3f} s, {stage} {value:.3f} s, "
+                f"{file['lines_in']} lines: {file['file'] or '<lines>'}")
+        return '\n'.join(lines)
+
+    def clear(self) -> None:
+        self._files.clear()
+        self._current = None
@@ -1,13 +1,8 @@
-from dataclasses import dataclass, field
-from typing import Tuple, Dict, Union, List
+from typing import Any, Tuple
 
 from enum import (IntEnum, auto)
 
-LineNum = int
-CharNum = int
-Point = Tuple[LineNum, CharNum]
-
-TokenNode = Dict[str, Union[str, List[int], bool]]
+from ..compact_token import CompactToken, LineNum, CharNum, Point, TokenNode
 
 # ------------------------------ Tokens Types ------------------------------ #
 class PpTokenType(IntEnum):
@@ -72,23 +67,21 @@ class PpTokenType(IntEnum):
     EOF = auto()
 
 # ---------------------------- Token Class ------------------------------ #
-@dataclass
-class PpToken:
+class PpToken(CompactToken):
+    __slots__ = ('no_save_comment', 'include_line')
     ttype:PpTokenType
-    lexeme:str # вся лексема целиком
-    lexeme_start:Point # строка и номер символа в которой токен находится
 
-    no_save_comment:bool = field(default=True)
-    include_line:bool = field(default=True)
+    def __init__(self, ttype:PpTokenType, lexeme:str, lexeme_start:Point,
+                 no_save_comment:bool = True, include_line:bool = True) -> None:
+        super().__init__(ttype, lexeme, lexeme_start)
+        self.no_save_comment:bool = no_save_comment
+        self.include_line:bool = include_line
+
     def get_as_node(self) -> TokenNode:
-        return {
-            "token-type": self.ttype.name,  # название константы вместо номера
-            'lexeme': self.lexeme,
-            'lexeme_start': list(self.lexeme_start),
-            'no_save_comment': self.no_save_comment,
-            'include_line': self.include_line
-        }
-
-    def get_end_pos(self) -> Point:
-        line, char = self.lexeme_start
-        return (line, char + len(self.lexeme))
+        node = super().get_as_node()
+        node['no_save_comment'] = self.no_save_comment
+        node['include_line'] = self.include_line
+        return node
+
+    def _fields(self) -> Tuple[Any, ...]:
+        return super()._fields() + (self.no_save_comment, self.include_line)
@@ -35,7 +35,10 @@ class QspProject:
             'save_temp_files': False,
             'preprocessor': 'Off',
             'assets': [],
-            'scans': {}
+            'scans': {},
+            'incremental_build': True,
+            'profiles': [],
+            'pp_profile': False
         }
         self._scheme_is_right:bool = False
 
@@ -140,6 +143,10 @@ class QspProject:
 
         # Save temp-files Mode
         self._root['save_temp_files'] = self._json.get('save_temp_files', False)
+        # Skip modules, which sources are not changed from last build
+        self._root['incremental_build'] = self._json.get('incremental_build', True)
+        # Time of preprocessor stages for every file is written to report
+        self._root['pp_profile'] = self._json.get('pp_profile', False)
 
         project = self._json.get('project', [])
         if not project:
@@ -170,6 +177,9 @@ class QspProject:
         # ASSETS
         if 'assets' in self._json: self._set_assets()
 
+        # Variants of game with other labels of preprocessor
+        if 'profiles' in self._json: self._set_profiles()
+
     def _set_converter(self) -> None:
         """Set converter path and params"""
         raw_converter = self._json.get('converter', '')
@@ -279,6 +289,29 @@ class QspProject:
 
         root_scans['location'] = scans.get('location', SCAN_FILES_LOCNAME)
 
+    def _set_profiles(self) -> None:
+        """ Profiles of build: labels of preprocessor and output folder. """
+        profiles = self._json.get('profiles', [])
+        if not isinstance(profiles, list):
+            raise _SchemeProvingError('Wrong define "profiles" in qsp-project.json')
+        out_profiles:List[ts.ProfileConfig] = []
+        for i, profile in enumerate(profiles):
+            if not isinstance(profile, dict) or not profile.get('output'):
+                print(f'QspProject Error: Profile {i} has no key "output". Profile is skipped.')
+                continue
+            output = os.path.abspath(profile['output'])
+            # labels are a list of names or a dict of names and values
+            raw_labels = profile.get('labels', {})
+            if isinstance(raw_labels, list): raw_labels = {label: '' for label in raw_labels}
+            if not isinstance(raw_labels, dict):
+                raise _SchemeProvingError(f'Wrong define "labels" of profile {i} in qsp-project.json')
+            labels = {str(k): (v if isinstance(v, str) else '') for k, v in raw_labels.items()}
+            out_profiles.append({
+                'name': str(profile.get('name', os.path.basename(output))),
+                'labels': labels,
+                'output': output})
+        self._root['profiles'] = out_profiles
+
     def _set_assets(self) -> None:
         assets = self._json.get('assets', [])
 
@@ -0,0 +1,201 @@
+from typing import Dict, List, NamedTuple, Optional
+
+from .converter.base_scanner import BaseScanner
+from .converter.base_tokens import BaseToken, BaseTokenType as tt
+from .converter.tools import parse_string
+from .converter.qsps_file import LOCATION_START, LOCATION_END
+from .converter.tps import LocFindMode
+from .plugtypes import (LocName, Path)
+
+QspsLine = str
+SymbolKey = str # name of location or label in lower case
+
+# operators, which take name of location by first argument
+_CALL_STMTS = ('gt', 'goto', 'xgt', 'xgoto', 'gosub', 'gs')
+_CALL_FUNCS = ('func', '$func', '%func')
+_STRINGS = (tt.QUOTE_STRING, tt.APOSTROPHE_STRING)
+
+class QspSymbol(NamedTuple):
+	kind:str		# 'location', 'label' or 'call'
+	name:str		# name of location or label as in code
+	place:Path		# file path
+	line:int		# from 0, as lines of file
+	char:int
+	location:LocName	# location, where symbol is
+	command:str = ''	# gt, goto, xgt, xgoto, gosub, gs, func, @ or @@ for calls
+
+def extract_symbols(qsps_lines:List[QspsLine], place:Path) -> List[QspSymbol]:
+	""" Locations, labels and call sites of qsps-file. """
+	symbols:List[QspSymbol] = []
+	mode:LocFindMode = {'loc_name': '', 'region': (-1, -1), 'quote': [], 'src_lines': []}
+	body_start = 0
+	for i, qsps_line in enumerate(qsps_lines):
+		if mode['loc_name'] == '':
+			match = LOCATION_START.search(qsps_line) if qsps_line.startswith('#') else None
+			if match:
+				mode['loc_name'] = match.group(1).replace('\r', '')
+				symbols.append(QspSymbol('location', mode['loc_name'], place, i, match.start(1), mode['loc_name']))
+				body_start = i + 1
+		elif not mode['quote'] and qsps_line.startswith('--') and LOCATION_END.search(qsps_line):
+			symbols.extend(_CodeSymbols(mode['src_lines'], place, body_start, mode['loc_name']).extract())
+			mode['loc_name'] = ''
+			mode['src_lines'] = []
+		else:
+			parse_string(qsps_line, mode)
+			mode['src_lines'].append(qsps_line)
+	return symbols
+
+class _CodeSymbols:
+	""" Labels and call sites from tokens of location code. """
+	def __init__(self, code_lines:List[QspsLine], place:Path, line_offset:int, location:LocName) -> None:
+		self._lines = code_lines
+		self._place = place
+		self._offset = line_offset
+		self._location = location
+
+	def extract(self) -> List[QspSymbol]:
+		if not self._lines: return []
+		scanner = BaseScanner(self._lines)
+		scanner.scan_tokens()
+		tokens = scanner.get_tokens()
+		symbols:List[QspSymbol] = []
+		stmt_start = True # начало оператора: здесь могут быть метка или комментарий
+		i = 0
+		while i < len(tokens):
+			token = tokens[i]
+			ttype = token.ttype
+			if ttype in (tt.NEWLINE, tt.AMPERSAND):
+				stmt_start = True
+			elif ttype == tt.PREFORMATTER:
+				pass
+			elif ttype == tt.EXCLAMATION_SIGN and stmt_start:
+				i = self._comment_end(tokens, i)
+				continue
+			elif ttype == tt.THEN and stmt_start:
+				symbols.append(self._label(token))
+				i = self._stmt_end(tokens, i)
+				continue
+			elif ttype == tt.THEN:
+				stmt_start = True # код после двоеточия в if, act, loop
+			else:
+				stmt_start = False
+				lexeme = token.lexeme.lower()
+				if ttype == tt.IDENTIFIER and lexeme in _CALL_STMTS:
+					name_token = self._next_string(tokens, i + 1, skip_paren=True)
+					if name_token: symbols.append(self._call(name_token, lexeme))
+				elif ttype == tt.IDENTIFIER and lexeme in _CALL_FUNCS:
+					name_token = self._next_string(tokens, i + 1, skip_paren=True)
+					if name_token: symbols.append(self._call(name_token, 'func'))
+				elif ttype == tt.RAW_TEXT and lexeme.startswith('@'):
+					name = token.lexeme.lstrip('@')
+					command = token.lexeme[:len(token.lexeme) - len(name)]
+					if name: symbols.append(self._symbol('call', name, token.line, token.char + len(command), command))
+			i += 1
+		return symbols
+
+	def _comment_end(self, tokens:List[BaseToken], i:int) -> int:
+		""" Index of newline after comment. Braces of comment may take several lines. """
+		depth = 0
+		while tokens[i].ttype != tt.EOF:
+			ttype = tokens[i].ttype
+			if ttype == tt.LEFT_BRACE: depth += 1
+			elif ttype == tt.RIGHT_BRACE and depth: depth -= 1
+			elif ttype == tt.NEWLINE and not depth: return i
+			i += 1
+		return i
+
+	def _stmt_end(self, tokens:List[BaseToken], i:int) -> int:
+		while not tokens[i].ttype in (tt.NEWLINE, tt.AMPERSAND, tt.EOF): i += 1
+		return i
+
+	def _next_string(self, tokens:List[BaseToken], i:int, skip_paren:bool) -> Optional[BaseToken]:
+		""" String literal after operator or function, if name of location is constant. """
+		if skip_paren and tokens[i].ttype == tt.LEFT_PAREN: i += 1
+		token = tokens[i]
+		if not token.ttype in _STRINGS: return None
+		if tokens[i+1].ttype == tt.DELIMITER and tokens[i+1].lexeme in ('+', '<', '>', '='):
+			return None # name is expression
+		return token
+
+	def _label(self, token:BaseToken) -> QspSymbol:
+		line = self._lines[token.line]
+		end = len(line)
+		for stop in ('&', '\n', '\r'):
+			pos = line.find(stop, token.char + 1)
+			if pos != -1: end = min(end, pos)
+		name = line[token.char + 1:end]
+		char = token.char + 1 + len(name) - len(name.lstrip())
+		return self._symbol('label', name.strip(), token.line, char)
+
+	def _call(self, name_token:BaseToken, command:str) -> QspSymbol:
+		quote = name_token.lexeme[0]
+		name = name_token.lexeme[1:-1].replace(quote * 2, quote)
+		return self._symbol('call', name, name_token.line, name_token.char + 1, command)
+
+	def _symbol(self, kind:str, name:str, line:int, char:int, command:str = '') -> QspSymbol:
+		return QspSymbol(kind, name, self._place, self._offset + line, char, self._location, command)
+
+class SymbolIndex:
+	"""
+		Symbols of project files: definitions of locations, labels and call sites.
+		Symbols of file are replaced together, lookups by name are dict lookups.
+	"""
+	KINDS = ('location', 'label', 'call')
+
+	def __init__(self) -> None:
+		self._files:Dict[Path, List[QspSymbol]] = {}
+		# symbols by kind and name in lower case (names of QSP are case insensitive)
+		self._index:Dict[str, Dict[SymbolKey, Dict[QspSymbol, None]]] = {kind: {} for kind in self.KINDS}
+
+	def update_file(self, place:Path, qsps_lines:List[QspsLine]) -> None:
+		""" Replace symbols of file by symbols of new lines. """
+		self.set_symbols(place, extract_symbols(qsps_lines, place))
+
+	def set_symbols(self, place:Path, symbols:List[QspSymbol]) -> None:
+		self.remove_file(place)
+		self._files[place] = symbols
+		for symbol in symbols:
+			self._index[symbol.kind].setdefault(symbol.name.lower(), {})[symbol] = None
+
+	def remove_file(self, place:Path) -> None:
+		for symbol in self._files.pop(place, ()):
+			symbols = self._index[symbol.kind][symbol.name.lower()]
+			del symbols[symbol]
+			if not symbols: del self._index[symbol.kind][symbol.name.lower()]
+
+	def replace_file(self, old_place:Path, new_place:Path) -> None:
+		""" File is moved or renamed. """
+		if not old_place in self._files: return None
+		symbols = [symbol._replace(place=new_place) for symbol in self._files[old_place]]
+		self.remove_file(old_place)
+		self.set_symbols(new_place, symbols)
+
+	def has_file(self, place:Path) -> bool:
+		return place in self._files
+
+	def get_file_symbols(self, place:Path) -> List[QspSymbol]:
+		return list(self._files.get(place, ()))
+
+	def definitions(self, name:LocName) -> List[QspSymbol]:
+		""" Locations with this name. """
+		return self._lookup('location', name)
+
+	def references(self, name:LocName) -> List[QspSymbol]:
+		""" Call sites of location. """
+		return self._lookup('call', name)
+
+	def labels(self, name:str, location:Optional[LocName] = None) -> List[QspSymbol]:
+		""" Labels with this name, in all locations or in one location. """
+		labels = self._lookup('label', name)
+		if location is None: return labels
+		return [label for label in labels if label.location.lower() == location.lower()]
+
+	def unreferenced_locations(self) -> List[QspSymbol]:
+		""" Locations without constant call sites. They may be called by expressions. """
+		calls = self._index['call']
+		return [symbol for key, symbols in list(self._index['location'].items())
+			if not key in calls for symbol in list(symbols)]
+
+	def _lookup(self, kind:str, name:str) -> List[QspSymbol]:
+		# list() of dict is copied without switching of threads
+		return list(self._index[kind].get(name.lower(), ()))
@@ -2,34 +2,43 @@ import sublime			# type: ignore
 
 import os
 import json
-from typing import (Dict, Literal, Optional, Set, TypedDict, Union, List, Tuple, cast)
+from typing import (Any, Dict, Iterator, Literal, Optional, Set, TypedDict, Union, List, Tuple, cast)
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
 
 from .converter import QspsFile
 from . import function as qsp
 from . import const as const
 from .plugtypes import (AbsPath, LocName, Path, ViewId, HashMD5)
 from .converter import ViewRegion
+from .ws_storage import WsStorage
+from .symbol_index import QspSymbol, SymbolIndex
 
 Point = int
 WorkspacesPlaces = Dict[Path, 'QspWorkspace']
 LocHash = Tuple[LocName, ViewRegion, Union[Path, ViewId]]
+LocId = int
+FileStat = Tuple[int, int] # size, mtime_ns
 
 class QspLocsMb(TypedDict):
-	names:List[LocName]
-	regions:List[ViewRegion]
-	places:List[Union[Path, ViewId]]
-	hashes:List[LocHash]
+	records:Dict[LocId, LocHash]
+	ids:Dict[LocHash, LocId]
+	names:Dict[LocName, Dict[LocId, None]]
+	places:Dict[Union[Path, ViewId], Dict[LocId, None]]
 
 class QspsFilesMb(TypedDict):
-	pathes:List[AbsPath]
-	hashes:List[HashMD5]
+	hashes:Dict[AbsPath, HashMD5]
+	stats:Dict[AbsPath, FileStat]
 
-class WsJson(TypedDict):
+class WsJson(TypedDict, total=False):
 	locations: Dict[
 		Path, List[Tuple[AbsPath, ViewRegion]]
 	]
 	files_paths: Dict[Path, HashMD5]
+	files_stats: Dict[Path, FileStat]
+	hash_name: str
+	# kind, name, line, char, location, command of symbols by file path
+	symbols: Dict[Path, List[Tuple[str, str, int, int, LocName, str]]]
 
 class FindOverlapMb(TypedDict):
 	separator_name: List[Literal['assign', 'while', 'brace']]
@@ -37,26 +46,38 @@ class FindOverlapMb(TypedDict):
 	separator_instr: List[Point]
 
 class QspWorkspace:
+	HASH_NAMES = ('md5', 'blake2b')
+	HASH_BUFFER = 1024 * 1024
+	HASH_WORKERS = 8
+
 	def __init__(self, all_workspaces:WorkspacesPlaces) -> None:
 		self._all_ws = all_workspaces # dict of all workspaces
 		# microbase of locations
 		self._locs:QspLocsMb = {
-			'names': [],	# names of location [str]
-			'regions': [],	# regions of locs initiate tuple[start, end]
-			'places': [],	# file path, where is qsp_locs [str]
-			'hashes': []	# all datas in tuple
+			'records': {},	# all datas in tuple by id, in order of adding
+			'ids': {},		# id of location by all datas
+			'names': {},	# ids of locations by name of location
+			'places': {}	# ids of locations by file path or view id
 		}
+		self._next_loc_id:LocId = 0
 		# microbase of qsps-file's pathes
 		self._qsps_files:QspsFilesMb = {
-			'pathes': [],	# all files in project (abs pathes)
-			'hashes': []	# md5
+			'hashes': {},	# md5 (or other hash_name) by all files in project (abs pathes)
+			'stats': {}		# size and mtime_ns by path, when hash was calculated
 		}
+		# locations, labels and call sites of qsps-files
+		self._symbols = SymbolIndex()
 		# microbase of variables
 		self._local_vars:List[sublime.Region] = []	# list[sublime.Region]
 		self._global_vars:List[sublime.Region] = []	# list[sublime.Region]
 		self._global_vars_names:Set[str] = set()  # set[variables names]
 		# modes
 		self.save_temp_files:bool = True
+		self.hash_name:str = 'md5' # or 'blake2b', as "workspace_hash" of qsp-project.json
+		# places (file pathes) with changed locations or files, that are not saved
+		self._changed_places:Set[Path] = set()
+		self._storage:Optional[WsStorage] = None
+		self._storage_is_actual:bool = False # all places are saved in storage
 		self.markers = {
 			'on_pre_close_project': False
 		}
@@ -69,48 +90,70 @@ class QspWorkspace:
 
 	def add_loc(self, name:LocName, region:ViewRegion, place:Union[Path, ViewId]) -> None:
 		""" Add new qsp-location to workspace """
-		if not (name, region, place) in self._locs['hashes']:
-			# one index for all fields
-			self._locs['names'].append(name)
-			self._locs['regions'].append(region)
-			self._locs['places'].append(place)
-			self._locs['hashes'].append((name, region, place))
+		loc_hash = (name, region, place)
+		if loc_hash in self._locs['ids']: return None
+		loc_id = self._next_loc_id
+		self._next_loc_id += 1
+		self._locs['records'][loc_id] = loc_hash
+		self._locs['ids'][loc_hash] = loc_id
+		self._locs['names'].setdefault(name, {})[loc_id] = None
+		self._locs['places'].setdefault(place, {})[loc_id] = None
+		self._place_changed(place)
 
 	def replace_locs(self, old_path:str, new_path:str) -> None:
 		""" Change place of qsp-locations. """
-		while old_path in self._locs['places']:
-			i = self._locs['places'].index(old_path)
-			self._locs['places'][i] = new_path
-			self.loc_hash_update(i)
+		loc_ids = self._locs['places'].pop(old_path, {})
+		new_ids = self._locs['places'].setdefault(new_path, {})
+		if loc_ids:
+			self._place_changed(old_path)
+			self._place_changed(new_path)
+		for loc_id in loc_ids:
+			name, region, _ = self._locs['records'][loc_id]
+			del self._locs['ids'][self._locs['records'][loc_id]]
+			loc_hash = (name, region, new_path)
+			if loc_hash in self._locs['ids']:
+				# location is already in new place
+				del self._locs['records'][loc_id]
+				self._del_id(self._locs['names'], name, loc_id)
+				continue
+			self._locs['records'][loc_id] = loc_hash
+			self._locs['ids'][loc_hash] = loc_id
+			new_ids[loc_id] = None
+		if not new_ids: del self._locs['places'][new_path]
 
 	def del_loc_by_index(self, i:int) -> None:
 		""" Delete the qsp-location from workspace by index"""
-		if i < 0 or i > len(self._locs['names'])-1: return None
-		del self._locs['names'][i]
-		del self._locs['regions'][i]
-		del self._locs['places'][i]
-		del self._locs['hashes'][i]
+		if i < 0 or i > len(self._locs['records'])-1: return None
+		self._del_loc(list(self._locs['records'])[i])
+
+	def _del_loc(self, loc_id:LocId) -> None:
+		loc_hash = self._locs['records'].pop(loc_id)
+		name, _, place = loc_hash
+		del self._locs['ids'][loc_hash]
+		self._del_id(self._locs['names'], name, loc_id)
+		self._del_id(self._locs['places'], place, loc_id)
+		self._place_changed(place)
 
 	def del_all_locs_by_place(self, loc_place:Union[str, int]) -> None:
 		""" del all locations by place. loc_place - path at file with qsp_location """
-		while loc_place in self._locs['places']:
-			i = self._locs['places'].index(loc_place)
-			self.del_loc_by_index(i)
-
-	def loc_hash_update(self, i:int) -> None:
-		""" Обновляем хэш локации """
-		self._locs['hashes'][i] = (
-			self._locs['names'][i],
-			self._locs['regions'][i],
-			self._locs['places'][i]
-		)
+		for loc_id in list(self._locs['places'].get(loc_place, ())):
+			self._del_loc(loc_id)
+
+	# Locations are refreshed in async thread, when they are read in main thread.
+	# list() of dict is copied without switching of threads, so copies are read.
 
 	def get_locs(self) -> List[LocHash]:
-		return self._locs['hashes'].copy()
-	
+		return list(self._locs['records'].values())
+
 	def get_locs_names(self) -> List[LocName]:
 		"""	Extract all qsp-location's names. """
-		return self._locs['names'].copy()
+		return [name for name, _, _ in self.get_locs()]
+
+	def get_locs_by_name(self, name:LocName) -> List[LocHash]:
+		""" All qsp-locations with this name. """
+		records = self._locs['records']
+		loc_ids = list(self._locs['names'].get(name, ()))
+		return [loc_hash for loc_hash in map(records.get, loc_ids) if loc_hash is not None]
 
 	def refresh_qsplocs(self, view:sublime.View, current_qsps:Optional[Path]) -> None:
 		"""	Refresh list of QSP-locations created on this view """
@@ -122,28 +165,32 @@ class QspWorkspace:
 
 	def clear_old_qsplocs(self, views:List[sublime.View]) -> None:
 		""" Delete locations from WS, if this views don't exist. """
-		view_ids = [v.id() for v in views]
-		for place in self._locs['places']:
+		view_ids = set(v.id() for v in views)
+		for place in list(self._locs['places']):
 			if isinstance(place, int) and not place in view_ids:
 				self.del_all_locs_by_place(place)
 
 	def locs_dupl(self) -> List[LocHash]: # list[tuples(name, region, place)] *[1]
 		""" Get qsp-locations with duplicate names. """
 		qsp_locs:List[LocHash] = [] # list[tuples(name, region, place)]
-		exclude_hashes:List[LocHash] = []
-		for i, loc_hash in enumerate(self._locs['hashes']):
-			loc_name, _, _ = loc_hash
-			if (not loc_hash in exclude_hashes) and (loc_name in self._locs['names'][i+1:]):
-				qsp_locs.append(loc_hash)
-				exclude_hashes.append(loc_hash)
-				u = i + 1
-				while u < len(self._locs['hashes']) and loc_name in self._locs['names'][u:]:
-					u = self._locs['names'].index(loc_name, u)
-					qsp_locs.append(self._locs['hashes'][u]) # add duplicate to out list
-					exclude_hashes.append(self._locs['hashes'][u])
-					u += 1 # search next location
+		names:Dict[LocName, List[LocHash]] = {}
+		for loc_hash in self.get_locs():
+			names.setdefault(loc_hash[0], []).append(loc_hash)
+		# names in order of first location, duplicates of name after it
+		for locs in names.values():
+			if len(locs) > 1: qsp_locs.extend(locs)
 		return qsp_locs
 
+	def _place_changed(self, place:Union[Path, ViewId]) -> None:
+		if isinstance(place, str): self._changed_places.add(place)
+
+	@staticmethod
+	def _del_id(index:Dict[Any, Dict[LocId, None]], key:Any, loc_id:LocId) -> None:
+		""" Delete id from index, and key without ids. """
+		loc_ids = index[key]
+		del loc_ids[loc_id]
+		if not loc_ids: del index[key]
+
 # --------------------------------- qsp-locations mb functions ---------------------------------
 
 # ----------------------------------- qsps-files mb functions -----------------------------------
@@ -154,83 +201,193 @@ class QspWorkspace:
 			list[tuples(path_of_file:str, hash_of_file:str)]
 		"""
 		# all pathes in list of pathes are abs. Dont need use absing func.
-		return list(zip(self._qsps_files['pathes'], self._qsps_files['hashes']))
+		return list(self._qsps_files['hashes'].items())
 
-	def add_qsps_file(self, qsps_file_path:str, qsps_file_hash:str) -> None:
+	def add_qsps_file(self, qsps_file_path:str, qsps_file_hash:str,
+			file_stat:Optional[FileStat]=None) -> None:
 		""" Add qsps-file to WS """
-		self._qsps_files['pathes'].append(qsps_file_path)
-		self._qsps_files['hashes'].append(qsps_file_hash)
+		self._qsps_files['hashes'][qsps_file_path] = qsps_file_hash
+		self._place_changed(qsps_file_path)
+		file_stat = (file_stat or self.get_stat(qsps_file_path))
+		if file_stat is not None:
+			self._qsps_files['stats'][qsps_file_path] = file_stat
+		else:
+			self._qsps_files['stats'].pop(qsps_file_path, None)
 
 	def del_qsps_file(self, path:str) -> None:
-		if path in self._qsps_files['pathes']:
-			i = self._qsps_files['pathes'].index(path)
-			del self._qsps_files['pathes'][i]
-			del self._qsps_files['hashes'][i]
+		self._qsps_files['hashes'].pop(path, None)
+		self._qsps_files['stats'].pop(path, None)
+		self._symbols.remove_file(path)
+		self._place_changed(path)
 
 	def replace_qsps_file(self, old_path:str, new_path:str) -> None:
 		""" When replace the phisically file, or rename it,
 		this func replace old file by new in WS. """
-		if old_path in self._qsps_files['pathes']:
-			i = self._qsps_files['pathes'].index(old_path)
-			self._qsps_files['pathes'][i] = new_path
+		if old_path in self._qsps_files['hashes']:
+			self.add_qsps_file(new_path, self._qsps_files['hashes'].pop(old_path))
+			self._qsps_files['stats'].pop(old_path, None)
+			self._symbols.replace_file(old_path, new_path)
+			self._place_changed(old_path)
 
 	def refresh_qsps_files(self, window_folders:List[AbsPath]) -> None:
 		""" refresh files mb in ws """
-		old = set(self.get_qsps_files()) # set[tuple(abs-path, hash)]
+		for _ in self.refresh_qsps_files_steps(window_folders): pass
+
+	def refresh_qsps_files_steps(self, window_folders:List[AbsPath],
+			batch_size:int=0) -> Iterator[Tuple[int, int]]:
+		"""
+			Refresh files mb in ws by batches of files. Locations of every batch
+			are in ws before yield of number of refreshed files and number of all files.
+			Removed files are deleted from ws after last batch.
+		"""
+		if window_folders: self.set_hash_name(self.project_hash_name(window_folders[0]))
+		old = self._qsps_files['hashes'].copy() # dict[abs-path, hash]
 		files_pathes:List[AbsPath] = []
 		for f in window_folders:
 			files_pathes.extend(qsp.get_files_list(f))
-		new:Set[Tuple[AbsPath, HashMD5]] = set()
+		new_stats:Dict[AbsPath, FileStat] = {}
 		for f in files_pathes:
-			new.add((f, self.get_hash(f))) # set[tuple(abs-path, hash)]
-		to_del:List[Tuple[AbsPath, HashMD5]] = list(old - new)
-		to_add:List[Tuple[AbsPath, HashMD5]] = list(new - old)
-		to_del_paths:List[AbsPath] = [path for path, _hash in to_del]
-		to_del_hashs:List[HashMD5] = [_hash for _, _hash in to_del]
-		# replace on new paths
-		for new_path, md5 in to_add[:]: # to_add = list[tuples(file_path, file_hash)]
-			if md5 in to_del_hashs:
-				i = to_del_hashs.index(md5)
-				old_path = to_del_paths[i]
-				self.replace_qsps_file(old_path, new_path)
-				self.replace_locs(old_path, new_path)
-				del to_del[i]
-				del to_del_hashs[i]
-				del to_del_paths[i]
-			else:
-				qsps_file = QspsFile()
-				qsps_file.read_from_file(new_path)
-				qsps_file.split_to_locations()
-				for loc_name, loc_region in qsps_file.get_loc_symbols():
-					# str, tuple(start, end)
-					self.add_loc(loc_name, loc_region, new_path)
-				self.add_qsps_file(new_path, md5)
+			file_stat = self.get_stat(f)
+			if file_stat is not None: new_stats[f] = file_stat
+		# moved files are found by hash of removed files
+		removed = {path: md5 for path, md5 in old.items() if not path in new_stats}
+		removed_by_hash = {md5: path for path, md5 in removed.items()}
+		new_pathes = list(new_stats)
+		batch_size = (batch_size or len(new_pathes) or 1)
+		for start in range(0, len(new_pathes), batch_size):
+			batch = new_pathes[start:start+batch_size]
+			# hash is calculated only for files with changed size or time
+			to_hash = [f for f in batch if not (f in old and self._qsps_files['stats'].get(f) == new_stats[f])]
+			new = self._hash_files(to_hash)
+			for new_path in batch:
+				if new_path in to_hash and not new_path in new:
+					# file is deleted or renamed after listing of folders
+					if new_path in old: removed[new_path] = old[new_path]
+					continue
+				md5 = new.get(new_path, old.get(new_path, ''))
+				if old.get(new_path) == md5 and self._symbols.has_file(new_path):
+					self._qsps_files['stats'][new_path] = new_stats[new_path]
+				elif not new_path in old and md5 in removed_by_hash:
+					old_path = removed_by_hash.pop(md5)
+					del removed[old_path]
+					self.replace_qsps_file(old_path, new_path)
+					self.replace_locs(old_path, new_path)
+				else:
+					# new file, or file is changed not in ST
+					qsps_file = self._read_qsps_file(new_path)
+					if qsps_file is None:
+						if new_path in old: removed[new_path] = old[new_path]
+						continue
+					self.del_all_locs_by_place(new_path)
+					for loc_name, loc_region in qsps_file.get_loc_symbols():
+						# str, tuple(start, end)
+						self.add_loc(loc_name, loc_region, new_path)
+					self._symbols.update_file(new_path, qsps_file.get_src())
+					self.add_qsps_file(new_path, md5, new_stats[new_path])
+			yield start + len(batch), len(new_pathes)
 
 		# replace old files
-		for old_path, md5 in to_del:
+		for old_path in removed:
 			self.del_all_locs_by_place(old_path)
 			self.del_qsps_file(old_path)
 
+	def set_hash_name(self, hash_name:str) -> None:
+		""" Hash of files. Stats are dropped, if hash is changed, so all files are rehashed. """
+		if not hash_name in self.HASH_NAMES or hash_name == self.hash_name: return
+		self.hash_name = hash_name
+		# digests of other hash can't be compared, and files can't be found by them
+		self._qsps_files['stats'].clear()
+
+	@staticmethod
+	def project_hash_name(project_folder:Path) -> str:
+		""" Hash of files from qsp-project.json of project folder. """
+		project_file = os.path.join(project_folder, const.PROJECT_FILE_NAME)
+		try:
+			with open(project_file, 'r', encoding='utf-8') as fp:
+				project_json = json.load(fp)
+		except (OSError, ValueError):
+			return 'md5'
+		hash_name = project_json.get('workspace_hash', 'md5') if isinstance(project_json, dict) else 'md5'
+		return hash_name if hash_name in QspWorkspace.HASH_NAMES else 'md5'
+
+	def _hash_files(self, files_pathes:List[AbsPath]) -> Dict[AbsPath, HashMD5]:
+		"""
+			Hashes of files. hashlib releases GIL, so files are hashed in threads.
+			Files, which are deleted after listing, are not in result.
+		"""
+		if len(files_pathes) < 2:
+			hashes:Iterator[Optional[HashMD5]] = map(self._hash_if_exists, files_pathes)
+			return {f: h for f, h in zip(files_pathes, hashes) if h is not None}
+		workers = min(self.HASH_WORKERS, len(files_pathes))
+		with ThreadPoolExecutor(max_workers=workers) as executor:
+			hashes = executor.map(self._hash_if_exists, files_pathes)
+			return {f: h for f, h in zip(files_pathes, hashes) if h is not None}
+
+	def _hash_if_exists(self, file_path:AbsPath) -> Optional[HashMD5]:
+		try:
+			return self.get_hash(file_path, self.hash_name)
+		except OSError:
+			return None
+
+	@staticmethod
+	def _read_qsps_file(file_path:AbsPath) -> Optional[QspsFile]:
+		""" Qsps-file split to locations, or None, if file is deleted after listing. """
+		if not os.path.isfile(file_path): return None
+		qsps_file = QspsFile()
+		try:
+			qsps_file.read_from_file(file_path)
+		except OSError:
+			return None
+		qsps_file.split_to_locations()
+		return qsps_file
+
 	def refresh_md5(self, qsps_file_path:str) -> None:
 		""" Refreshing md5 of file by path """
-		if qsps_file_path in self._qsps_files['pathes']:
-			i = self._qsps_files['pathes'].index(qsps_file_path)
-			self._qsps_files['hashes'][i] = self.get_hash(qsps_file_path)
+		if qsps_file_path in self._qsps_files['hashes']:
+			self.add_qsps_file(qsps_file_path, self.get_hash(qsps_file_path, self.hash_name))
+
+	def refresh_symbols(self, qsps_file_path:str) -> None:
+		""" Refresh symbols of saved file. """
+		qsps_file = QspsFile()
+		qsps_file.read_from_file(qsps_file_path)
+		self._symbols.update_file(qsps_file_path, qsps_file.get_src())
+		self._place_changed(qsps_file_path)
+
+	def get_symbol_index(self) -> SymbolIndex:
+		""" Locations, labels and call sites of qsps-files. """
+		return self._symbols
 
 	def qsps_file_is_exist(self, qsps_file_path:str) -> bool:
 		""" Prove qsps-file is exist in WS """
-		return qsps_file_path in self._qsps_files['pathes']
+		return qsps_file_path in self._qsps_files['hashes']
 
 	def qsps_files_number(self) -> int:
 		"""
 			Return number of qsps-files in WS.
 		"""
-		return len(self._qsps_files['pathes'])
+		return len(self._qsps_files['hashes'])
 
 # ----------------------------------- qsps-files mb functions -----------------------------------
 
 # ---------------------------------------- WS functions ----------------------------------------
 
+	def extract_from_folder(self, project_folder:Path) -> bool:
+		"""
+			Extract WS from sqlite-file of project folder, or from json-file,
+			if sqlite-file is not exist or not available. Return True, if WS is extracted.
+		"""
+		self._storage = WsStorage(os.path.join(project_folder, const.WS_DB_FILE_NAME))
+		ws_json = self._storage.load()
+		if ws_json is not None:
+			self._extract_json_struct(ws_json)
+			self._storage_is_actual = True
+			return True
+		ws_file_path = os.path.join(project_folder, const.WS_FILE_NAME)
+		if os.path.isfile(ws_file_path):
+			self.extract_from_file(ws_file_path) # storage is filled at first save
+			return True
+		return False
+
 	def extract_from_file(self, ws_file_path:str) -> None:
 		"""
 			Extract data from file to WS. ws_file_path - is abspath to ws-json file.
@@ -239,9 +396,13 @@ class QspWorkspace:
 		"""
 		with open(ws_file_path, "r", encoding="utf-8") as fp:
 			ws_json = json.load(fp) # get json struct ws from file
+		self._extract_json_struct(ws_json)
 
-		if len(self._locs['hashes']) > 0:
+	def _extract_json_struct(self, ws_json:WsJson) -> None:
+		if len(self._locs['records']) > 0:
+			storage = self._storage
 			self.__init__(self._all_ws)
+			self._storage = storage
 			qsp.write_error_log(const.QSP_ERROR_MSG.WS_ALREADY_INIT)
 
 		for place, qsp_locs in ws_json['locations'].items():
@@ -251,37 +412,93 @@ class QspWorkspace:
 			# qsp_locs = list[qsp_loc];
 			# qsp_loc = list[name, list[start_point, end_point]]
 			for name, region in qsp_locs:
-				self.add_loc(name, tuple(region), place)
+				self.add_loc(name, cast(ViewRegion, tuple(region)), place)
 
+		hash_name = ws_json.get('hash_name', 'md5')
+		if hash_name in self.HASH_NAMES: self.hash_name = hash_name
+		files_stats = ws_json.get('files_stats', {})
 		for path, md5 in ws_json['files_paths'].items():
-			self._qsps_files['pathes'].append(path)
-			self._qsps_files['hashes'].append(md5)
-
-	def get_json_struct(self) -> WsJson:
-		qsp_ws_out:WsJson = { 'locations': {}, 'files_paths': {} }
+			self._qsps_files['hashes'][path] = md5
+			if path in files_stats:
+				self._qsps_files['stats'][path] = cast(FileStat, tuple(files_stats[path]))
+		if 'symbols' in ws_json:
+			# without symbols files are read again by refreshing
+			ws_symbols = ws_json['symbols']
+			for path in ws_json['files_paths']:
+				self._symbols.set_symbols(path, [QspSymbol(kind, name, path, line, char, location, command)
+					for kind, name, line, char, location, command in ws_symbols.get(path, [])])
+		self._changed_places.clear()
+
+	def get_json_struct(self, places:Optional[Set[Path]]=None) -> WsJson:
+		""" All WS as json-structure, or only locations and files of places. """
+		qsp_ws_out:WsJson = {
+			'locations': {}, 'files_paths': {}, 'files_stats': {}, 'hash_name': self.hash_name,
+			'symbols': {} }
 		qsp_locs_out = qsp_ws_out['locations']
 		qsp_files_out = qsp_ws_out['files_paths']
-		for qsp_loc in self._locs['hashes']:
-			qsps_file_path = qsp_loc[2]
-			if isinstance(qsps_file_path, int): continue
-			if not qsps_file_path in qsp_locs_out: qsp_locs_out[qsps_file_path] = []
-			qsp_locs_out[qsps_file_path].append((qsp_loc[0], qsp_loc[1]))
-		for i, qsps_file_path in enumerate(self._qsps_files['pathes']):
+		qsp_stats_out = qsp_ws_out['files_stats']
+		qsp_symbols_out = qsp_ws_out['symbols']
+		records = self._locs['records']
+		hashes = self._qsps_files['hashes']
+		stats = self._qsps_files['stats']
+		# in order of ws for all places; indexer may change ws in other thread,
+		# so dicts are copied by list() and read by get()
+		locs_places = list(self._locs['places'] if places is None else places)
+		files_places = list(hashes if places is None else places)
+		for qsps_file_path in locs_places:
+			loc_ids = list(self._locs['places'].get(qsps_file_path, ()))
+			if isinstance(qsps_file_path, int) or not loc_ids: continue
+			qsp_locs_out[qsps_file_path] = [ # type: ignore
+				loc_hash[:2] for loc_hash in map(records.get, loc_ids) if loc_hash is not None]
+		for qsps_file_path in files_places:
+			file_hash = hashes.get(qsps_file_path)
+			if file_hash is None: continue
 			# TODO: здесь часть путей должна преобразовываться в относительные
 			# перед возвращением в виде json-структуры.
-			qsp_files_out[qsps_file_path] = self._qsps_files['hashes'][i]
+			qsp_files_out[qsps_file_path] = file_hash
+			file_stat = stats.get(qsps_file_path)
+			if file_stat is not None:
+				qsp_stats_out[qsps_file_path] = file_stat
+			qsp_symbols_out[qsps_file_path] = [
+				(symbol.kind, symbol.name, symbol.line, symbol.char, symbol.location, symbol.command)
+				for symbol in self._symbols.get_file_symbols(qsps_file_path)]
 		return qsp_ws_out
 
 	def save_to_file(self, project_folder:Path='') -> None:
 		"""
-			Save WS in json-file. project_folder must be exist!
+			Save WS in sqlite-file, or in json-file, if sqlite is not available.
+			project_folder must be exist!
 		"""
 		if not project_folder: return
+		if WsStorage.available():
+			self.save_changes(project_folder)
+			return
 		json_ws = self.get_json_struct()
 		if not 'locations' in json_ws or not json_ws['locations']: return
-		ws_json_path = os.path.join(project_folder, 'qsp-project-workspace.json')
+		self.export_json(os.path.join(project_folder, const.WS_FILE_NAME))
+		self._changed_places.clear()
+
+	def save_changes(self, project_folder:Path='') -> None:
+		"""
+			Save locations and files of changed places in sqlite-file. Without
+			sqlite WS is saved in json only when project is closing.
+		"""
+		if not project_folder or not WsStorage.available(): return
+		if self._storage is None:
+			self._storage = WsStorage(os.path.join(project_folder, const.WS_DB_FILE_NAME))
+		if not self._storage_is_actual:
+			self._storage_is_actual = self._storage.save(self.get_json_struct())
+			if self._storage_is_actual: self._changed_places.clear()
+			return
+		if not self._changed_places: return
+		changed_places = self._changed_places.copy()
+		if self._storage.save(self.get_json_struct(changed_places), changed_places):
+			self._changed_places -= changed_places
+
+	def export_json(self, ws_json_path:Path) -> None:
+		""" Save all WS in json-file. """
 		with open(ws_json_path, "w", encoding="utf-8") as ws_fp:
-			json.dump(json_ws, ws_fp, indent=4, ensure_ascii=False)
+			json.dump(self.get_json_struct(), ws_fp, indent=4, ensure_ascii=False)
 
 	def refresh_from_views(self, windows_views:List[sublime.View], window_folders:List[AbsPath]) -> None:
 		"""
@@ -430,15 +647,25 @@ class QspWorkspace:
 # ---------------------------------- variables mb function in WS ----------------------------------
 
 	@staticmethod
-	def get_hash(file_path:str) -> str:
-		md5_hash = hashlib.new('md5')
+	def get_hash(file_path:str, hash_name:str='md5') -> str:
+		# blake2b is faster than md5 on 64-bit, 16 bytes are as long as md5
+		file_hash = (hashlib.blake2b(digest_size=16) if hash_name == 'blake2b' else hashlib.new('md5'))
 		with open(file_path, 'rb') as file:
 			while True:
-				data = file.read(1024)
+				data = file.read(QspWorkspace.HASH_BUFFER)
 				if not data:
 					break
-				md5_hash.update(data)
-		return md5_hash.hexdigest()
+				file_hash.update(data)
+		return file_hash.hexdigest()
+
+	@staticmethod
+	def get_stat(file_path:str) -> Optional[FileStat]:
+		""" Size and time of file change, or None for unavailable file. """
+		try:
+			stat = os.stat(file_path)
+		except OSError:
+			return None
+		return (stat.st_size, stat.st_mtime_ns)
 
 	@staticmethod
 	def project_folder(view:sublime.View) -> Optional[Path]:
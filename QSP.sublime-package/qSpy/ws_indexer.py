@@ -0,0 +1,77 @@
+import sublime			# type: ignore
+
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .plugtypes import (AbsPath, Path)
+from .workspace import QspWorkspace
+
+class QspWsIndexer:
+	"""
+		Background refreshing of qsps-files in workspace. Every batch of files
+		is refreshed by separate call in async thread, so other events are not
+		waiting for all project. Locations of batch are available at once.
+	"""
+	BATCH_SIZE = 50
+	_running:Dict[Path, 'QspWsIndexer'] = {} # indexers by project folder
+
+	def __init__(self, window:sublime.Window, qsp_ws:QspWorkspace, project_folder:Path,
+			folders:List[AbsPath]) -> None:
+		self._window = window
+		self._ws = qsp_ws
+		self._project_folder = project_folder
+		self._folders = folders
+		self._steps:Optional[Iterator[Tuple[int, int]]] = None
+		self._cancelled = False
+
+	@classmethod
+	def start(cls, window:sublime.Window, qsp_ws:QspWorkspace, project_folder:Path) -> 'QspWsIndexer':
+		""" Start indexing of project folders. Old indexing of project is cancelled. """
+		cls.cancel(project_folder)
+		indexer = cls._running[project_folder] = cls(window, qsp_ws, project_folder, window.folders())
+		sublime.set_timeout_async(indexer._step, 0)
+		return indexer
+
+	@classmethod
+	def cancel(cls, project_folder:Path) -> None:
+		indexer = cls._running.pop(project_folder, None)
+		if indexer is not None: indexer._cancelled = True
+
+	@classmethod
+	def is_running(cls, project_folder:Path) -> bool:
+		return project_folder in cls._running
+
+	def _step(self) -> None:
+		if self._cancelled or self._ws.project_is_closing():
+			if self._steps is not None: self._steps.close()
+			self._forget()
+			return None
+		next_step = False
+		try:
+			if self._steps is None:
+				self._steps = self._ws.refresh_qsps_files_steps(self._folders, self.BATCH_SIZE)
+			try:
+				done, total = next(self._steps)
+			except StopIteration:
+				self._finish()
+				return None
+			self._status(f'QSP: indexing files {done}/{total}')
+			sublime.set_timeout_async(self._step, 0) # next batch after other events
+			next_step = True
+		except Exception:
+			self._status('QSP: indexing of files is stopped by error')
+			raise
+		finally:
+			# indexing may be started again, if it is finished or broken
+			if not next_step: self._forget()
+
+	def _finish(self) -> None:
+		self._ws.refresh_from_views(self._window.views(), self._folders)
+		self._ws.save_changes(self._project_folder)
+		self._status('QSP: files are indexed')
+
+	def _forget(self) -> None:
+		if self._running.get(self._project_folder) is self:
+			del self._running[self._project_folder]
+
+	def _status(self, message:str) -> None:
+		self._window.status_message(message)
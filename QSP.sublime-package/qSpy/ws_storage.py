@@ -0,0 +1,125 @@
+import os
+from contextlib import closing
+from typing import Any, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+try:
+	import sqlite3
+except ImportError: # python of some builds of ST has no sqlite3
+	sqlite3 = None # type: ignore
+
+from .plugtypes import Path
+
+if TYPE_CHECKING:
+	from .workspace import WsJson
+
+class WsStorage:
+	"""
+		Workspace in sqlite-file: locations and files by place. Only rows of
+		changed places are rewritten, so workspace may be saved on every change.
+	"""
+	VERSION = 1
+	SYMBOLS_VERSION = 1 # symbols are added to db of version 1
+
+	def __init__(self, db_path:Path) -> None:
+		self._db_path = db_path
+
+	@staticmethod
+	def available() -> bool:
+		return sqlite3 is not None
+
+	def exists(self) -> bool:
+		return os.path.isfile(self._db_path)
+
+	def load(self) -> Optional['WsJson']:
+		""" Workspace as json-structure, or None, if file is not actual. """
+		if not (self.available() and self.exists()): return None
+		try:
+			with closing(self._connect()) as conn, conn:
+				meta = dict(conn.execute('SELECT key, value FROM meta').fetchall())
+				if meta.get('version') != str(self.VERSION): return None
+				ws_json:'WsJson' = {
+					'locations': {}, 'files_paths': {}, 'files_stats': {},
+					'hash_name': meta.get('hash_name', 'md5')}
+				locations = ws_json['locations']
+				for place, name, start, end in conn.execute(
+						'SELECT place, name, start, end FROM locations ORDER BY rowid'):
+					locations.setdefault(place, []).append((name, (start, end)))
+				for path, md5, size, mtime_ns in conn.execute(
+						'SELECT path, hash, size, mtime_ns FROM files ORDER BY rowid'):
+					ws_json['files_paths'][path] = md5
+					if size is not None: ws_json['files_stats'][path] = (size, mtime_ns)
+				if meta.get('symbols') == str(self.SYMBOLS_VERSION):
+					# files without symbols are read again by refreshing of workspace
+					symbols = ws_json['symbols'] = {}
+					for place, *symbol in conn.execute(
+							'SELECT place, kind, name, line, char, location, command FROM symbols ORDER BY rowid'):
+						symbols.setdefault(place, []).append(tuple(symbol)) # type: ignore
+			return ws_json
+		except sqlite3.Error as e:
+			print(f'[116] Workspace is not loaded from "{self._db_path}". Error: "{e}".')
+			return None
+
+	def save(self, ws_json:'WsJson', places:Optional[Iterable[Path]] = None) -> bool:
+		"""
+			Write rows of places from ws_json. Rows of places, which are not
+			in ws_json, are deleted. All workspace is rewritten, if places is None.
+		"""
+		if not self.available(): return False
+		try:
+			with closing(self._connect()) as conn, conn:
+				if places is None:
+					conn.execute('DELETE FROM locations')
+					conn.execute('DELETE FROM files')
+					conn.execute('DELETE FROM symbols')
+				else:
+					rows = [(place,) for place in places]
+					conn.executemany('DELETE FROM locations WHERE place = ?', rows)
+					conn.executemany('DELETE FROM files WHERE path = ?', rows)
+					conn.executemany('DELETE FROM symbols WHERE place = ?', rows)
+				conn.executemany('INSERT INTO locations (place, name, start, end) VALUES (?, ?, ?, ?)',
+					self._locations_rows(ws_json))
+				conn.executemany('INSERT INTO files (path, hash, size, mtime_ns) VALUES (?, ?, ?, ?)',
+					self._files_rows(ws_json))
+				conn.executemany('INSERT INTO symbols (place, kind, name, line, char, location, command) '
+					'VALUES (?, ?, ?, ?, ?, ?, ?)', self._symbols_rows(ws_json))
+				conn.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', [
+					('version', str(self.VERSION)),
+					('hash_name', ws_json.get('hash_name', 'md5')),
+					('symbols', str(self.SYMBOLS_VERSION))])
+			return True
+		except sqlite3.Error as e:
+			print(f'[115] Workspace is not saved in "{self._db_path}". Error: "{e}".')
+			return False
+
+	def _connect(self) -> 'sqlite3.Connection':
+		conn = sqlite3.connect(self._db_path)
+		conn.executescript('''
+			CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+			CREATE TABLE IF NOT EXISTS locations (place TEXT, name TEXT, start INTEGER, end INTEGER);
+			CREATE INDEX IF NOT EXISTS locations_place ON locations (place);
+			CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, hash TEXT, size INTEGER, mtime_ns INTEGER);
+			CREATE TABLE IF NOT EXISTS symbols (place TEXT, kind TEXT, name TEXT, line INTEGER, char INTEGER,
+				location TEXT, command TEXT);
+			CREATE INDEX IF NOT EXISTS symbols_place ON symbols (place);
+		''')
+		return conn
+
+	@staticmethod
+	def _locations_rows(ws_json:'WsJson') -> List[Tuple[Any, ...]]:
+		return [(place, name, region[0], region[1])
+			for place, qsp_locs in ws_json.get('locations', {}).items()
+			for name, region in qsp_locs]
+
+	@staticmethod
+	def _files_rows(ws_json:'WsJson') -> List[Tuple[Any, ...]]:
+		files_stats:Dict[Path, Any] = ws_json.get('files_stats', {})
+		rows:List[Tuple[Any, ...]] = []
+		for path, md5 in ws_json.get('files_paths', {}).items():
+			size, mtime_ns = files_stats.get(path, (None, None))
+			rows.append((path, md5, size, mtime_ns))
+		return rows
+
+	@staticmethod
+	def _symbols_rows(ws_json:'WsJson') -> List[Tuple[Any, ...]]:
+		return [(place, *symbol)
+			for place, symbols in ws_json.get('symbols', {}).items()
+			for symbol in symbols]
@@ -0,0 +1,104 @@
+# _base_fast_test_.py
+# Differential test: fast path for simple base blocks vs BaseScanner -> BaseParser -> BaseInt.
+# Run from QSP.sublime-package folder (see readme.md).
+import contextlib
+import glob
+import io
+import os
+import random
+import time
+from typing import List
+
+from qSpy.converter import QspToQspsBuiltinConv, QspsFile
+from qSpy.converter.base_fast import split_simple_base
+from qSpy.converter.qsp_location import QspsLoc
+
+EXAMPLES = os.path.join('..', '_examples')
+
+def full_pipeline(base_code:List[str]):
+    loc = QspsLoc('test', [], (0, 0))
+    loc._base_code = base_code
+    with contextlib.redirect_stdout(io.StringIO()):
+        loc._split_base_full()
+    return loc.desc(), loc.actions()
+
+def example_blocks() -> List[List[str]]:
+    sources:List[List[str]] = []
+    for path in glob.glob(os.path.join(EXAMPLES, '**', '*.qsps'), recursive=True):
+        with open(path, 'r', encoding='utf-8-sig') as fp:
+            sources.append(fp.readlines())
+    for path in glob.glob(os.path.join(EXAMPLES, '**', '*.qsp'), recursive=True):
+        game = QspToQspsBuiltinConv()
+        with contextlib.redirect_stdout(io.StringIO()):
+            game.read_from_file(path)
+            game.split_qsp()
+            sources.append(''.join(game.to_qsps()).splitlines(keepends=True))
+    blocks:List[List[str]] = []
+    for lines in sources:
+        qsps_file = QspsFile(lines)
+        qsps_file.split_to_locations()
+        blocks.extend(loc._base_code for loc in qsps_file.get_locations() if loc._base_code)
+    return blocks
+
+SAMPLES = [
+    "*P 'text'\n",
+    "*p \"text \"\"quoted\"\"\"\n",
+    "*P 'first\nsecond'\n*P ' third'\n",
+    "*P'no space'\n",
+    "*PL 'print line'\n",
+    "*P 'a' & *P 'b'\n",
+    "*P 'a' + 'b'\n",
+    "*P $var\n",
+    "\t*P 'preformatted'\n\n! comment\n",
+    "ACT 'go':\n\tgoto 'place'\nEND\n",
+    "act 'go', 'img.png' :\n\tgoto 'place'\nend\n",
+    "ACT 'go':\n\tif x = 1:\n\t\tgoto 'a'\n\telse\n\t\tgoto 'b'\n\tend\nEND\n",
+    "ACT 'go':\n\tif x = 1: goto 'a'\n\t*pl 'end of text'\nEND\n",
+    "ACT 'go':\n\t*pl 'multiline\nEND\n'\nEND\n",
+    "ACT 'go':\n\tdynamic {\nEND\n}\nEND\n",
+    "ACT 'go':\n\tx = (1 +\nEND\n)\nEND\n",
+    "ACT 'go':\n\tloop while i < 3 step i += 1:\n\tend\nEND\n",
+    "ACT 'go':\n\tif x: ! comment\n\tend if\nEND\n",
+    "ACT 'go': goto 'one line'\n",
+    "ACT 'go':\n\tx = 1 & if y:\n\tend\nEND\n",
+    "ACT 'go':\n\tgoto 'a'\nEND ! close\n*P 'after'\n",
+    "ACT 'go':\n\t! don't\n\tgoto 'a'\nEND\n",
+    "ACT 'a':\nEND\nACT 'b':\n\tk = 1\nEND\n",
+    "ACT 'a' + 'b':\n\tk = 1\nEND\n",
+    "ACT 'go':\n\tif (a = ':'): k = 1\nEND\n",
+    "ACT 'go':\n\tif {x:}: k = 1\nEND\n",
+    "ACT 'go':\n\tk = [1)\nEND\n",
+]
+
+def mutations(count:int) -> List[List[str]]:
+    """ Random base blocks: several samples, sometimes without one line. """
+    rnd = random.Random(7)
+    blocks:List[List[str]] = []
+    for _ in range(count):
+        lines = ''.join(rnd.choice(SAMPLES) for _ in range(rnd.randint(1, 4))).splitlines(keepends=True)
+        if rnd.random() < 0.3: del lines[rnd.randrange(len(lines))]
+        blocks.append(lines)
+    return blocks
+
+if __name__ == "__main__":
+    blocks = example_blocks()
+    synthetic = [sample.splitlines(keepends=True) for sample in SAMPLES] + mutations(3000)
+    fast_count, equal_count = 0, 0
+    for base_code in blocks + synthetic:
+        block = split_simple_base(base_code)
+        if block is None: continue # fast path declined, block goes to BaseInt
+        fast_count += 1
+        assert block == full_pipeline(base_code), ''.join(base_code)
+        equal_count += 1
+    examples_fast = sum(1 for b in blocks if split_simple_base(b) is not None)
+    print(f'Examples: {examples_fast} of {len(blocks)} base blocks by fast path.')
+    print(f'All: {fast_count} of {len(blocks) + len(synthetic)} blocks by fast path, '
+        f'{equal_count} of {fast_count} equal to BaseInt.')
+
+    old = time.perf_counter()
+    for base_code in blocks: full_pipeline(base_code)
+    full = time.perf_counter() - old
+    old = time.perf_counter()
+    for base_code in blocks: split_simple_base(base_code) or full_pipeline(base_code)
+    fast = time.perf_counter() - old
+    print(f'Base blocks of examples: full {full:.3f} s, with fast path {fast:.3f} s, x{full / fast:.1f}')
@@ -0,0 +1,68 @@
+# _codec_bench_.py
+# Throughput of QSP-cipher: old per-char loops vs qsp_codec.
+# Run from QSP.sublime-package folder (see readme.md).
+import os
+import time
+from typing import Callable, Dict, List
+
+from qSpy.converter.qsp_codec import encode_qsp_text, decode_qsp_text, decode_cp1251_qsp_text
+from qSpy.converter.tools import QSP_CODREMOV
+
+GAME = os.path.join('..', '_examples', 'examples_finder', 'drive.qsp')
+SIZE_MB = 20
+
+def old_encode(qsps_line:str, cache:Dict[str, str]={}) -> str:
+    exit_line:List[str] = []
+    for point in qsps_line:
+        if point not in cache:
+            cache[point] = chr(ord(point) - QSP_CODREMOV)
+        exit_line.append(cache[point])
+    return ''.join(exit_line)
+
+def old_decode(qsp_line:str, cache:Dict[str, str]={}) -> str:
+    exit_line:List[str] = []
+    for char in qsp_line:
+        if char not in cache:
+            cache[char] = chr(ord(char) + QSP_CODREMOV)
+        exit_line.append(cache[char])
+    return ''.join(exit_line)
+
+def old_decode_cp1251(qsp_line:str, cache:Dict[str, str]={}) -> str:
+    exit_line:List[str] = []
+    for char in qsp_line:
+        if char not in cache:
+            b = char.encode('cp1251')[0]
+            cache[char] = bytes(((b + QSP_CODREMOV) & 0xFF,)).decode('cp1251')
+        exit_line.append(cache[char])
+    return ''.join(exit_line)
+
+def bench(name:str, func:Callable[[str], str], text:str) -> float:
+    old = time.perf_counter()
+    func(text)
+    elapsed = time.perf_counter() - old
+    mb = len(text.encode('utf-16-le', 'surrogatepass')) / 2**20
+    print(f'{name:<24} {mb / elapsed:10.1f} MB/s')
+    return elapsed
+
+if __name__ == "__main__":
+    with open(GAME, 'r', encoding='utf-16-le') as fp:
+        game_text = fp.read().replace('\n', '')
+    game_text = game_text * (SIZE_MB * 2**19 // len(game_text) + 1)
+    qsps_text = decode_qsp_text(game_text)
+    # 0x98 is not defined in cp1251, and 0x93 becomes 0x98 after decoding
+    cp1251_raw = qsps_text.encode('cp1251', 'ignore').translate(None, b'\x93\x98')
+    cp1251_text = cp1251_raw.decode('cp1251')
+
+    print(f'Game "{GAME}" x {SIZE_MB} MB')
+    assert old_encode(qsps_text) == encode_qsp_text(qsps_text)
+    assert old_decode(game_text) == decode_qsp_text(game_text)
+
+    before = bench('encode, per-char loop', old_encode, qsps_text)
+    after = bench('encode, qsp codec', encode_qsp_text, qsps_text)
+    print(f'x{before / after:.1f}')
+    before = bench('decode, per-char loop', old_decode, game_text)
+    after = bench('decode, qsp codec', decode_qsp_text, game_text)
+    print(f'x{before / after:.1f}')
+    before = bench('cp1251, per-char loop', old_decode_cp1251, cp1251_text)
+    after = bench('cp1251, 256-table', decode_cp1251_qsp_text, cp1251_text)
+    print(f'x{before / after:.1f}')
@@ -0,0 +1,64 @@
+# _parse_string_bench_.py
+# parse_string: old per-char loop vs jumps between quotes and braces.
+# Run from QSP.sublime-package folder (see readme.md).
+import os
+import random
+import time
+from typing import Callable, List
+
+from qSpy.converter.tools import parse_string
+from qSpy.converter.qsps_file import QspsFile
+
+SOURCE = os.path.join('..', '_examples', 'examples_qsp_to_qsps', 'ukuzya_txt2gam.qsps')
+REPEAT = 200
+
+def old_parse_string(qsps_line:str, mode:dict) -> None:
+    for char in qsps_line:
+        if not mode['quote']:
+            if char in ('"', '\'', '{'): mode['quote'].append(char)
+        else:
+            if not char in ('"', "'", "{", "}"): continue
+            if char in ('"', '\'') and mode['quote'][-1] == char:
+                mode['quote'].pop()
+            elif char == '}' and mode['quote'][-1] == '{':
+                mode['quote'].pop()
+            elif char == '{' and not mode['quote'][-1] in ('"', '\''):
+                mode['quote'].append(char)
+
+def fuzz(count:int) -> None:
+    """ Both parsers give the same stack for random lines and stacks. """
+    rnd = random.Random(1)
+    for _ in range(count):
+        line = ''.join(rnd.choice('ab "\'{}\n') for _ in range(rnd.randint(0, 40)))
+        stack = [rnd.choice(['"', "'", '{'])] if rnd.random() < 0.5 else []
+        old, new = {'quote': stack[:]}, {'quote': stack[:]}
+        old_parse_string(line, old)
+        parse_string(line, new)
+        assert old['quote'] == new['quote'], (line, stack, old, new)
+
+def bench(name:str, func:Callable[[str, dict], None], lines:List[str]) -> float:
+    mode = {'quote': []}
+    old = time.perf_counter()
+    for line in lines: func(line, mode)
+    elapsed = time.perf_counter() - old
+    print(f'{name:<20} {elapsed:8.3f} s')
+    return elapsed
+
+if __name__ == "__main__":
+    fuzz(100_000)
+    with open(SOURCE, 'r', encoding='utf-8-sig') as fp:
+        lines = fp.readlines() * REPEAT
+    print(f'"{SOURCE}" x {REPEAT}, {len(lines)} lines')
+    before = bench('per-char loop', old_parse_string, lines)
+    after = bench('regex jumps', parse_string, lines)
+    print(f'x{before / after:.1f}')
+    # long lines: descriptions and strings of many lines
+    long_lines = [''.join(lines[i:i+100]) for i in range(0, len(lines), 100)]
+    before = bench('per-char loop, long', old_parse_string, long_lines)
+    after = bench('regex jumps, long', parse_string, long_lines)
+    print(f'x{before / after:.1f}')
+
+    old = time.perf_counter()
+    qsps_file = QspsFile(lines)
+    qsps_file.split_to_locations()
+    print(f'QspsFile.split_to_locations: {time.perf_counter() - old:.3f} s')
@@ -0,0 +1,63 @@
+# _pp_cond_test_.py
+# Differential test: compiled conditions vs DirsInt visitor.
+# Run from QSP.sublime-package folder (see readme.md).
+import random
+import time
+from typing import Dict, List, Union
+
+from qSpy.preprocessor import pp_cond
+from qSpy.preprocessor.dirs_scanner import DirsScaner
+from qSpy.preprocessor.dirs_parser import DirsParser
+from qSpy.preprocessor.dirs_int import DirsInt
+from qSpy.preprocessor.pp_environment import PpEnvironment
+from qSpy.preprocessor import pp_dir as dir
+
+NAMES = ['a', 'b', 'c', 'True', 'False', 'debug', 'x1']
+
+def random_condition(rnd:random.Random, depth:int = 0) -> str:
+    if depth > 2 or rnd.random() < 0.3:
+        names = [rnd.choice(NAMES) for _ in range(rnd.randint(1, 3))]
+        cond = names[0]
+        for name in names[1:]: cond += rnd.choice([' == ', ' != ', '==', '!=']) + name
+        return ('not ' if rnd.random() < 0.3 else '') + cond
+    op = rnd.choice([' and ', ' or '])
+    return random_condition(rnd, depth + 1) + op + random_condition(rnd, depth + 1)
+
+def parse_condition(cond:str) -> dir.CondExprStmt:
+    scanner = DirsScaner([f'!@pp:if({cond}):include\n', '!@pp:endif\n'])
+    scanner.scan_tokens()
+    parser = DirsParser(scanner.get_tokens())
+    parser.tokens_parse()
+    assert not parser.errored(), cond
+    return parser.get_statements()[0].body.condition
+
+def random_labels(rnd:random.Random) -> Dict[str, Union[str, bool]]:
+    ns = PpEnvironment()
+    for name in NAMES:
+        if rnd.random() < 0.5: ns.def_key_set_value(name, rnd.choice(['', 'a', 'b', 'debug']))
+    return ns.get_env()
+
+if __name__ == "__main__":
+    rnd = random.Random(16)
+    conditions = [random_condition(rnd) for _ in range(2000)]
+    stmts = [parse_condition(cond) for cond in conditions]
+    envs = [random_labels(rnd) for _ in range(50)]
+    interpreter = DirsInt([], PpEnvironment(), [])
+    compiled = [pp_cond.compile_condition(stmt) for stmt in stmts]
+    for labels in envs:
+        interpreter._ns.set_env(labels)
+        for cond, stmt, func in zip(conditions, stmts, compiled):
+            assert bool(stmt.accept(interpreter)) == func(interpreter._ns.get_env()), (cond, labels)
+    print(f'{len(conditions)} conditions are equal in {len(envs)} environments. '
+        f'Shared closures: {pp_cond.compiled_count()}.')
+
+    old = time.perf_counter()
+    for labels in envs:
+        interpreter._ns.set_env(labels)
+        for stmt in stmts: stmt.accept(interpreter)
+    visitor = time.perf_counter() - old
+    old = time.perf_counter()
+    for labels in envs:
+        for func in compiled: func(labels)
+    closures = time.perf_counter() - old
+    print(f'Resolving: visitor {visitor:.3f} s, closures {closures:.3f} s, x{visitor / closures:.1f}')
@@ -0,0 +1,95 @@
+# _pp_fast_test_.py
+# Differential test: fast path for directive-free files vs full preprocessor pipeline.
+# Run from QSP.sublime-package folder (see readme.md).
+import contextlib
+import glob
+import io
+import os
+import random
+import time
+from typing import List
+
+from qSpy.preprocessor import QspsPP
+from qSpy.preprocessor import main as pp_main
+from qSpy.preprocessor.pp_fast import is_directive_free, pp_directive_free
+
+EXAMPLES = os.path.join('..', '_examples')
+
+def full_pipeline(qsps_lines:List[str], mode:str = 'On') -> List[str]:
+    """ Output of preprocessor with all six stages. """
+    is_free, pp_main.is_directive_free = pp_main.is_directive_free, lambda lines: False
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return QspsPP(mode).pp_this_lines(list(qsps_lines))
+    finally:
+        pp_main.is_directive_free = is_free
+
+def example_files() -> List[List[str]]:
+    """ Example files. Directives are removed, so every file is directive-free. """
+    files:List[List[str]] = []
+    for path in glob.glob(os.path.join(EXAMPLES, '**', '*.qsps'), recursive=True):
+        with open(path, 'r', encoding='utf-8-sig') as fp:
+            files.append([line for line in fp.readlines() if not '!@' in line])
+    return files
+
+SAMPLES = [
+    "# loc\n", "--- loc ---\n", "-- end\n", "text between locations\n",
+    "*pl 'text'\n", "\t*pl \"quoted \"\"text\"\"\"\n", "\n", "   \n", "\t\n",
+    "x = 1 &\n", "x = 1 & \n", "x = 1 & y = 2\n", "  &  \n", "&\n", "x = 1 & & \n",
+    "! comment\n", "\t! comment 'with' {braces}\n", "! don't\n", "x = 1 & ! comment\n",
+    "x = 1 ! comment\n", "x = 1 ! don't\n",
+    "!{ multiline\n", "comment }\n", "x = 1 & !{ block\n",
+    "*pl 'multi\n", "   line\n", "\tstring' & k = 1\n", "'\n",
+    "dynamic {\n", "\tif x: *pl 'a'\n", "}\n", "} & x = 1 &\n",
+    "x = (1 +\n", "  2)\n", "x = [1, (2]\n", ")\n", "]\n", "x = 1 }\n",
+    "act 'go': goto 'place'\n", "#inside\n", "--\n", "  --- not end\n",
+]
+
+def mutations(count:int) -> List[List[str]]:
+    """ Random files from sample lines, sometimes without last newline. """
+    rnd = random.Random(12)
+    files:List[List[str]] = []
+    for _ in range(count):
+        lines = ["# loc\n"] + [rnd.choice(SAMPLES) for _ in range(rnd.randint(1, 12))]
+        if rnd.random() < 0.7: lines.append("--- loc ---\n")
+        if rnd.random() < 0.2: lines[-1] = lines[-1][:-1]
+        files.append(lines)
+    return files
+
+if __name__ == "__main__":
+    examples = example_files()
+    synthetic = mutations(5000)
+    fast_count, equal_count = 0, 0
+    for qsps_lines in examples + synthetic:
+        assert is_directive_free(qsps_lines)
+        output = pp_directive_free(qsps_lines)
+        if output is None: continue # fast path declined, file goes to PpInt
+        fast_count += 1
+        for mode in ('On', 'Off'):
+            assert (output or ['\n']) == full_pipeline(qsps_lines, mode), ''.join(qsps_lines)
+        equal_count += 1
+    examples_fast = sum(1 for f in examples if pp_directive_free(f) is not None)
+    print(f'Examples: {examples_fast} of {len(examples)} files by fast path.')
+    print(f'All: {fast_count} of {len(examples) + len(synthetic)} files by fast path, '
+        f'{equal_count} of {fast_count} equal to PpInt.')
+
+    old = time.perf_counter()
+    for qsps_lines in examples: full_pipeline(qsps_lines)
+    full = time.perf_counter() - old
+    old = time.perf_counter()
+    for qsps_lines in examples: pp_directive_free(qsps_lines) or full_pipeline(qsps_lines)
+    fast = time.perf_counter() - old
+    print(f'Directive-free files: full {full:.3f} s, with fast path {fast:.3f} s, x{full / fast:.1f}')
+
+    # project, where nine of ten files have no directives
+    with open(os.path.join(EXAMPLES, 'example_preprocessor', 'pptest.qsps'), 'r', encoding='utf-8') as fp:
+        pp_file = fp.readlines()
+    project = [pp_file if i % 10 == 0 else f for i, f in enumerate(examples * 3)]
+    old = time.perf_counter()
+    for qsps_lines in project: full_pipeline(qsps_lines)
+    full = time.perf_counter() - old
+    old = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for qsps_lines in project: QspsPP('On').pp_this_lines(list(qsps_lines))
+    fast = time.perf_counter() - old
+    print(f'{len(project)} files: full {full:.3f} s, with fast path {fast:.3f} s, x{full / fast:.1f}')
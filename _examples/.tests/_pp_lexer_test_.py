@@ -0,0 +1,101 @@
+# _pp_lexer_test_.py
+# Differential test: PpLexer vs DirsScaner and PpScanner.
+# Run from QSP.sublime-package folder (see readme.md).
+import contextlib
+import glob
+import io
+import os
+import random
+import sys
+import time
+from typing import List, Optional, Tuple
+
+from qSpy.preprocessor import QspsPP
+from qSpy.preprocessor import main as pp_main
+from qSpy.preprocessor import error as er
+from qSpy.preprocessor.dirs_scanner import DirsScaner
+from qSpy.preprocessor.pp_lexer import PpLexer
+from qSpy.preprocessor.pp_scanner import PpScanner
+
+EXAMPLES = os.path.join('..', '_examples')
+
+def as_tuples(tokens) -> List[Tuple]:
+    return [(t.ttype, t.lexeme, t.lexeme_start, t.no_save_comment, t.include_line) for t in tokens]
+
+def compare(qsps_lines:List[str]) -> Optional[List[str]]:
+    """ Differences of lexer from both scanners. None, if lexer can not scan lines. """
+    if not PpLexer.can_scan(qsps_lines): return None
+    scanner, lexer = DirsScaner(qsps_lines), PpLexer(qsps_lines)
+    logs:List[str] = []
+    for dirs_scanner in (scanner, lexer):
+        with contextlib.redirect_stdout(io.StringIO()) as log:
+            try:
+                dirs_scanner.scan_tokens()
+            except er.DirScannerRunError as e:
+                print(e)
+        logs.append(log.getvalue())
+    differences:List[str] = []
+    if as_tuples(scanner.get_tokens()) != as_tuples(lexer.get_tokens()):
+        differences.append('tokens of DirsScaner')
+    if logs[0] != logs[1]:
+        differences.append('errors of DirsScaner')
+    rnd = random.Random(len(qsps_lines))
+    marked_lines = [(line, rnd.random() < 0.5, rnd.random() < 0.8) for line in qsps_lines]
+    scanner = PpScanner(marked_lines)
+    scanner.scan_tokens()
+    if as_tuples(scanner.get_tokens()) != as_tuples(lexer.mark_pp_tokens(marked_lines)):
+        differences.append('tokens of PpScanner')
+    return differences
+
+def example_files() -> List[List[str]]:
+    files:List[List[str]] = []
+    for path in glob.glob(os.path.join(EXAMPLES, '**', '*.qsps'), recursive=True):
+        with open(path, 'r', encoding='utf-8-sig') as fp:
+            files.append(fp.readlines())
+    return files
+
+SAMPLES = [
+    "# loc\n", "#\n", "--- loc ---\n", "--\n", "-\n", "text between locations\n", "  indented text\n",
+    "!@pp:var(label)\n", "  !@pp:if(label):exclude\n", "!@pp:endif\n", "!@pp:\n", " !@pp:", "!@pp:if(x != y) == z\n",
+    "!@pp:on ! wrong\n", "!@pp:var(name = value)\n", "!@pp:savecomm\n", "x = 1 !@ comment\n", "!@< del\n",
+    "*pl 'text'\n", "\t*pl \"quoted\"\n", "\n", "   \n", "x = 1 &  y = 2\n", "&\n", "! comment\n",
+    "*pl 'multi\n", "--- in string\n", "string'\n", "dynamic {\n", "}\n", "x = [1, (2]) {a} !\n",
+]
+
+def mutations(count:int) -> List[List[str]]:
+    rnd = random.Random(13)
+    files:List[List[str]] = []
+    for _ in range(count):
+        lines = [rnd.choice(SAMPLES) for _ in range(rnd.randint(1, 14))]
+        if rnd.random() < 0.3: lines[-1] = lines[-1].rstrip('\n') or lines[-1]
+        files.append(lines)
+    return files
+
+def pp_time(files:List[List[str]]) -> float:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for qsps_lines in files: QspsPP('On').pp_this_lines(list(qsps_lines))
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    examples = example_files()
+    synthetic = mutations(5000)
+    scanned, mismatched = 0, 0
+    for qsps_lines in examples + synthetic:
+        differences = compare(qsps_lines)
+        if differences is None: continue
+        scanned += 1
+        if differences:
+            mismatched += 1
+            if mismatched <= 5: print(f'Lexer differs from {", ".join(differences)}:\n{"".join(qsps_lines)}')
+    print(f'Lexer scanned {scanned} of {len(examples) + len(synthetic)} files, '
+        f'{mismatched} of them differ from scanners.')
+    if mismatched: sys.exit(1)
+
+    # full pipeline for all files, also without directives
+    pp_main.is_directive_free = lambda qsps_lines: False
+    fused = pp_time(examples)
+    can_scan, PpLexer.can_scan = PpLexer.can_scan, staticmethod(lambda qsps_lines: False)
+    two_pass = pp_time(examples)
+    PpLexer.can_scan = can_scan
+    print(f'Preprocessing of {len(examples)} files: two scanners {two_pass:.3f} s, lexer {fused:.3f} s, x{two_pass / fused:.1f}')
@@ -0,0 +1,57 @@
+# _pp_parallel_bench_.py
+# Two-phase parallel preprocessing of module files vs files one by one.
+# Run from QSP.sublime-package folder (see readme.md).
+import contextlib
+import glob
+import io
+import os
+import random
+import time
+from typing import List, Tuple
+
+from qSpy.preprocessor import QspsPP
+
+EXAMPLES = os.path.join('..', '_examples')
+
+def module_files(copies:int) -> List[List[str]]:
+    """ Example files in random order. Labels of some files change output of next files. """
+    files:List[List[str]] = []
+    for path in glob.glob(os.path.join(EXAMPLES, '**', '*.qsps'), recursive=True):
+        with open(path, 'r', encoding='utf-8-sig') as fp:
+            files.append(fp.readlines())
+    labels = ['!@pp:var(test)\n', '!@pp:var(x = y)\n', '!@pp:if(test):var(z)\n', '!@pp:off\n!@pp:var(o)\n!@pp:on\n']
+    files.extend([[line] for line in labels])
+    files = files * copies
+    random.Random(14).shuffle(files)
+    return files
+
+def sequential(files:List[List[str]]) -> Tuple[List[List[str]], List[bool], str, dict]:
+    pp = QspsPP('On')
+    outputs, errors = [], []
+    with contextlib.redirect_stdout(io.StringIO()) as log:
+        for qsps_lines in files:
+            outputs.append(pp.pp_this_lines(list(qsps_lines)))
+            errors.append(pp.errored())
+    return outputs, errors, log.getvalue(), pp.get_env()
+
+def two_phase(files:List[List[str]], workers:int) -> Tuple[List[List[str]], List[bool], str, dict]:
+    pp = QspsPP('On')
+    with contextlib.redirect_stdout(io.StringIO()) as log:
+        results = pp.pp_files([list(f) for f in files], workers)
+    assert not log.getvalue()
+    return [r[0] for r in results], [r[1] for r in results], ''.join(r[2] for r in results), pp.get_env()
+
+if __name__ == "__main__":
+    print(f"CPU: {os.cpu_count()}")
+    for copies in (1, 10):
+        files = module_files(copies)
+        old = time.perf_counter()
+        expected = sequential(files)
+        seq_time = time.perf_counter() - old
+        old = time.perf_counter()
+        got = two_phase(files, 4)
+        par_time = time.perf_counter() - old
+        assert got == expected
+        lines = sum(len(f) for f in files)
+        print(f'{len(files)} files, {lines} lines: one by one {seq_time:.3f} s, '
+            f'two phases {par_time:.3f} s, x{seq_time / par_time:.1f}')
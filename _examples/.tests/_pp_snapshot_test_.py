@@ -0,0 +1,72 @@
+# _pp_snapshot_test_.py
+# Snapshots of preprocessor environment vs copies of labels dict.
+# Run from QSP.sublime-package folder (see readme.md).
+import hashlib
+import json
+import pickle
+import random
+import time
+from typing import Dict, List, Union
+
+from qSpy.preprocessor.pp_cache import PpCache
+from qSpy.preprocessor.pp_environment import PpEnvironment, PpSnapshot
+
+Labels = Dict[str, Union[str, bool]]
+
+def random_history(rnd:random.Random, steps:int) -> None:
+    ns = PpEnvironment()
+    model:Labels = {'True': True, 'False': False}
+    snapshots:List[PpSnapshot] = []
+    models:List[Labels] = []
+    for _ in range(steps):
+        action = rnd.random()
+        if action < 0.5:
+            key = rnd.choice('abcdefgh') + rnd.choice(['', '1', '2'])
+            value = rnd.choice(['', 'x', 'y', key])
+            ns.def_key_set_value(key, value)
+            model[key] = key
+            if value:
+                model.setdefault(value, value) if value in ('True', 'False') else model.update({value: value})
+                model[key] = value
+        elif action < 0.8:
+            snapshots.append(ns.snapshot())
+            models.append(dict(model))
+        elif snapshots:
+            i = rnd.randrange(len(snapshots))
+            ns.restore(snapshots[i])
+            model = dict(models[i])
+        assert ns.get_env() == model
+    for snapshot, labels in zip(snapshots, models):
+        assert snapshot.as_dict() == labels and len(snapshot) == len(labels)
+        assert snapshot.content_hash() == PpSnapshot(labels).content_hash()
+        assert pickle.loads(pickle.dumps(snapshot)) == snapshot
+    for _ in range(50):
+        i, j = rnd.randrange(len(snapshots)), rnd.randrange(len(snapshots))
+        assert snapshots[i].diff(snapshots[j]) == PpCache.labels_delta(models[j], models[i])
+        assert (snapshots[i] == snapshots[j]) == (models[i] == models[j])
+
+if __name__ == "__main__":
+    rnd = random.Random(17)
+    for _ in range(300): random_history(rnd, 200)
+    print('Snapshots are equal to copies of labels in 300 random histories.')
+
+    # big table of labels, every file changes one label
+    ns = PpEnvironment()
+    for i in range(2000): ns.def_var(f'label_{i}')
+    labels = ns.get_env()
+    old = time.perf_counter()
+    for i in range(1000):
+        before = dict(labels)
+        labels[f'label_{i % 50}'] = str(i)
+        # key of cache by copy of labels, as before snapshots
+        hashlib.md5(json.dumps([True, sorted(before.items())], ensure_ascii=False).encode('utf-8'))
+        PpCache.labels_delta(before, labels)
+    copies = time.perf_counter() - old
+    old = time.perf_counter()
+    for i in range(1000):
+        before = ns.snapshot()
+        ns.set_var(f'label_{i % 50}', str(i))
+        PpCache.key([], True, before)
+        ns.snapshot().diff(before)
+    snapshots = time.perf_counter() - old
+    print(f'1000 files with 2000 labels: copies {copies:.3f} s, snapshots {snapshots:.3f} s, x{copies / snapshots:.1f}')
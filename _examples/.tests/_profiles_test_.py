@@ -0,0 +1,72 @@
+# _profiles_test_.py
+# Project with "profiles": every profile is built from one parse of sources.
+# Run from QSP.sublime-package folder (see readme.md).
+import contextlib
+import io
+import json
+import os
+import tempfile
+
+from qSpy.builder import BuildQSP
+from qSpy.converter import QspToQspsBuiltinConv
+from qSpy.project import QspProject
+
+SOURCE = [
+    '# start\n',
+    '!@pp:if(demo):include\n',
+    "*pl 'demo version'\n",
+    '!@pp:endif\n',
+    '!@pp:if(full):include\n',
+    "*pl 'full version'\n",
+    '!@pp:endif\n',
+    "gt 'second'\n",
+    '--- start ---\n',
+    '# second\n',
+    "*pl 'second'\n",
+    '--- second ---\n',
+]
+
+PROJECT = {
+    'project': [{'module': 'game.qsp', 'files': [{'path': 'game.qsps'}]}],
+    'start': 'game.qsp',
+    'preprocessor': 'On',
+    'profiles': [
+        {'name': 'demo', 'labels': ['demo'], 'output': 'demo'},
+        {'name': 'full', 'labels': {'full': ''}, 'output': 'full'},
+        {'labels': ['demo']} # without output, is skipped
+    ]
+}
+
+def game_text(qsp_path:str) -> str:
+    with open(qsp_path, 'r', encoding='utf-16-le') as fp:
+        return QspToQspsBuiltinConv.decode_qsp_line(fp.read())
+
+if __name__ == "__main__":
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as folder:
+        with open(os.path.join(folder, 'game.qsps'), 'w', encoding='utf-8') as fp:
+            fp.writelines(SOURCE)
+        project_file = os.path.join(folder, 'qsp-project.json')
+        with open(project_file, 'w', encoding='utf-8') as fp:
+            json.dump(PROJECT, fp)
+        try:
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                qsp_proj = QspProject({'point_file': project_file}, [folder])
+                assert not qsp_proj.scheme_is_wrong()
+                scheme = qsp_proj.get_scheme()
+                BuildQSP(scheme).build_project()
+        finally:
+            os.chdir(cwd)
+        log = output.getvalue()
+        assert [p['name'] for p in scheme['profiles']] == ['demo', 'full'], scheme['profiles']
+        assert 'Profile 2 has no key "output"' in log, log
+        assert 'Build profile "demo"' in log and 'Build profile "full"' in log, log
+        # sources of second profile are taken from parse of first profile
+        assert 'Scanned and parsed files are reused 1 times.' in log, log
+        demo = game_text(os.path.join(folder, 'demo', 'game.qsp'))
+        full = game_text(os.path.join(folder, 'full', 'game.qsp'))
+        assert 'demo version' in demo and not 'full version' in demo, demo
+        assert 'full version' in full and not 'demo version' in full, full
+        assert 'second' in demo and 'second' in full
+    print('Two profiles are built from one parse of sources.')
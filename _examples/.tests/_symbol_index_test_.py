@@ -0,0 +1,70 @@
+# _symbol_index_test_.py
+# Locations, labels and call sites of qsps-files in symbol index.
+# Run from QSP.sublime-package folder (see readme.md).
+import glob
+import os
+import time
+
+from qSpy.symbol_index import SymbolIndex, extract_symbols
+
+SOURCE = [
+    'text before locations, gt "not.call"\n',
+    '# start\n',
+    ':begin\n',
+    "gt 'first' & goto 'Second', 1\n",
+    "if x: xgt 'third' else gosub 'fourth'\n",
+    "gs('fifth', 2) & $r = $func('sixth') + func(\"seventh\")\n",
+    "x = @eighth(1) + @@ninth\n",
+    "! gt 'in.comment' {\n",
+    "gt 'in.comment.brace' }\n",
+    "*pl 'gt ''in.string'''\n",
+    "gt 'dyn' + $name\n",
+    "act 'go': gt 'tenth'\n",
+    "\t:second label & jump 'begin'\n",
+    '--- start ---\n',
+    '# Second\n',
+    "gt 'START'\n",
+    '--- Second ---\n',
+]
+
+if __name__ == "__main__":
+    symbols = extract_symbols(SOURCE, 'test.qsps')
+    calls = [(s.name, s.command, s.line, s.char) for s in symbols if s.kind == 'call']
+    assert calls == [
+        ('first', 'gt', 3, 4), ('Second', 'goto', 3, 19),
+        ('third', 'xgt', 4, 11), ('fourth', 'gosub', 4, 30),
+        ('fifth', 'gs', 5, 4), ('sixth', 'func', 5, 29), ('seventh', 'func', 5, 45),
+        ('eighth', '@', 6, 5), ('ninth', '@@', 6, 19),
+        ('tenth', 'gt', 11, 14),
+        ('START', 'gt', 15, 4)], calls
+    labels = [(s.name, s.line, s.char, s.location) for s in symbols if s.kind == 'label']
+    assert labels == [('begin', 2, 1, 'start'), ('second label', 12, 2, 'start')], labels
+    locations = [(s.name, s.line, s.char) for s in symbols if s.kind == 'location']
+    assert locations == [('start', 1, 2), ('Second', 14, 2)], locations
+
+    index = SymbolIndex()
+    index.update_file('test.qsps', SOURCE)
+    assert [s.line for s in index.references('start')] == [15]
+    assert [s.name for s in index.definitions('SECOND')] == ['Second']
+    assert [s.name for s in index.labels('Begin', 'START')] == ['begin']
+    assert [s.name for s in index.unreferenced_locations()] == []
+    index.replace_file('test.qsps', 'moved.qsps')
+    assert [s.place for s in index.references('start')] == ['moved.qsps']
+    index.update_file('moved.qsps', SOURCE[:14])
+    assert index.references('start') == [] and [s.name for s in index.unreferenced_locations()] == ['start']
+    index.remove_file('moved.qsps')
+    assert index.definitions('start') == [] and not index.has_file('moved.qsps')
+    print('Symbols of test source are right.')
+
+    files = glob.glob(os.path.join('..', '_examples', '**', '*.qsps'), recursive=True)
+    old = time.perf_counter()
+    for path in files:
+        with open(path, 'r', encoding='utf-8-sig') as fp:
+            index.update_file(path, fp.readlines())
+    elapsed = time.perf_counter() - old
+    old = time.perf_counter()
+    for _ in range(10000): index.references('em.tag.getCont')
+    lookups = time.perf_counter() - old
+    print(f'{len(files)} example files indexed in {elapsed:.2f} s, '
+        f'10000 lookups of call sites in {lookups:.3f} s, '
+        f'{len(index.unreferenced_locations())} locations without constant calls.')
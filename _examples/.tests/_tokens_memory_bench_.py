@@ -0,0 +1,76 @@
+# _tokens_memory_bench_.py
+# Peak memory and allocations of scanners for a big project.
+# Run from QSP.sublime-package folder (see readme.md).
+import contextlib
+import gc
+import glob
+import io
+import os
+import time
+import tracemalloc
+from typing import Callable, List
+
+from qSpy.preprocessor import QspsPP
+from qSpy.preprocessor.dirs_scanner import DirsScaner
+from qSpy.preprocessor.pp_scanner import PpScanner
+from qSpy.converter.base_scanner import BaseScanner
+
+EXAMPLES = os.path.join('..', '_examples')
+
+def project_files(size:int) -> List[List[str]]:
+    """ Example files, repeated up to size in chars. """
+    files:List[List[str]] = []
+    for path in glob.glob(os.path.join(EXAMPLES, '**', '*.qsps'), recursive=True):
+        with open(path, 'r', encoding='utf-8-sig') as fp:
+            files.append(fp.readlines())
+    project:List[List[str]] = []
+    chars = 0
+    while chars < size:
+        for lines in files:
+            project.append(lines)
+            chars += sum(len(line) for line in lines)
+    return project
+
+def measure(name:str, func:Callable[[], object]) -> None:
+    gc.collect()
+    tracemalloc.start()
+    old = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - old
+    current, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.stop()
+    print(f'{name}: peak {peak / 2**20:.1f} MB, kept {current / 2**20:.1f} MB in {blocks} blocks, {elapsed:.2f} s')
+    del result
+
+def scan_all(project:List[List[str]]) -> List[object]:
+    """ Tokens of all files are kept, as for big file. """
+    tokens:List[object] = []
+    for lines in project:
+        scanner = DirsScaner(lines)
+        scanner.scan_tokens()
+        tokens.append(scanner.get_tokens())
+        pp_scanner = PpScanner([(line, True, True) for line in lines])
+        pp_scanner.scan_tokens()
+        tokens.append(pp_scanner.get_tokens())
+    return tokens
+
+def base_scan_all(project:List[List[str]]) -> List[object]:
+    tokens:List[object] = []
+    for lines in project:
+        scanner = BaseScanner(lines)
+        scanner.scan_tokens()
+        tokens.append(scanner.get_tokens())
+    return tokens
+
+def pp_all(project:List[List[str]]) -> None:
+    with contextlib.redirect_stdout(io.StringIO()):
+        preprocessor = QspsPP('On')
+        for lines in project: preprocessor.pp_this_lines(list(lines))
+
+if __name__ == "__main__":
+    project = project_files(5 * 2**20)
+    print(f'{len(project)} files, {sum(len(l) for f in project for l in f) / 2**20:.1f} M chars')
+    measure('Pp tokens of project', lambda: scan_all(project))
+    measure('Base tokens of project', lambda: base_scan_all(project))
+    measure('Preprocessing of project', lambda: pp_all(project))
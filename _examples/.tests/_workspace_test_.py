@@ -0,0 +1,184 @@
+# _workspace_test_.py
+# Locations and files of workspace: indexed store and refreshing from folders.
+# Run from QSP.sublime-package folder (see readme.md).
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import types
+from typing import List
+
+try:
+    import sublime # type: ignore
+except ImportError:
+    # workspace uses sublime only for views, which are not in this test
+    sublime = sys.modules['sublime'] = types.ModuleType('sublime')
+    sublime.Region = sublime.View = object
+
+from qSpy.workspace import QspWorkspace
+from qSpy.ws_storage import WsStorage
+from qSpy import const
+
+def write_file(path:str, text:str) -> None:
+    """ Time of change is set forward, so file is changed even in the same tick of clock. """
+    stat = os.stat(path) if os.path.isfile(path) else None
+    with open(path, 'w', encoding='utf-8') as fp:
+        fp.write(text)
+    if stat: os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+def locs_text(*names:str) -> str:
+    return ''.join(f'# {name}\n*pl "{name}"\n--- {name} ---\n\n' for name in names)
+
+def state(ws:QspWorkspace):
+    """ Locations by file name, sorted. """
+    return sorted((name, os.path.basename(place)) for name, _, place in ws.get_locs())
+
+def store_test() -> None:
+    ws = QspWorkspace({})
+    ws.add_loc('start', (0, 5), 'a.qsps')
+    ws.add_loc('second', (6, 9), 'a.qsps')
+    ws.add_loc('start', (0, 5), 7) # untitled view
+    ws.add_loc('start', (0, 5), 'a.qsps') # the same location is not added again
+    assert ws.get_locs_names() == ['start', 'second', 'start']
+    assert [place for _, _, place in ws.get_locs_by_name('start')] == ['a.qsps', 7]
+    assert [place for _, _, place in ws.locs_dupl()] == ['a.qsps', 7]
+    ws.replace_locs('a.qsps', 'b.qsps')
+    assert sorted(str(place) for _, _, place in ws.get_locs()) == ['7', 'b.qsps', 'b.qsps']
+    ws.del_all_locs_by_place(7)
+    assert ws.locs_dupl() == [] and ws.get_locs_by_name('start') == [('start', (0, 5), 'b.qsps')]
+    ws.del_loc_by_index(0)
+    assert ws.get_locs() == [('second', (6, 9), 'b.qsps')] and ws.get_locs_by_name('start') == []
+
+def refresh_test(folder:str) -> None:
+    a_path, b_path = os.path.join(folder, 'a.qsps'), os.path.join(folder, 'b.qsps')
+    write_file(a_path, locs_text('start', 'second'))
+    ws = QspWorkspace({})
+    ws.refresh_qsps_files([folder])
+    assert state(ws) == [('second', 'a.qsps'), ('start', 'a.qsps')], state(ws)
+    # new file, renamed and deleted locations
+    write_file(b_path, locs_text('third'))
+    write_file(a_path, locs_text('start', 'renamed'))
+    ws.refresh_qsps_files([folder])
+    assert state(ws) == [('renamed', 'a.qsps'), ('start', 'a.qsps'), ('third', 'b.qsps')], state(ws)
+    write_file(a_path, locs_text('start'))
+    ws.refresh_qsps_files([folder])
+    assert state(ws) == [('start', 'a.qsps'), ('third', 'b.qsps')], state(ws)
+    # moved file keeps locations, deleted file loses them
+    os.rename(b_path, os.path.join(folder, 'moved.qsps'))
+    ws.refresh_qsps_files([folder])
+    assert state(ws) == [('start', 'a.qsps'), ('third', 'moved.qsps')], state(ws)
+    os.remove(os.path.join(folder, 'moved.qsps'))
+    ws.refresh_qsps_files([folder])
+    assert state(ws) == [('start', 'a.qsps')] and len(ws.get_qsps_files()) == 1, state(ws)
+
+def rehash_test(folder:str) -> None:
+    """ Files are hashed, only if size or time of change are changed. """
+    folder = os.path.join(folder, 'rehash')
+    os.makedirs(folder)
+    hashed:List[str] = []
+    read:List[str] = []
+    get_hash, read_qsps_file = QspWorkspace.get_hash, QspWorkspace._read_qsps_file
+    def counted_hash(file_path:str, hash_name:str='md5') -> str:
+        hashed.append(os.path.basename(file_path))
+        return get_hash(file_path, hash_name)
+    def counted_read(file_path:str):
+        read.append(os.path.basename(file_path))
+        return read_qsps_file(file_path)
+    QspWorkspace.get_hash = staticmethod(counted_hash)
+    QspWorkspace._read_qsps_file = staticmethod(counted_read)
+    try:
+        for name in ('c', 'd', 'e'):
+            write_file(os.path.join(folder, f'{name}.qsps'), locs_text(f'loc_{name}'))
+        ws = QspWorkspace({})
+        ws.refresh_qsps_files([folder])
+        assert sorted(hashed) == ['c.qsps', 'd.qsps', 'e.qsps'], hashed
+        hashed.clear()
+        read.clear()
+        ws.refresh_qsps_files([folder])
+        assert hashed == [] and read == [], (hashed, read)
+        # only time is changed: file is hashed, but not read, because hash is the same
+        d_path = os.path.join(folder, 'd.qsps')
+        write_file(d_path, locs_text('loc_d'))
+        ws.refresh_qsps_files([folder])
+        assert hashed == ['d.qsps'] and read == [], (hashed, read)
+        assert state(ws) == [('loc_c', 'c.qsps'), ('loc_d', 'd.qsps'), ('loc_e', 'e.qsps')], state(ws)
+        # the same size and other content
+        hashed.clear()
+        write_file(d_path, locs_text('loc_x'))
+        ws.refresh_qsps_files([folder])
+        assert hashed == ['d.qsps'] and read == ['d.qsps'], (hashed, read)
+        assert state(ws) == [('loc_c', 'c.qsps'), ('loc_e', 'e.qsps'), ('loc_x', 'd.qsps')], state(ws)
+        # other hash in qsp-project.json: all files are hashed again
+        hashed.clear()
+        with open(os.path.join(folder, 'qsp-project.json'), 'w', encoding='utf-8') as fp:
+            json.dump({'workspace_hash': 'blake2b'}, fp)
+        ws.refresh_qsps_files([folder])
+        assert ws.hash_name == 'blake2b' and sorted(hashed) == ['c.qsps', 'd.qsps', 'e.qsps'], hashed
+        assert dict(ws.get_qsps_files())[d_path] == get_hash(d_path, 'blake2b')
+        hashed.clear()
+        ws.refresh_qsps_files([folder])
+        assert hashed == [], hashed
+    finally:
+        QspWorkspace.get_hash = staticmethod(get_hash)
+        QspWorkspace._read_qsps_file = staticmethod(read_qsps_file)
+
+def full_state(ws:QspWorkspace):
+    ws_json = ws.get_json_struct()
+    return sorted(ws.get_locs()), sorted(ws.get_qsps_files()), ws_json['files_stats'], ws_json['symbols']
+
+def storage_test(folder:str) -> None:
+    """ Workspace is saved in sqlite-file and loaded from it. """
+    project_folder = os.path.join(folder, 'storage')
+    os.makedirs(project_folder)
+    for name in ('f', 'g', 'h'):
+        write_file(os.path.join(project_folder, f'{name}.qsps'), locs_text(f'loc_{name}', f'{name}_2'))
+    ws = QspWorkspace({})
+    ws.refresh_qsps_files([project_folder])
+    ws.save_changes(project_folder) # all workspace at first save
+    loaded = QspWorkspace({})
+    assert loaded.extract_from_folder(project_folder)
+    assert full_state(loaded) == full_state(ws)
+    # only changed places are written
+    write_file(os.path.join(project_folder, 'f.qsps'), locs_text('loc_f'))
+    os.remove(os.path.join(project_folder, 'g.qsps'))
+    loaded.refresh_qsps_files([project_folder])
+    saved:List[object] = []
+    save = WsStorage.save
+    def counted_save(self:WsStorage, ws_json, places=None) -> bool:
+        saved.append(None if places is None else sorted(os.path.basename(p) for p in places))
+        return save(self, ws_json, places)
+    WsStorage.save = counted_save
+    try:
+        loaded.save_changes(project_folder)
+        loaded.save_changes(project_folder) # nothing is changed
+    finally:
+        WsStorage.save = save
+    assert saved == [['f.qsps', 'g.qsps']], saved
+    again = QspWorkspace({})
+    assert again.extract_from_folder(project_folder)
+    assert full_state(again) == full_state(loaded)
+    assert state(again) == [('h_2', 'h.qsps'), ('loc_f', 'f.qsps'), ('loc_h', 'h.qsps')], state(again)
+    # broken sqlite-file is not loaded
+    with open(os.path.join(project_folder, const.WS_DB_FILE_NAME), 'wb') as fp:
+        fp.write(b'not a database')
+    with contextlib.redirect_stdout(io.StringIO()) as log:
+        assert WsStorage(os.path.join(project_folder, const.WS_DB_FILE_NAME)).load() is None
+    assert log.getvalue().startswith('[116]'), log.getvalue()
+
+if __name__ == "__main__":
+    store_test()
+    print('Locations are added, moved and deleted in indexed store.')
+    folder = tempfile.mkdtemp()
+    try:
+        refresh_test(folder)
+        print('Locations of added, changed, moved and deleted files are refreshed.')
+        rehash_test(folder)
+        print('Only files with other size or time of change are hashed again.')
+        if WsStorage.available():
+            storage_test(folder)
+            print('Workspace is saved in sqlite-file and loaded from it.')
+    finally:
+        shutil.rmtree(folder)